@@ -0,0 +1 @@
+# TLK Aptitude Screener - moduli condivisi (importabili fuori dallo script Streamlit)
@@ -0,0 +1,8 @@
+import sys
+
+# Import dentro la guardia: i processi di lettura (spawn) rieseguono questo modulo come
+# __mp_main__ e non devono caricare CLI, pipeline e dipendenze che non usano.
+if __name__ == "__main__":
+    from aptitude.cli import main
+
+    sys.exit(main())
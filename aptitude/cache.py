@@ -0,0 +1,158 @@
+# Cache risultati a due livelli: LRU in memoria + SQLite su disco (eviction per dimensione).
+#
+# Lo script Streamlit viene rieseguito a ogni interazione: gli oggetti definiti nello
+# script vengono ricreati, mentre i moduli importati restano in sys.modules. Per questo
+# la cache vive qui e non in aptitude_clean.py.
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "APTITUDE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "aptitude"),
+)
+DEFAULT_DISK_MAX_BYTES = int(float(os.getenv("APTITUDE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+DEFAULT_MEMORY_ITEMS = int(os.getenv("APTITUDE_CACHE_MEMORY_ITEMS", "512"))
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data or b"").hexdigest()
+
+
+def result_cache_key(content_hash: str, model_extract: str, model_score: str, extract_sys: str, score_sys: str, *extra: str) -> str:
+    """Chiave content-addressed: hash del file + modelli + hash dei prompt di sistema (+ parametri extra)."""
+    h = hashlib.sha256()
+    for part in (content_hash, model_extract, model_score, sha256_hex(extract_sys.encode("utf-8")), sha256_hex(score_sys.encode("utf-8")), *extra):
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+# Totale dei byte in una riga di meta, aggiornato da trigger: vale per tutti i processi che
+# condividono il file (app, worker, CLI) e set() non somma più l'intera tabella
+_SIZE_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries BEGIN
+    UPDATE meta SET value = value + NEW.size WHERE name = 'total_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries BEGIN
+    UPDATE meta SET value = value - OLD.size WHERE name = 'total_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE meta SET value = value - OLD.size + NEW.size WHERE name = 'total_bytes';
+END;
+INSERT OR IGNORE INTO meta (name, value) SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM entries;
+COMMIT;
+"""
+
+
+class DiskCache:
+    """Cache chiave -> bytes su SQLite. Oltre max_bytes elimina le voci meno usate di recente."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_DISK_MAX_BYTES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        # trigger e totale iniziale nella stessa transazione: nessuna scrittura concorrente va persa
+        try:
+            self._conn.executescript(_SIZE_SCHEMA)
+        except BaseException:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            return bytes(row[0])
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            # upsert e non INSERT OR REPLACE: la sostituzione non farebbe scattare il trigger di DELETE
+            self._conn.execute(
+                "INSERT INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, last_access = excluded.last_access",
+                (key, sqlite3.Binary(value), len(value), time.time()),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT value FROM meta WHERE name = 'total_bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+
+
+class ResultCache:
+    """
+    Cache dei risultati per CV (testo letto + JSON estratto + JSON score).
+    Livello 1: LRU in memoria (JSON serializzato, quindi ogni get restituisce una copia).
+    Livello 2: DiskCache su SQLite, condivisa tra sessioni e riavvii.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_items: int = DEFAULT_MEMORY_ITEMS, max_disk_bytes: int = DEFAULT_DISK_MAX_BYTES):
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = DiskCache(path or os.path.join(DEFAULT_CACHE_DIR, "results.sqlite"), max_disk_bytes)
+
+    def _remember(self, key: str, raw: bytes) -> None:
+        with self._lock:
+            self._memory[key] = raw
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is not None:
+                self._memory.move_to_end(key)
+        if raw is None:
+            try:
+                raw = self._disk.get(key)
+            except sqlite3.Error:
+                raw = None
+            if raw is None:
+                return None
+            self._remember(key, raw)
+        try:
+            return json.loads(raw.decode("utf-8"))
+        except Exception:
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        raw = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        self._remember(key, raw)
+        try:
+            self._disk.set(key, raw)
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,220 @@
+# CLI headless: screening batch di una cartella/zip di CV senza browser.
+#
+#   python -m aptitude screen ./inbox --out results.parquet
+#   python -m aptitude screen cv_export.zip --out results.jsonl --prefixes "+39" --min-conf 0.5
+#   python -m aptitude screen export_jobboard.tar.gz --out results.csv
+#   python -m aptitude history --role Outbound --min-score 60 --since 2024-05-01
+#   python -m aptitude rescore   (dopo una modifica di SCORE_SYS / modello di scoring)
+#   python -m aptitude worker    (esegue i job accodati dall'app, vedi jobs.py)
+#   python -m aptitude jobs      (stato degli ultimi job in coda)
+
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from importlib.util import find_spec
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from aptitude.contacts import parse_prefixes
+from aptitude.history import ROLE_COLUMNS, SORT_COLUMNS, ScreeningHistory
+from aptitude.ingest import SpooledCV, Spool
+from aptitude.jobs import JobQueue, run_worker
+from aptitude.llm import GROQ_API_KEY, GROQ_CONCURRENCY
+from aptitude.pipeline import (
+    CURRENT_SCORE_VERSIONS,
+    GROQ_ERROR_LABEL,
+    SCORE_VERSION,
+    SUPPORTED_EXTENSIONS,
+    ScreenSettings,
+    rescore_history,
+    screen_documents,
+)
+
+
+def iter_input_files(path: str, spool: Spool) -> Iterator[Tuple[str, SpooledCV]]:
+    """
+    (nome, CV su disco) per ogni CV in una cartella (ricorsiva), in un archivio zip/tar
+    (anche annidato) o in un singolo file. I membri degli archivi finiscono nello spool.
+    """
+    for cv in spool.add_path(path):
+        yield cv.name, cv
+
+OUTPUT_FORMATS = ("jsonl", "csv", "parquet")
+PARQUET_ENGINES = ("pyarrow", "fastparquet")  # quelli che pandas.to_parquet sa usare
+
+def output_error(out_path: str) -> Optional[str]:
+    """Perché out_path non si può scrivere (None se ok): si controlla prima dello screening, non dopo."""
+    ext = out_path.rsplit(".", 1)[-1].lower()
+    if ext not in OUTPUT_FORMATS:
+        return f"Formato output non supportato: .{ext} (usa .jsonl, .csv o .parquet)"
+    if ext == "parquet" and not any(find_spec(m) is not None for m in PARQUET_ENGINES):
+        return "Output .parquet: installare pyarrow (pip install pyarrow) oppure usare .jsonl o .csv"
+    return None
+
+def write_rows(rows: List[Dict[str, Any]], out_path: str) -> None:
+    error = output_error(out_path)
+    if error:
+        raise ValueError(error)
+    ext = out_path.rsplit(".", 1)[-1].lower()
+    if ext == "jsonl":
+        with open(out_path, "w", encoding="utf-8") as fh:
+            for row in rows:
+                fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return
+
+    import pandas as pd
+
+    df = pd.DataFrame(rows)
+    if ext == "parquet":
+        df.to_parquet(out_path, index=False)
+    else:
+        df.to_csv(out_path, index=False)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m aptitude", description="TLK Aptitude Screener (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("screen", help="Screening di una cartella, uno zip o singoli file di CV")
+    p.add_argument("inputs", nargs="+", help="Cartelle, archivi .zip/.tar(.gz) o file CV")
+    p.add_argument("--out", required=True, help="File risultati (.jsonl, .csv, .parquet)")
+    p.add_argument("--no-cc39", action="store_true", help="Non aggiungere +39 ai numeri italiani senza prefisso")
+    p.add_argument("--prefixes", default="+39,+44,+353", help="Prefissi accettati (comma-separated, vuoto = tutti)")
+    p.add_argument("--min-conf", type=float, default=0.35, help="Soglia Confidence estrazione (0-1)")
+    p.add_argument("--concurrency", type=int, default=GROQ_CONCURRENCY, help="CV in fase Groq in parallelo")
+    p.add_argument("--debug", action="store_true", help="Includi JSON extract/score nelle righe")
+    p.add_argument("--no-prescreen", action="store_true", help="Forza scoring Groq completo anche sotto soglia pre-screen")
+    p.add_argument("--no-dedup", action="store_true", help="Analizza anche i CV quasi duplicati (niente raggruppamento)")
+    p.add_argument("--token-budget", type=int, default=ScreenSettings.token_budget, help="Token massimi del testo CV inviato all'estrazione")
+    p.add_argument("--fused", action="store_true", help="Extract + score in una sola chiamata Groq per CV")
+    p.add_argument("--score-batch", type=int, default=ScreenSettings.score_batch, help="CV per chiamata di scoring (1 = una chiamata per CV)")
+    p.add_argument("--routing", action="store_true", help="CV semplici al modello veloce (GROQ_MODEL_FAST), escalation al grande se serve")
+    p.add_argument("--no-stream", action="store_true", help="Risposte Groq complete invece che in streaming")
+    p.add_argument("--prescreen-threshold", type=int, default=ScreenSettings.prescreen_threshold, help="Segnali telefonici minimi per chiamare Groq")
+    p.add_argument("--no-history", action="store_true", help="Non salvare i risultati nello storico")
+
+    h = sub.add_parser("history", help="Consulta lo storico dei CV analizzati (senza chiamate Groq)")
+    h.add_argument("--role", choices=list(ROLE_COLUMNS), default="Best", help="Ruolo per score minimo, label e ordinamento")
+    h.add_argument("--label", action="append", default=None, help="Label ammesse (ripetibile), es. --label Alta --label Media")
+    h.add_argument("--min-score", type=int, default=0)
+    h.add_argument("--search", default="", help="Sottostringa di nome o nome file")
+    h.add_argument("--since", default=None, help="Solo CV analizzati da questa data (YYYY-MM-DD)")
+    h.add_argument("--sort", choices=list(SORT_COLUMNS), default="score")
+    h.add_argument("--asc", action="store_true", help="Ordine crescente")
+    h.add_argument("--limit", type=int, default=50)
+    h.add_argument("--offset", type=int, default=0)
+    h.add_argument("--out", default=None, help="Salva la pagina in .jsonl/.csv/.parquet invece di stamparla")
+
+    r = sub.add_parser("rescore", help="Ricalcola solo lo scoring Groq dei CV nello storico con score superato")
+    r.add_argument("--concurrency", type=int, default=GROQ_CONCURRENCY, help="Chiamate di scoring in parallelo")
+    r.add_argument("--score-batch", type=int, default=ScreenSettings.score_batch, help="CV per chiamata di scoring (1 = una chiamata per CV)")
+
+    w = sub.add_parser("worker", help="Esegue i job di screening accodati dall'app (lettura, OCR, Groq)")
+    w.add_argument("--once", action="store_true", help="Esce quando la coda è vuota invece di restare in attesa")
+    w.add_argument("--poll", type=float, default=1.0, help="Secondi tra due controlli della coda vuota")
+
+    j = sub.add_parser("jobs", help="Stato degli ultimi job in coda")
+    j.add_argument("--limit", type=int, default=20)
+    return parser
+
+def history_command(args: argparse.Namespace) -> int:
+    since = datetime.strptime(args.since, "%Y-%m-%d").timestamp() if args.since else None
+    t0 = time.perf_counter()
+    rows, total = ScreeningHistory().query(
+        role=args.role, labels=args.label, min_score=args.min_score, search=args.search, since=since,
+        sort=args.sort, descending=not args.asc, limit=args.limit, offset=args.offset,
+    )
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    for row in rows:
+        row["Ultimo screening"] = datetime.fromtimestamp(row["Ultimo screening"]).strftime("%Y-%m-%d %H:%M")
+
+    if args.out:
+        write_rows(rows, args.out)
+    else:
+        score_col = "Best score" if args.role == "Best" else f"{args.role} score"
+        label_col = "Best label" if args.role == "Best" else f"{args.role} label"
+        for row in rows:
+            print("\t".join(str(row.get(c, "")) for c in ("Ultimo screening", score_col, label_col, "Nome e Cognome", "Nome file", "Numero/Numeri telefono")))
+    print(f"{len(rows)} di {total} CV (offset {args.offset}, {elapsed_ms:.1f} ms)", file=sys.stderr)
+    return 0
+
+def rescore_command(args: argparse.Namespace) -> int:
+    history = ScreeningHistory()
+    stale = history.count_stale(CURRENT_SCORE_VERSIONS)
+    if not stale:
+        print(f"Nessun CV da ricalcolare (scoring {SCORE_VERSION}).", file=sys.stderr)
+        return 0
+    print(f"{stale} CV con score superato: ricalcolo (scoring {SCORE_VERSION})...", file=sys.stderr)
+    t0 = time.perf_counter()
+    updated, failed = rescore_history(history, ScreenSettings(concurrency=args.concurrency, score_batch=args.score_batch))
+    print(f"{updated} aggiornati, {failed} falliti in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    # i falliti restano superati: rilanciando si ripetono solo quelli
+    return 3 if failed else 0
+
+def jobs_command(args: argparse.Namespace) -> int:
+    queue = JobQueue()
+    for job in queue.recent(args.limit):
+        created = datetime.fromtimestamp(job["created"]).strftime("%Y-%m-%d %H:%M")
+        print("\t".join([created, job["id"], job["kind"], job["status"], f"{job['completed']}/{job['total']}", job["worker"], job["error"]]))
+    print(f"{queue.live_workers()} worker attivi", file=sys.stderr)
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    error = output_error(args.out) if getattr(args, "out", None) else None
+    if error:
+        print(error, file=sys.stderr)
+        return 2
+
+    if args.command == "history":
+        return history_command(args)
+    if args.command == "jobs":
+        return jobs_command(args)
+
+    if not GROQ_API_KEY:
+        print("GROQ_API_KEY non impostata.", file=sys.stderr)
+        return 2
+
+    if args.command == "rescore":
+        return rescore_command(args)
+    if args.command == "worker":
+        try:
+            run_worker(once=args.once, poll=args.poll)
+        except KeyboardInterrupt:
+            pass  # il job in corso torna disponibile dopo APTITUDE_JOB_STALE_S
+        return 0
+
+    settings = ScreenSettings(
+        prefer_cc39=not args.no_cc39,
+        allowed_prefixes=parse_prefixes(args.prefixes),
+        min_extract_conf=args.min_conf,
+        concurrency=args.concurrency,
+        debug=args.debug,
+        prescreen=not args.no_prescreen,
+        prescreen_threshold=args.prescreen_threshold,
+        dedup=not args.no_dedup,
+        fused=args.fused,
+        token_budget=args.token_budget,
+        score_batch=args.score_batch,
+        routing=args.routing,
+        stream=ScreenSettings.stream and not args.no_stream,
+    )
+    with Spool(SUPPORTED_EXTENSIONS) as spool:
+        items = [item for path in args.inputs for item in iter_input_files(path, spool)]
+        if spool.skipped:
+            print("Saltati: " + ", ".join(spool.skipped), file=sys.stderr)
+        if not items:
+            print("Nessun CV trovato negli input.", file=sys.stderr)
+            return 1
+        rows, unreadable = screen_documents(items, settings, history=None if args.no_history else ScreeningHistory())
+    write_rows(rows, args.out)
+
+    print(f"{len(items)} CV, {len(rows)} righe scritte in {args.out}", file=sys.stderr)
+    if unreadable:
+        print("Non letti: " + ", ".join(unreadable), file=sys.stderr)
+    failed = [row["Nome file"] for row in rows if row["Best label"] == GROQ_ERROR_LABEL]
+    if failed:
+        # i CV completati sono in cache: rilanciando si ripetono solo questi
+        print(f"{GROQ_ERROR_LABEL}: " + ", ".join(failed) + " (rilanciare il comando)", file=sys.stderr)
+        return 3
+    return 0
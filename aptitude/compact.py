@@ -0,0 +1,192 @@
+# Compattazione del testo CV prima dell'estrazione Groq.
+#
+# Al posto del taglio cieco cv_text[:16000]: normalizza gli spazi, toglie header/footer
+# ripetuti tra le pagine (PDF: pagine separate da PAGE_BREAK) e righe di rumore OCR, divide il CV in
+# sezioni e riempie un budget di token con le sezioni più rilevanti per i ruoli
+# telefonici. Le sezioni scelte restano nell'ordine originale del CV. L'informativa
+# privacy (titolo dedicato o consenso in coda) è la prima a uscire, e solo oltre il budget.
+
+import os
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from aptitude.reading import PAGE_BREAK
+from aptitude.signals import prescreen_score, scan_signals
+
+CHARS_PER_TOKEN = 4  # stima prudente per testi latini (niente tokenizer locale)
+DEFAULT_TOKEN_BUDGET = int(os.getenv("APTITUDE_CV_TOKEN_BUDGET", "3000"))
+COMPACT_VERSION = "2"  # da incrementare se cambia l'output (entra nella chiave cache)
+OMITTED_MARK = "[...]"
+
+# Titoli di sezione (inizio riga) -> tipo di sezione
+SECTION_HEADINGS = {
+    "experience": [
+        "esperienza", "esperienze", "esperienze lavorative", "esperienza professionale", "work experience",
+        "experience", "employment", "professional experience", "experiencia", "berufserfahrung", "erfahrung",
+    ],
+    "skills": [
+        "competenze", "capacità", "skills", "abilità", "conoscenze informatiche", "competencias",
+        "habilidades", "kenntnisse", "fähigkeiten",
+    ],
+    "profile": ["profilo", "profile", "summary", "sommario", "chi sono", "about me", "perfil", "profil", "obiettivo"],
+    "languages": ["lingue", "languages", "conoscenze linguistiche", "idiomas", "sprachen"],
+    "education": ["formazione", "istruzione", "education", "studi", "titolo di studio", "educación", "formación", "ausbildung"],
+    "hobby": ["hobby", "interessi", "tempo libero", "interests", "aficiones", "intereses", "interessen"],
+    "privacy": ["privacy", "autorizzo", "consenso al trattamento", "datenschutz"],
+}
+# Peso base per tipo (le esperienze telefoniche contano più di tutto il resto)
+SECTION_WEIGHTS = {
+    "experience": 3,
+    "skills": 2,
+    "profile": 1,
+    "languages": 1,
+    "other": 0,
+    "education": 0,
+    "hobby": -3,
+}
+
+_PRIVACY_RE = re.compile(
+    r"trattamento dei (?:miei )?dati|d\.?\s?lgs\.?\s?(?:n\.?\s?)?196|gdpr|2016/679|679/2016|"
+    r"regolamento \(?ue\)?|personal data|datos personales|datenschutz",
+    re.IGNORECASE,
+)
+_HEADING_RE = re.compile(
+    r"^(?P<h>" + "|".join(
+        sorted((re.escape(h) for hs in SECTION_HEADINGS.values() for h in hs), key=len, reverse=True)
+    ) + r")\b",
+    re.IGNORECASE,
+)
+_HEADING_KIND = {h: kind for kind, hs in SECTION_HEADINGS.items() for h in hs}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def normalize_lines(text: str) -> List[str]:
+    """Spazi normalizzati, righe di rumore (OCR) eliminate, al massimo una riga vuota consecutiva."""
+    lines: List[str] = []
+    for line in (text or "").replace("\r", "\n").split("\n"):
+        line = re.sub(r"[ \t\u00a0\u200b]+", " ", line).strip()
+        if line:
+            alnum = sum(ch.isalnum() for ch in line)
+            if alnum < 2 or (len(line) > 3 and alnum / len(line) < 0.4):
+                continue
+        elif not lines or not lines[-1]:
+            continue
+        lines.append(line)
+    while lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+def drop_page_edges(pages: List[List[str]], edge: int = 3) -> List[str]:
+    """
+    Toglie header/footer ripetuti: righe tra le prime/ultime `edge` di una pagina che si
+    ripetono (numeri esclusi, es. "Pagina 2 di 3") ai bordi di almeno un'altra pagina.
+    Sulla prima pagina restano (spesso contengono il nome). Ritorna le righe concatenate.
+    """
+    def key(line: str) -> str:
+        return re.sub(r"\d+", "#", line.lower())
+
+    def edges(lines: List[str]) -> List[int]:
+        idx = [i for i, l in enumerate(lines) if l]
+        return sorted(set(idx[:edge] + idx[-edge:]))
+
+    pages_with = Counter(k for page in pages for k in {key(page[i]) for i in edges(page)})
+    out: List[str] = []
+    for n, page in enumerate(pages):
+        drop = set() if n == 0 else {i for i in edges(page) if pages_with[key(page[i])] >= 2}
+        if out and out[-1]:
+            out.append("")
+        out.extend(l for i, l in enumerate(page) if i not in drop)
+    return out
+
+def heading_kind(line: str) -> Optional[str]:
+    """Tipo di sezione se la riga è un titolo, altrimenti None."""
+    if not line or len(line) > 40:
+        return None
+    m = _HEADING_RE.match(line)
+    if m:
+        return _HEADING_KIND.get(m.group("h").lower(), "other")
+    letters = [ch for ch in line if ch.isalpha()]
+    if len(letters) >= 4 and all(ch.isupper() for ch in letters) and len(line.split()) <= 5:
+        return "other"
+    return None
+
+def trailing_consent(lines: List[str]) -> int:
+    """Indice della prima riga del consenso privacy in coda al CV (len(lines) se assente)."""
+    start = len(lines)
+    for i in range(len(lines) - 1, -1, -1):
+        if not lines[i]:
+            continue
+        if heading_kind(lines[i]) is not None or not _PRIVACY_RE.search(lines[i]):
+            break
+        start = i
+    return start
+
+def split_sections(lines: List[str]) -> List[Tuple[str, List[str]]]:
+    """
+    [(tipo, righe)]: la prima sezione ("header") contiene nome e contatti.
+    "privacy" solo per un titolo privacy o per il consenso in coda; una riga che cita i
+    dati personali in mezzo al CV (es. un'esperienza GDPR) resta nella sua sezione.
+    """
+    consent_from = trailing_consent(lines)
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+    for i, line in enumerate(lines):
+        kind = heading_kind(line)
+        if kind is None and line:
+            in_privacy = sections[-1][0] == "privacy"
+            if i >= consent_from and not in_privacy:
+                kind = "privacy"
+            elif in_privacy and i < consent_from and not _PRIVACY_RE.search(line):
+                kind = "other"  # sotto un titolo privacy escono solo le righe dell'informativa
+        if kind is not None:
+            sections.append((kind, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(kind, body) for kind, body in sections if any(body)]
+
+def section_priority(kind: str, text: str) -> int:
+    return SECTION_WEIGHTS.get(kind, 0) + prescreen_score(text, scan_signals(text))
+
+def compact_cv(text: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Testo CV ripulito e ridotto a ~token_budget token, con le sezioni più rilevanti."""
+    sections = [
+        (kind, "\n".join(body).strip())
+        for kind, body in split_sections(drop_page_edges([normalize_lines(page) for page in (text or "").split(PAGE_BREAK)]))
+    ]
+    budget = max(1, token_budget) * CHARS_PER_TOKEN
+    if sum(len(body) + 2 for _, body in sections) <= budget:
+        return "\n\n".join(body for _, body in sections)
+    # oltre il budget l'informativa privacy esce per prima (non porta segnali per lo scoring)
+    sections = [(kind, body) for kind, body in sections if kind != "privacy"]
+    if sum(len(body) + 2 for _, body in sections) <= budget:
+        return "\n\n".join(body for _, body in sections)
+
+    # Prima sezione (nome, contatti) sempre inclusa, poi per rilevanza (a parità, l'ordine del CV)
+    order = sorted(
+        range(len(sections)),
+        key=lambda i: (i != 0, -section_priority(*sections[i]), i),
+    )
+    chosen = {}
+    left = budget
+    for i in order:
+        body = sections[i][1]
+        if len(body) + 2 <= left:
+            chosen[i] = body
+        elif left >= 300:
+            # sezione troppo lunga: la tagliamo a fine riga e il budget è esaurito
+            cut = body[:left - len(OMITTED_MARK) - 3]
+            cut = cut[:cut.rfind("\n")] if "\n" in cut else cut
+            chosen[i] = cut.rstrip() + "\n" + OMITTED_MARK
+        else:
+            continue
+        left -= len(chosen[i]) + 2
+
+    parts: List[str] = []
+    for i in range(len(sections)):
+        if i in chosen:
+            parts.append(chosen[i])
+        elif not parts or parts[-1] != OMITTED_MARK:
+            parts.append(OMITTED_MARK)
+    return "\n\n".join(parts)
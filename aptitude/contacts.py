@@ -0,0 +1,109 @@
+# Contatti e nome candidato (euristiche deterministiche, senza LLM)
+
+import re
+from typing import List, Optional
+
+# ===================== EMAIL / TELEFONI =====================
+def extract_email(text: str) -> str:
+    m = re.search(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", text or "")
+    return m.group(0) if m else ""
+
+def normalize_phone_candidate(raw: str) -> str:
+    s = (raw or "").strip()
+    s = re.sub(r"[^\d+]", "", s)
+    s = re.sub(r"^\+{2,}", "+", s)
+    return s
+
+def parse_prefixes(prefixes_str: str) -> List[str]:
+    return [p.strip() for p in (prefixes_str or "").split(",") if p.strip()]
+
+def looks_like_italian_national(num_digits: str) -> bool:
+    return len(num_digits) == 10 and num_digits.startswith("3")
+
+def extract_phones(text: str, prefer_cc39_if_missing: bool = True, allowed_prefixes: Optional[List[str]] = None) -> List[str]:
+    """allowed_prefixes vuoto/None = accetta tutti i prefissi internazionali."""
+    t = text or ""
+    accept_all = not allowed_prefixes
+    found: List[str] = []
+    seen = set()
+
+    # 1) numeri con +
+    for m in re.findall(r"(\+\d[0-9\s().-]{7,20}\d)", t):
+        cand = normalize_phone_candidate(m)
+        digits = re.sub(r"\D", "", cand)
+        if not digits:
+            continue
+        if 8 <= len(digits) <= 15:
+            if not accept_all and not any(cand.startswith(p) for p in allowed_prefixes):
+                continue
+            if cand not in seen:
+                seen.add(cand)
+                found.append(cand)
+
+    # 2) numeri senza + (euristiche)
+    for m in re.findall(r"(?<!\+)(?:\b\d[\d\s().-]{7,20}\d\b)", t):
+        cand = re.sub(r"[^\d]", "", m)
+        if not cand or len(cand) < 9 or len(cand) > 12:
+            continue
+        if len(cand) == 8 and cand.startswith(("19", "20")):
+            continue
+
+        if prefer_cc39_if_missing and looks_like_italian_national(cand):
+            out = "+39" + cand
+        else:
+            out = cand
+
+        if out.startswith("+") and (not accept_all) and (not any(out.startswith(p) for p in allowed_prefixes)):
+            continue
+
+        if out not in seen:
+            seen.add(out)
+            found.append(out)
+
+    return found
+
+# ===================== NAME EXTRACTION (fallback) =====================
+def extract_name_fallback(text: str) -> str:
+    lines = [l.strip() for l in (text or "").splitlines() if l.strip()]
+    bad_tokens = [
+        "work experience", "esperienza lavorativa", "esperienze lavorative",
+        "esperienza professionale", "professional experience",
+        "informazioni personali", "dati personali", "personal information",
+        "curriculum vitae", "curriculum", "profile", "profilo",
+        "education", "istruzione", "formazione",
+    ]
+    for l in lines[:25]:
+        low = l.lower()
+        if any(b in low for b in bad_tokens):
+            continue
+        if any(ch.isdigit() for ch in l):
+            continue
+        parts = l.split()
+        if 2 <= len(parts) <= 4:
+            return l
+    return ""
+
+def guess_from_email(email: str) -> str:
+    if not email:
+        return ""
+    nick = re.sub(r"[\d_.-]+", " ", email.split("@")[0])
+    p = [x for x in nick.split() if len(x) > 1]
+    return f"{p[0].capitalize()} {p[1].capitalize()}" if len(p) >= 2 else ""
+
+def clean_name(n: str) -> str:
+    p = [
+        re.sub(r"\d", "", x)
+        for x in (n or "").split()
+        if x.lower() not in {"cv", "profilo", "profile", "mr", "sig", "sig.", "dr", "dott", "dott."}
+    ]
+    return " ".join(x.capitalize() for x in p[:3]) if len(p) >= 2 else ""
+
+def resolve_fullname(name: str, surname: str, text: str, email: str) -> str:
+    for v in [
+        clean_name(f"{name} {surname}".strip()),
+        clean_name(extract_name_fallback(text)),
+        clean_name(guess_from_email(email)),
+    ]:
+        if v:
+            return v
+    return ""
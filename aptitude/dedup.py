@@ -0,0 +1,122 @@
+# Rilevamento CV quasi duplicati (stesso CV in PDF + DOCX, versioni ritoccate, ...).
+#
+# MinHash su shingle di parole + LSH a bande: ogni testo viene confrontato solo con i
+# candidati che condividono almeno una banda, quindi il raggruppamento di un batch è
+# lineare nel numero di CV (niente confronti a coppie O(n²)).
+
+import re
+import asyncio
+import hashlib
+from typing import Dict, Any, List, Optional, Set
+
+import numpy as np
+
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS = 8  # 8 bande x 8 righe: soglia LSH ~0.77 di Jaccard
+DEFAULT_DEDUP_THRESHOLD = 0.8
+
+_PRIME = np.uint64(4294967311)  # primo > 2^32
+_rng = np.random.RandomState(86)
+_A = _rng.randint(1, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """Hash a 32 bit degli shingle di k parole (testo normalizzato: minuscole, solo parole)."""
+    words = _WORD_RE.findall((text or "").lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    if len(words) < k:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i : i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    hv = shingle_hashes(text)
+    if hv.size == 0:
+        return None
+    # (a*x + b) mod p per ogni permutazione: a,b < 2^31 e x < 2^32, nessun overflow in uint64
+    return ((np.outer(_A, hv) + _B[:, None]) % _PRIME).min(axis=1)
+
+def estimated_jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    return float(np.mean(sig_a == sig_b))
+
+
+class NearDuplicateIndex:
+    """
+    Indice LSH incrementale. add() ritorna la chiave del rappresentante del gruppo
+    se il testo è un quasi duplicato di uno già visto, altrimenti None (nuovo gruppo).
+    """
+
+    def __init__(self, threshold: float = DEFAULT_DEDUP_THRESHOLD, bands: int = BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self._buckets: List[Dict[bytes, List[Any]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Any, np.ndarray] = {}
+        self._representative: Dict[Any, Any] = {}
+
+    def add(self, key: Any, text: str) -> Optional[Any]:
+        sig = minhash_signature(text)
+        if sig is None:
+            return None
+
+        candidates: Set[Any] = set()
+        band_keys = [sig[b * self.rows : (b + 1) * self.rows].tobytes() for b in range(self.bands)]
+        for bucket, bk in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(bk, ()))
+
+        rep = None
+        best = 0.0
+        for other in candidates:
+            j = estimated_jaccard(sig, self._signatures[other])
+            if j >= self.threshold and j > best:
+                best, rep = j, self._representative[other]
+
+        self._signatures[key] = sig
+        self._representative[key] = rep if rep is not None else key
+        for bucket, bk in zip(self._buckets, band_keys):
+            bucket.setdefault(bk, []).append(key)
+        return rep
+
+
+class BatchDedup:
+    """Dedup dentro un batch async: i duplicati attendono il risultato del rappresentante."""
+
+    def __init__(self, threshold: float = DEFAULT_DEDUP_THRESHOLD):
+        self.index = NearDuplicateIndex(threshold)
+        self._results: Dict[int, asyncio.Future] = {}
+
+    def _future(self, idx: int) -> asyncio.Future:
+        if idx not in self._results:
+            self._results[idx] = asyncio.get_running_loop().create_future()
+        return self._results[idx]
+
+    def claim(self, idx: int, text: str) -> Optional[int]:
+        """Registra il testo del file idx; ritorna l'indice del rappresentante se è un duplicato."""
+        return self.index.add(idx, text)
+
+    async def wait(self, idx: int) -> Dict[str, Any]:
+        return await asyncio.shield(self._future(idx))
+
+    def resolve(self, idx: int, res: Dict[str, Any]) -> None:
+        fut = self._future(idx)
+        if not fut.done():
+            fut.set_result(res)
+
+    def fail(self, idx: int, exc: BaseException) -> None:
+        fut = self._future(idx)
+        if fut.done():
+            return
+        if isinstance(exc, asyncio.CancelledError):
+            fut.cancel()
+        else:
+            fut.set_exception(exc)
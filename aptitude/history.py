@@ -0,0 +1,246 @@
+# Storico screening persistente: un record per CV (hash del contenuto) su SQLite in WAL.
+#
+# Le colonne filtrate/ordinate (score per ruolo, label, data, hash) sono colonne vere con
+# indice; il resto (riga tabella completa, JSON estratto e score) è serializzato in JSON.
+# Rianalizzare lo stesso file aggiorna il record e la data di ultimo screening.
+# Estrazione e score portano il tag della versione (modello + prompt) che li ha prodotti:
+# dopo una modifica dello scoring i record superati si ricalcolano senza rileggere i file.
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from aptitude.cache import DEFAULT_CACHE_DIR
+
+# Vista ruolo (come nei filtri UI) -> (colonna score, colonna label)
+ROLE_COLUMNS = {
+    "Best": ("best_score", "best_label"),
+    "Inbound": ("inbound_score", "inbound_label"),
+    "Outbound": ("outbound_score", "outbound_label"),
+    "Appoint": ("appoint_score", "appoint_label"),
+}
+SORT_COLUMNS = ("score", "last_seen", "first_seen")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    content_hash TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    full_name TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT '',
+    phones TEXT NOT NULL DEFAULT '',
+    best_score INTEGER NOT NULL,
+    best_label TEXT NOT NULL,
+    inbound_score INTEGER NOT NULL,
+    inbound_label TEXT NOT NULL,
+    outbound_score INTEGER NOT NULL,
+    outbound_label TEXT NOT NULL,
+    appoint_score INTEGER NOT NULL,
+    appoint_label TEXT NOT NULL,
+    extraction_conf REAL NOT NULL,
+    read_reason TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    row_json TEXT NOT NULL,
+    extracted_json TEXT NOT NULL,
+    scored_json TEXT NOT NULL,
+    extract_version TEXT NOT NULL DEFAULT '',
+    score_version TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_best ON candidates(best_score DESC);
+CREATE INDEX IF NOT EXISTS idx_candidates_inbound ON candidates(inbound_score DESC);
+CREATE INDEX IF NOT EXISTS idx_candidates_outbound ON candidates(outbound_score DESC);
+CREATE INDEX IF NOT EXISTS idx_candidates_appoint ON candidates(appoint_score DESC);
+CREATE INDEX IF NOT EXISTS idx_candidates_label ON candidates(best_label, best_score DESC);
+CREATE INDEX IF NOT EXISTS idx_candidates_last_seen ON candidates(last_seen DESC);
+CREATE INDEX IF NOT EXISTS idx_candidates_first_seen ON candidates(first_seen DESC);
+"""
+_INDEXES_V2 = """
+CREATE INDEX IF NOT EXISTS idx_candidates_score_version ON candidates(score_version);
+"""
+# Colonne aggiunte dopo la prima versione dello schema (ALTER TABLE sui file esistenti)
+_ADDED_COLUMNS = {
+    "extract_version": "TEXT NOT NULL DEFAULT ''",
+    "score_version": "TEXT NOT NULL DEFAULT ''",
+}
+PRESCREEN_VERSION = "prescreen"  # score del pre-screen locale: nessuna estrazione da ricalcolare
+LEGACY_VERSION = "legacy"  # record precedenti alle versioni: modalità (fused o due stadi) non ricostruibile
+_PRESCREEN_LABEL = "Bassa (pre-screen)"  # come pipeline.PRESCREEN_LABEL (qui senza import circolare)
+# Record scritti prima delle colonne di versione (score_version vuota): il pre-screen si
+# riconosce dalla label, gli altri restano fuori dal rescore (si aggiornano rianalizzando il file)
+_BACKFILL = (
+    ("UPDATE candidates SET score_version = ? WHERE score_version = '' AND best_label = ?", (PRESCREEN_VERSION, _PRESCREEN_LABEL)),
+    ("UPDATE candidates SET extract_version = ?, score_version = ? WHERE score_version = ''", (LEGACY_VERSION, LEGACY_VERSION)),
+)
+
+
+def _score_values(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Colonne indicizzate score/label per ruolo dalla riga di build_row."""
+    values: Dict[str, Any] = {}
+    for role, (score_col, label_col) in ROLE_COLUMNS.items():
+        values[score_col] = int(row.get(f"{role} score", 0) or 0)
+        values[label_col] = row.get(f"{role} label", "")
+    return values
+
+
+class ScreeningHistory:
+    """Storico dei CV analizzati (app e CLI condividono lo stesso file)."""
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or os.path.join(DEFAULT_CACHE_DIR, "history.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        existing = {r["name"] for r in self._conn.execute("PRAGMA table_info(candidates)")}
+        for col, decl in _ADDED_COLUMNS.items():
+            if col not in existing:
+                self._conn.execute(f"ALTER TABLE candidates ADD COLUMN {col} {decl}")
+        self._conn.executescript(_INDEXES_V2)
+        for sql, params in _BACKFILL:
+            self._conn.execute(sql, params)
+
+    def record(self, content_hash: str, res: Dict[str, Any], row: Dict[str, Any], when: Optional[float] = None) -> None:
+        """Salva (o aggiorna) il CV. row: riga di build_row; la colonna "Read" non viene salvata."""
+        when = time.time() if when is None else when
+        stored = {k: v for k, v in row.items() if k != "Read" and not k.startswith("_debug")}
+        values = {
+            "content_hash": content_hash,
+            "file_name": row.get("Nome file", ""),
+            "full_name": row.get("Nome e Cognome", "") or "",
+            "email": (res.get("extracted", {}).get("candidate", {}) or {}).get("email", "") or res.get("email_fb", "") or "",
+            "phones": row.get("Numero/Numeri telefono", "") or "",
+            **_score_values(row),
+            "extraction_conf": float(row.get("Confidence estrazione", 0.0) or 0.0),
+            "read_reason": res.get("read_reason", ""),
+            "first_seen": when,
+            "last_seen": when,
+            "row_json": json.dumps(stored, ensure_ascii=False),
+            "extracted_json": json.dumps(res.get("extracted", {}), ensure_ascii=False),
+            "scored_json": json.dumps(res.get("scored", {}), ensure_ascii=False),
+            "extract_version": res.get("extract_version", ""),
+            "score_version": res.get("score_version", ""),
+        }
+        cols = list(values)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c not in ("content_hash", "first_seen"))
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO candidates ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)}) "
+                f"ON CONFLICT(content_hash) DO UPDATE SET {updates}",
+                [values[c] for c in cols],
+            )
+
+    def query(
+        self,
+        role: str = "Best",
+        labels: Optional[Sequence[str]] = None,
+        min_score: int = 0,
+        search: str = "",
+        since: Optional[float] = None,
+        sort: str = "score",
+        descending: bool = True,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Pagina di risultati + totale dei record che rispettano i filtri.
+        Righe: come build_row (senza "Read") con "Hash" e "Ultimo screening" (epoch).
+        """
+        score_col, label_col = ROLE_COLUMNS.get(role, ROLE_COLUMNS["Best"])
+        where = [f"{score_col} >= ?"]
+        params: List[Any] = [int(min_score)]
+        if labels is not None:
+            if not labels:
+                return [], 0
+            where.append(f"{label_col} IN ({', '.join('?' for _ in labels)})")
+            params.extend(labels)
+        if search.strip():
+            where.append("(full_name LIKE ? OR file_name LIKE ?)")
+            q = f"%{search.strip()}%"
+            params.extend([q, q])
+        if since is not None:
+            where.append("last_seen >= ?")
+            params.append(float(since))
+        order = score_col if sort == "score" else sort if sort in SORT_COLUMNS else score_col
+        sql_where = " AND ".join(where)
+        direction = "DESC" if descending else "ASC"
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM candidates WHERE {sql_where}", params).fetchone()[0]
+            cur = self._conn.execute(
+                f"SELECT content_hash, last_seen, row_json FROM candidates WHERE {sql_where} "
+                f"ORDER BY {order} {direction}, last_seen DESC LIMIT ? OFFSET ?",
+                params + [int(limit), int(offset)],
+            )
+            rows = []
+            for r in cur.fetchall():
+                row = json.loads(r["row_json"])
+                row["Hash"] = r["content_hash"]
+                row["Ultimo screening"] = r["last_seen"]
+                rows.append(row)
+        return rows, int(total)
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Record completo (JSON estratto e score inclusi) per hash del contenuto."""
+        with self._lock:
+            r = self._conn.execute("SELECT * FROM candidates WHERE content_hash = ?", (content_hash,)).fetchone()
+        if r is None:
+            return None
+        out = dict(r)
+        for k in ("row_json", "extracted_json", "scored_json"):
+            out[k[:-5]] = json.loads(out.pop(k))
+        return out
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0])
+
+    # ---- rescore ----
+    @staticmethod
+    def _stale_where(score_versions: Sequence[str]) -> str:
+        return (
+            f"score_version NOT IN ({', '.join('?' for _ in score_versions)}) "
+            f"AND score_version NOT IN ('{PRESCREEN_VERSION}', '{LEGACY_VERSION}') AND extract_version NOT LIKE 'fused-%'"
+        )
+
+    def count_stale(self, score_versions: Sequence[str]) -> int:
+        """CV con estrazione salvata e score prodotto da una versione dello scoring non più corrente."""
+        with self._lock:
+            return int(self._conn.execute(f"SELECT COUNT(*) FROM candidates WHERE {self._stale_where(score_versions)}", list(score_versions)).fetchone()[0])
+
+    def stale_scores(self, score_versions: Sequence[str], after: str = "", limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Pagina (per hash, dopo `after`) dei record da ricalcolare: hash, riga ed estrazione.
+        I CV fused si escludono: la loro estrazione viene da un prompt diverso; restano fuori
+        anche i pre-screen (nessuna estrazione) e i record legacy (modalità non nota).
+        """
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT content_hash, row_json, extracted_json FROM candidates "
+                f"WHERE {self._stale_where(score_versions)} AND content_hash > ? ORDER BY content_hash LIMIT ?",
+                [*score_versions, after, int(limit)],
+            )
+            return [
+                {"content_hash": r["content_hash"], "row": json.loads(r["row_json"]), "extracted": json.loads(r["extracted_json"])}
+                for r in cur.fetchall()
+            ]
+
+    def update_score(self, content_hash: str, scored: Dict[str, Any], row: Dict[str, Any], score_version: str) -> None:
+        """Sostituisce score e colonne derivate; estrazione e date di screening restano."""
+        values = {
+            **_score_values(row),
+            "row_json": json.dumps(row, ensure_ascii=False),
+            "scored_json": json.dumps(scored, ensure_ascii=False),
+            "score_version": score_version,
+        }
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE candidates SET {', '.join(f'{c} = ?' for c in values)} WHERE content_hash = ?",
+                [*values.values(), content_hash],
+            )
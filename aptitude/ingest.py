@@ -0,0 +1,290 @@
+# Ingestione in streaming di upload grandi e archivi zip/tar (anche annidati).
+#
+# Ogni file o membro d'archivio viene copiato a blocchi su un file temporaneo (l'hash si
+# calcola durante la copia): in memoria restano solo nome, percorso, dimensione e hash,
+# quindi il picco di memoria non dipende dalla dimensione dell'archivio. I byte vengono
+# riletti solo quando il CV entra in lettura (vedi pipeline.analyze_file_async).
+# Il tipo di ogni membro è riconosciuto dal contenuto: estensioni mancanti o sbagliate
+# negli export dei job board non fanno perdere CV.
+
+import os
+import zlib
+import tarfile
+import zipfile
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple, Union
+
+from aptitude.cache import sha256_hex
+
+SPOOL_DIR = os.getenv("APTITUDE_SPOOL_DIR") or None  # None = cartella temporanea di sistema
+MAX_MEMBER_BYTES = int(float(os.getenv("APTITUDE_MAX_MEMBER_MB", "50")) * 1024 * 1024)  # per documento (non per archivio)
+MAX_SPOOL_BYTES = int(float(os.getenv("APTITUDE_MAX_SPOOL_MB", "4096")) * 1024 * 1024)  # argine zip bomb / disco
+MAX_ARCHIVE_DEPTH = 3
+CHUNK_BYTES = 1024 * 1024
+
+ARCHIVE_EXTENSIONS = ("zip", "tar", "tgz", "gz", "bz2", "xz")
+ARCHIVE_KINDS = ("zip", "tar")
+
+_OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # .doc (Word 97-2003)
+_COMPRESSED_MAGIC = (b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")  # gzip, bz2, xz (tar compressi)
+_TEXT_EXTENSIONS = ("txt", "rtf", "doc", "odt")  # letti come testo best-effort (vedi reading.extract_text)
+_ARCHIVE_ERRORS = (zipfile.BadZipFile, zipfile.LargeZipFile, tarfile.TarError, zlib.error, EOFError, OSError, RuntimeError)
+
+
+# ===================== RICONOSCIMENTO TIPO =====================
+def _looks_like_text(head: bytes) -> bool:
+    if not head.strip() or b"\x00" in head:
+        return False
+    control = sum(1 for b in head if b < 32 and b not in (9, 10, 12, 13))
+    return control / len(head) < 0.05
+
+def sniff_kind(path: str) -> Optional[str]:
+    """Tipo dal contenuto: pdf, docx, odt, rtf, doc, zip, tar, txt (None se non riconosciuto)."""
+    with open(path, "rb") as fh:
+        head = fh.read(4096)
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"{\\rtf"):
+        return "rtf"
+    if head.startswith(_OLE_MAGIC):
+        return "doc"
+    if head.startswith(b"PK"):
+        try:
+            with zipfile.ZipFile(path) as zf:
+                names = set(zf.namelist())
+                if "word/document.xml" in names:
+                    return "docx"
+                if "mimetype" in names and zf.read("mimetype").startswith(b"application/vnd.oasis.opendocument.text"):
+                    return "odt"
+                return "zip"
+        except _ARCHIVE_ERRORS:
+            return None
+    if head[257:262] == b"ustar" or head.startswith(_COMPRESSED_MAGIC):
+        return "tar" if tarfile.is_tarfile(path) else None
+    if _looks_like_text(head):
+        return "txt"
+    return None
+
+def document_name(name: str, kind: Optional[str], extensions: Sequence[str]) -> Optional[str]:
+    """
+    Nome con l'estensione che la lettura userà (None = tipo non supportato).
+    Per i formati binari vale il contenuto; un testo semplice tiene l'estensione del nome
+    se è tra quelle lette come testo (es. .rtf o .doc salvati come testo).
+    """
+    base, dot, ext = name.rpartition(".")
+    ext = ext.lower() if dot else ""
+    stem = base if dot else name
+    if kind is None or (kind == "txt" and ext in _TEXT_EXTENSIONS):
+        return name if ext in extensions else None
+    if kind not in extensions:
+        return None
+    if ext == kind:
+        return name
+    # estensione sbagliata (es. .doc che è un .docx) o mancante
+    return f"{stem}.{kind}" if ext in extensions or ext in ARCHIVE_EXTENSIONS else f"{name}.{kind}"
+
+def _archive_magic(head: bytes) -> bool:
+    """Inizio di un possibile archivio (zip, anche docx/odt, tar, tar compresso)."""
+    return head.startswith(b"PK") or head[257:262] == b"ustar" or head.startswith(_COMPRESSED_MAGIC)
+
+def _hidden(member_name: str) -> bool:
+    parts = member_name.replace("\\", "/").split("/")
+    return any(p.startswith(".") or p == "__MACOSX" for p in parts if p)
+
+
+# ===================== SPOOL =====================
+@dataclass(frozen=True)
+class SpooledCV:
+    """CV su disco: in memoria solo i metadati, i byte si leggono quando servono."""
+
+    name: str
+    path: str
+    size: int
+    content_hash: str
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as fh:
+            return fh.read()
+
+
+Source = Union[bytes, SpooledCV]
+
+def source_bytes(data: Source) -> bytes:
+    return data.read() if isinstance(data, SpooledCV) else data
+
+def source_hash(data: Source) -> str:
+    return data.content_hash if isinstance(data, SpooledCV) else sha256_hex(data)
+
+
+class Spool:
+    """
+    Cartella temporanea con i CV estratti da upload e archivi (rimossa da close()).
+    I file saltati (tipo non supportato, troppo grandi, archivi rotti) finiscono in skipped.
+    """
+
+    def __init__(
+        self,
+        extensions: Sequence[str],
+        root: Optional[str] = None,
+        max_member_bytes: int = MAX_MEMBER_BYTES,
+        max_total_bytes: int = MAX_SPOOL_BYTES,
+    ):
+        self.extensions = tuple(extensions)
+        self.max_member_bytes = max_member_bytes
+        self.max_total_bytes = max_total_bytes
+        self.total_bytes = 0
+        self.skipped: List[str] = []
+        self._tmp = tempfile.TemporaryDirectory(prefix="aptitude-spool-", dir=root or SPOOL_DIR)
+        self.root = self._tmp.name
+
+    def __enter__(self) -> "Spool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._tmp.cleanup()
+        self.total_bytes = 0
+
+    def discard(self, cv: SpooledCV) -> None:
+        """Elimina il file di un CV non più necessario (solo se è nello spool)."""
+        if os.path.dirname(cv.path) == self.root:
+            self._remove(cv.path, cv.size)
+
+    def _remove(self, path: str, size: int) -> None:
+        try:
+            os.remove(path)
+            self.total_bytes -= size
+        except OSError:
+            pass
+
+    def _copy(self, name: str, fh: BinaryIO) -> Optional[Tuple[str, int, str]]:
+        """
+        (percorso, dimensione, sha256) della copia; None se supera lo spazio dello spool o,
+        per un documento, max_member_bytes. La copia si ferma appena il limite è superato:
+        un membro enorme (o una decompression bomb) non riempie lo spool prima del rifiuto.
+        Gli archivi (riconosciuti dai primi byte) hanno come limite lo spazio dello spool:
+        i loro membri vengono poi controllati uno per uno.
+        """
+        fd, path = tempfile.mkstemp(dir=self.root)
+        digest = hashlib.sha256()
+        size = 0
+        limit: Optional[int] = None
+        reason = ""
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = fh.read(CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    if limit is None:
+                        limit = self.max_total_bytes if _archive_magic(chunk) else self.max_member_bytes
+                    size += len(chunk)
+                    if self.total_bytes + size > self.max_total_bytes:
+                        reason = "spazio spool esaurito"
+                        break
+                    if size > limit:
+                        reason = "troppo grande"
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        if reason:
+            os.remove(path)
+            self.skipped.append(f"{name} ({reason})")
+            return None
+        self.total_bytes += size
+        return path, size, digest.hexdigest()
+
+    def add(self, name: str, fh: BinaryIO, depth: int = 0) -> Iterator[SpooledCV]:
+        """Copia su disco uno stream (upload o membro d'archivio); gli archivi vengono espansi."""
+        copied = self._copy(name, fh)
+        if copied is None:
+            return
+        path, size, digest = copied
+        kind = sniff_kind(path)
+        if kind in ARCHIVE_KINDS:
+            try:
+                yield from self._expand(name, path, kind, depth + 1)
+            finally:
+                self._remove(path, size)
+            return
+        doc_name = document_name(name, kind, self.extensions)
+        if doc_name is None or size > self.max_member_bytes:
+            # es. docx/odt oltre il limite (copiati col limite degli archivi: iniziano con "PK")
+            self._remove(path, size)
+            self.skipped.append(f"{name} ({'formato non supportato' if doc_name is None else 'troppo grande'})")
+            return
+        yield SpooledCV(doc_name, path, size, digest)
+
+    def add_path(self, path: str) -> Iterator[SpooledCV]:
+        """
+        File, archivio o cartella (ricorsiva) su disco. I documenti non vengono copiati:
+        il CV punta al file originale; gli archivi vengono espansi senza copiarli.
+        """
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+                for fn in sorted(files):
+                    ext = fn.rsplit(".", 1)[-1].lower() if "." in fn else ""
+                    if not fn.startswith(".") and (ext in self.extensions or ext in ARCHIVE_EXTENSIONS):
+                        yield from self.add_path(os.path.join(root, fn))
+            return
+        name = os.path.basename(path)
+        kind = sniff_kind(path)
+        if kind in ARCHIVE_KINDS:
+            yield from self._expand(name, path, kind, 1)
+            return
+        doc_name = document_name(name, kind, self.extensions)
+        if doc_name is None:
+            self.skipped.append(f"{name} (formato non supportato)")
+            return
+        size = os.path.getsize(path)
+        if size > self.max_member_bytes:
+            self.skipped.append(f"{name} (troppo grande)")
+            return
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(CHUNK_BYTES), b""):
+                digest.update(chunk)
+        yield SpooledCV(doc_name, path, size, digest.hexdigest())
+
+    def _expand(self, name: str, path: str, kind: str, depth: int) -> Iterator[SpooledCV]:
+        """Membri di un archivio, uno alla volta (in memoria al massimo un blocco)."""
+        if depth > MAX_ARCHIVE_DEPTH:
+            self.skipped.append(f"{name} (archivi annidati oltre {MAX_ARCHIVE_DEPTH} livelli)")
+            return
+        try:
+            if kind == "zip":
+                with zipfile.ZipFile(path) as zf:
+                    for info in zf.infolist():
+                        if info.is_dir() or _hidden(info.filename):
+                            continue
+                        member_name = os.path.basename(info.filename.replace("\\", "/"))
+                        # membro corrotto o cifrato: si salta solo quello
+                        try:
+                            with zf.open(info) as member:
+                                yield from self.add(member_name, member, depth)
+                        except _ARCHIVE_ERRORS:
+                            self.skipped.append(f"{member_name} (membro di {name} non leggibile)")
+            else:
+                # "r|*": lettura sequenziale, anche per tar compressi
+                with tarfile.open(path, mode="r|*") as tf:
+                    for info in tf:
+                        if not info.isfile() or _hidden(info.name):
+                            continue
+                        member_name = os.path.basename(info.name)
+                        try:
+                            member = tf.extractfile(info)
+                            if member is not None:
+                                yield from self.add(member_name, member, depth)
+                        except _ARCHIVE_ERRORS:
+                            self.skipped.append(f"{member_name} (membro di {name} non leggibile)")
+        except _ARCHIVE_ERRORS:
+            # archivio illeggibile (indice o stream tar rotti): i membri già letti restano
+            self.skipped.append(f"{name} (archivio non leggibile)")
@@ -0,0 +1,518 @@
+# Coda locale dei job di screening su SQLite (WAL), condivisa da sessioni app e worker.
+#
+# L'app copia i CV nella cartella della coda e registra un job (impostazioni + elenco CV);
+# uno o più processi worker (python -m aptitude worker) prendono i job in ordine di arrivo
+# e fanno lettura, OCR e chiamate Groq, salvando ogni risultato appena pronto. La UI si
+# limita a inviare il job e a leggere l'avanzamento: chiudere o ricaricare la pagina non
+# ferma l'analisi, e più recruiter si dividono gli stessi worker.
+# Lo stato dei job (queued/running/done/failed) sopravvive ai riavvii: un job "running"
+# senza heartbeat (worker terminato) torna disponibile e riparte dai CV non completati.
+# Anche il ricalcolo score dello storico è un job (kind "rescore"): niente CV allegati,
+# l'avanzamento è in completed/total e l'esito in result_json.
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import socket
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from aptitude.cache import DEFAULT_CACHE_DIR, ResultCache
+from aptitude.history import ScreeningHistory
+from aptitude.ingest import SpooledCV
+from aptitude.pipeline import ScreenSettings, analyze_batch_async, record_result, rescore_history_async
+from aptitude.reading import ReadingPool
+
+JOBS_DIR = os.getenv("APTITUDE_JOBS_DIR") or os.path.join(DEFAULT_CACHE_DIR, "jobs")
+JOB_WORKERS = int(os.getenv("APTITUDE_JOB_WORKERS", "1"))  # worker avviati dall'app se mancano (0 = gestiti a parte)
+STALE_AFTER_SECONDS = float(os.getenv("APTITUDE_JOB_STALE_S", "60"))  # senza heartbeat: worker considerato morto
+HEARTBEAT_SECONDS = min(5.0, STALE_AFTER_SECONDS / 3)
+RETENTION_DAYS = float(os.getenv("APTITUDE_JOB_RETENTION_DAYS", "7"))  # job conclusi tenuti nella coda
+POLL_SECONDS = 0.5
+SPAWN_GRACE_SECONDS = 30.0  # un worker appena avviato non ha ancora fatto heartbeat
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+SCREEN = "screen"
+RESCORE = "rescore"  # anche firma del job: un solo ricalcolo aperto alla volta
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'screen',
+    status TEXT NOT NULL,
+    settings_json TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    seq INTEGER NOT NULL DEFAULT 0,
+    worker TEXT NOT NULL DEFAULT '',
+    heartbeat REAL NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    created REAL NOT NULL,
+    finished REAL,
+    result_json TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created);
+CREATE INDEX IF NOT EXISTS idx_jobs_signature ON jobs(signature);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    item_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    seq INTEGER NOT NULL DEFAULT 0,
+    partial_json TEXT,
+    result_json TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_job_items_path ON job_items(path);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    started REAL NOT NULL,
+    heartbeat REAL NOT NULL
+);
+"""
+# Colonne di jobs aggiunte dopo la prima versione dello schema (ALTER TABLE sulle code esistenti)
+_ADDED_COLUMNS = {
+    "kind": "TEXT NOT NULL DEFAULT 'screen'",
+    "result_json": "TEXT",
+}
+
+
+def job_signature(keys: Sequence[str]) -> str:
+    """Firma del job: stessi CV con le stesse impostazioni = stesso job (niente doppioni tra sessioni)."""
+    return hashlib.sha256("\n".join(keys).encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    """Job e risultati per CV su SQLite; i file dei CV restano in JOBS_DIR/files finché servono."""
+
+    def __init__(self, path: Optional[str] = None, files_dir: Optional[str] = None):
+        path = path or os.path.join(JOBS_DIR, "jobs.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.files_dir = files_dir or os.path.join(os.path.dirname(os.path.abspath(path)), "files")
+        os.makedirs(self.files_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        existing = {r["name"] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+        for col, decl in _ADDED_COLUMNS.items():
+            if col not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {col} {decl}")
+
+    def _write(self, statements: Sequence[Tuple[str, Sequence[Any]]]) -> None:
+        """Più scritture in una transazione (BEGIN IMMEDIATE: un solo scrittore tra i processi)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # ---- lato app ----
+    def _store_file(self, cv: SpooledCV) -> str:
+        """Copia (o hard link) del CV nella cartella della coda, per hash: lo spool di sessione è temporaneo."""
+        dest = os.path.join(self.files_dir, cv.content_hash)
+        if not os.path.exists(dest):
+            tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.link(cv.path, tmp)
+            except OSError:
+                shutil.copyfile(cv.path, tmp)
+            os.replace(tmp, dest)
+        return dest
+
+    def submit(self, cvs: Sequence[SpooledCV], keys: Sequence[str], settings: ScreenSettings) -> str:
+        """
+        Accoda i CV (keys: chiave risultato di ogni CV, usata dalla UI) e ritorna l'id del job.
+        Se gli stessi CV con le stesse impostazioni sono già in coda o in analisi si riusa quel job.
+        """
+        signature = job_signature(keys)
+        with self._lock:
+            open_id = self._open_job(signature)
+        if open_id is not None:
+            return open_id
+
+        job_id = uuid.uuid4().hex
+        statements: List[Tuple[str, Sequence[Any]]] = [(
+            "INSERT INTO jobs (id, signature, status, settings_json, total, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, signature, QUEUED, json.dumps(asdict(settings)), len(cvs), time.time()),
+        )]
+        for idx, (cv, key) in enumerate(zip(cvs, keys)):
+            statements.append((
+                "INSERT INTO job_items (job_id, idx, item_key, name, path, size, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, idx, key, cv.name, self._store_file(cv), cv.size, cv.content_hash),
+            ))
+        self._write(statements)
+        return job_id
+
+    def _open_job(self, signature: str) -> Optional[str]:
+        """Job in coda o in corso con questa firma (da chiamare con self._lock)."""
+        r = self._conn.execute(
+            "SELECT id FROM jobs WHERE signature = ? AND status IN (?, ?) ORDER BY created DESC LIMIT 1",
+            (signature, QUEUED, RUNNING),
+        ).fetchone()
+        return r["id"] if r is not None else None
+
+    def submit_rescore(self, settings: ScreenSettings, total: int) -> str:
+        """
+        Accoda il ricalcolo score dello storico (total: CV da ricalcolare, per l'avanzamento).
+        Se un ricalcolo è già aperto (anche da un'altra sessione) si riusa quello: controllo e
+        inserimento nella stessa transazione, due sessioni non lo avviano due volte.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                job_id = self._open_job(RESCORE)
+                if job_id is None:
+                    job_id = uuid.uuid4().hex
+                    self._conn.execute(
+                        "INSERT INTO jobs (id, signature, kind, status, settings_json, total, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (job_id, RESCORE, RESCORE, QUEUED, json.dumps(asdict(settings)), int(total), time.time()),
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return job_id
+
+    def open_rescore(self) -> Optional[str]:
+        """Ricalcolo score in coda o in corso, di qualsiasi sessione; None se non c'è."""
+        with self._lock:
+            return self._open_job(RESCORE)
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            r = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(r) if r is not None else None
+
+    def changes(self, job_id: str, after_seq: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        CV aggiornati dopo after_seq (contatti parziali o risultato) e nuovo seq: la UI
+        rilegge solo le novità a ogni giro di polling.
+        """
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT idx, item_key, seq, partial_json, result_json FROM job_items WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, int(after_seq)),
+            )
+            items = [
+                {
+                    "idx": r["idx"],
+                    "key": r["item_key"],
+                    "seq": r["seq"],
+                    "partial": json.loads(r["partial_json"]) if r["partial_json"] else None,
+                    "result": json.loads(r["result_json"]) if r["result_json"] else None,
+                }
+                for r in cur.fetchall()
+            ]
+        return items, (items[-1]["seq"] if items else after_seq)
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT id, kind, status, total, completed, worker, error, created, finished FROM jobs ORDER BY created DESC LIMIT ?",
+                (int(limit),),
+            )
+            return [dict(r) for r in cur.fetchall()]
+
+    # ---- lato worker ----
+    def claim(self, worker_id: str) -> Optional[str]:
+        """Prende il job più vecchio in coda (o abbandonato da un worker morto); None se non ce ne sono."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                r = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? OR (status = ? AND heartbeat < ?) ORDER BY created LIMIT 1",
+                    (QUEUED, RUNNING, now - STALE_AFTER_SECONDS),
+                ).fetchone()
+                if r is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, heartbeat = ? WHERE id = ?",
+                        (RUNNING, worker_id, now, r["id"]),
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return r["id"] if r is not None else None
+
+    def pending_items(self, job_id: str) -> List[Dict[str, Any]]:
+        """CV del job ancora senza risultato (dopo un riavvio si riparte da questi)."""
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT idx, name, path, size, content_hash FROM job_items WHERE job_id = ? AND result_json IS NULL ORDER BY idx",
+                (job_id,),
+            )
+            return [dict(r) for r in cur.fetchall()]
+
+    def _item_update(self, job_id: str, idx: int, column: str, value: Dict[str, Any], completed: int) -> None:
+        self._write([
+            ("UPDATE jobs SET seq = seq + 1, completed = completed + ?, heartbeat = ? WHERE id = ?", (completed, time.time(), job_id)),
+            (
+                f"UPDATE job_items SET {column} = ?, seq = (SELECT seq FROM jobs WHERE id = ?) WHERE job_id = ? AND idx = ?",
+                (json.dumps(value, ensure_ascii=False), job_id, job_id, idx),
+            ),
+        ])
+
+    def set_partial(self, job_id: str, idx: int, contacts: Dict[str, Any]) -> None:
+        self._item_update(job_id, idx, "partial_json", contacts, 0)
+
+    def set_result(self, job_id: str, idx: int, res: Dict[str, Any]) -> None:
+        self._item_update(job_id, idx, "result_json", res, 1)
+
+    def advance(self, job_id: str, completed: int = 1) -> None:
+        """Avanzamento di un job senza CV (ricalcolo score), letto dalla UI con job()."""
+        self._write([(
+            "UPDATE jobs SET completed = completed + ?, seq = seq + 1, heartbeat = ? WHERE id = ?",
+            (int(completed), time.time(), job_id),
+        )])
+
+    def heartbeat(self, worker_id: str, job_id: Optional[str] = None) -> None:
+        now = time.time()
+        statements: List[Tuple[str, Sequence[Any]]] = [("UPDATE workers SET heartbeat = ? WHERE id = ?", (now, worker_id))]
+        if job_id is not None:
+            statements.append(("UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ?", (now, job_id, worker_id)))
+        self._write(statements)
+
+    def finish(self, job_id: str, error: str = "", result: Optional[Dict[str, Any]] = None) -> None:
+        """Chiude il job (failed se error) e libera i file non più usati da altri job aperti."""
+        self._write([(
+            "UPDATE jobs SET status = ?, error = ?, finished = ?, result_json = ?, seq = seq + 1 WHERE id = ?",
+            (FAILED if error else DONE, error, time.time(), json.dumps(result) if result is not None else None, job_id),
+        )])
+        self._release_files(job_id)
+
+    def _release_files(self, job_id: str) -> None:
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT DISTINCT i.path FROM job_items i WHERE i.job_id = ? AND NOT EXISTS ("
+                " SELECT 1 FROM job_items o JOIN jobs j ON j.id = o.job_id"
+                " WHERE o.path = i.path AND o.job_id != i.job_id AND j.status IN (?, ?))",
+                (job_id, QUEUED, RUNNING),
+            )
+            paths = [r["path"] for r in cur.fetchall()]
+        for path in paths:
+            if os.path.dirname(path) == self.files_dir:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def purge(self, retention_days: float = RETENTION_DAYS) -> int:
+        """Elimina i job conclusi da più di retention_days; ritorna quanti."""
+        cutoff = time.time() - retention_days * 86400
+        with self._lock:
+            ids = [r["id"] for r in self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished < ?", (DONE, FAILED, cutoff),
+            ).fetchall()]
+        for job_id in ids:
+            self._write([
+                ("DELETE FROM job_items WHERE job_id = ?", (job_id,)),
+                ("DELETE FROM jobs WHERE id = ?", (job_id,)),
+            ])
+        return len(ids)
+
+    # ---- registro worker ----
+    def register_worker(self, worker_id: str) -> None:
+        now = time.time()
+        self._write([
+            ("DELETE FROM workers WHERE heartbeat < ?", (now - STALE_AFTER_SECONDS,)),
+            ("INSERT OR REPLACE INTO workers (id, pid, host, started, heartbeat) VALUES (?, ?, ?, ?, ?)",
+             (worker_id, os.getpid(), socket.gethostname(), now, now)),
+        ])
+
+    def unregister_worker(self, worker_id: str) -> None:
+        self._write([("DELETE FROM workers WHERE id = ?", (worker_id,))])
+
+    def live_workers(self) -> int:
+        with self._lock:
+            return int(self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat >= ?", (time.time() - STALE_AFTER_SECONDS,),
+            ).fetchone()[0])
+
+
+# ===================== WORKER =====================
+async def _heartbeat(queue: JobQueue, worker_id: str, job_id: str) -> None:
+    """Heartbeat del job finché il task non viene cancellato (scrittura fuori dall'event loop)."""
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        await asyncio.to_thread(queue.heartbeat, worker_id, job_id)
+
+def run_job(
+    queue: JobQueue,
+    job_id: str,
+    worker_id: str,
+    reading_pool: ReadingPool,
+    result_cache: ResultCache,
+    history: Optional[ScreeningHistory] = None,
+) -> int:
+    """
+    Analizza i CV ancora senza risultato del job (stessa pipeline dell'app e della CLI),
+    salvando contatti parziali, risultati e storico man mano. Ritorna i CV analizzati.
+    Le scritture SQLite girano fuori dall'event loop: parziali e risultati in un thread
+    dedicato (in ordine), l'heartbeat nel pool di default.
+    """
+    job = queue.job(job_id)
+    settings = ScreenSettings(**json.loads(job["settings_json"]))
+    pending = queue.pending_items(job_id)
+    items = [(it["name"], SpooledCV(it["name"], it["path"], it["size"], it["content_hash"])) for it in pending]
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aptitude-job-db")
+    writes: List["asyncio.Future[None]"] = []
+
+    def _save(j: int, res: Dict[str, Any]) -> None:
+        record_result(history, pending[j]["content_hash"], res, settings)
+        queue.set_result(job_id, pending[j]["idx"], res)
+
+    def on_partial(j: int, contacts: Dict[str, Any]) -> None:
+        writes.append(asyncio.get_running_loop().run_in_executor(writer, queue.set_partial, job_id, pending[j]["idx"], contacts))
+
+    def on_result(j: int, res: Dict[str, Any]) -> None:
+        writes.append(asyncio.get_running_loop().run_in_executor(writer, _save, j, res))
+
+    async def _run() -> None:
+        beat = asyncio.ensure_future(_heartbeat(queue, worker_id, job_id))
+        try:
+            await analyze_batch_async(items, settings, reading_pool, result_cache, on_result=on_result, on_partial=on_partial)
+            await asyncio.gather(*writes)
+        finally:
+            beat.cancel()
+            # anche se il job fallisce i risultati già accodati vengono salvati (ripresa senza rifarli)
+            await asyncio.to_thread(writer.shutdown)
+
+    try:
+        asyncio.run(_run())
+    except Exception as exc:
+        queue.finish(job_id, error=f"{type(exc).__name__}: {exc}")
+        raise
+    queue.finish(job_id)
+    return len(items)
+
+def run_rescore_job(queue: JobQueue, job_id: str, worker_id: str, history: ScreeningHistory) -> Tuple[int, int]:
+    """
+    Ricalcolo score dello storico (rescore_history_async) come job: avanzamento per CV nel job,
+    esito {"updated", "failed"} in result_json. Ritorna (aggiornati, falliti). Un job ripreso
+    da un altro worker riparte dai CV ancora da ricalcolare (lo storico è già aggiornato).
+    """
+    job = queue.job(job_id)
+    settings = ScreenSettings(**json.loads(job["settings_json"]))
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aptitude-job-db")
+    writes: List["asyncio.Future[None]"] = []
+
+    def on_result(content_hash: str, row: Optional[Dict[str, Any]]) -> None:
+        writes.append(asyncio.get_running_loop().run_in_executor(writer, queue.advance, job_id))
+
+    async def _run() -> Tuple[int, int]:
+        beat = asyncio.ensure_future(_heartbeat(queue, worker_id, job_id))
+        try:
+            out = await rescore_history_async(history, settings, on_result=on_result)
+            await asyncio.gather(*writes)
+            return out
+        finally:
+            beat.cancel()
+            await asyncio.to_thread(writer.shutdown)
+
+    try:
+        updated, failed = asyncio.run(_run())
+    except Exception as exc:
+        queue.finish(job_id, error=f"{type(exc).__name__}: {exc}")
+        raise
+    queue.finish(job_id, result={"updated": updated, "failed": failed})
+    return updated, failed
+
+def run_worker(queue: Optional[JobQueue] = None, once: bool = False, poll: float = 1.0) -> int:
+    """
+    Ciclo del worker: prende un job alla volta finché ce ne sono (once) o per sempre.
+    Lettura, OCR e chiamate Groq avvengono qui, non nei processi dell'app. Ritorna i job eseguiti.
+    """
+    queue = queue or JobQueue()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    queue.register_worker(worker_id)
+    queue.purge()
+    reading_pool = ReadingPool()
+    result_cache = ResultCache()
+    history = ScreeningHistory()
+    done = 0
+    try:
+        while True:
+            queue.heartbeat(worker_id)
+            job_id = queue.claim(worker_id)
+            if job_id is None:
+                if once:
+                    break
+                time.sleep(poll)
+                continue
+            t0 = time.perf_counter()
+            kind = (queue.job(job_id) or {}).get("kind", SCREEN)
+            try:
+                if kind == RESCORE:
+                    updated, failed = run_rescore_job(queue, job_id, worker_id, history)
+                    summary = f"{updated} score ricalcolati, {failed} falliti"
+                else:
+                    summary = f"{run_job(queue, job_id, worker_id, reading_pool, result_cache, history)} CV"
+            except Exception as exc:
+                # il job resta failed con l'errore; il worker passa al successivo
+                print(f"job {job_id}: {type(exc).__name__}: {exc}", file=sys.stderr, flush=True)
+                continue
+            done += 1
+            print(f"job {job_id}: {summary} in {time.perf_counter() - t0:.1f} s", file=sys.stderr, flush=True)
+    finally:
+        queue.unregister_worker(worker_id)
+        reading_pool.shutdown()
+    return done
+
+
+# ===================== AVVIO WORKER DALL'APP =====================
+_last_spawn = 0.0
+
+def spawn_worker(log_path: Optional[str] = None) -> subprocess.Popen:
+    """Worker in un processo staccato: sopravvive al rerun e al riavvio dell'app."""
+    log_path = log_path or os.path.join(JOBS_DIR, "worker.log")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if os.name == "posix":
+        detach: Dict[str, Any] = {"start_new_session": True}
+    else:
+        detach = {"creationflags": getattr(subprocess, "DETACHED_PROCESS", 0) | getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+    with open(log_path, "ab") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "aptitude", "worker"],
+            cwd=root, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **detach,
+        )
+
+def ensure_workers(queue: JobQueue, count: int = JOB_WORKERS) -> int:
+    """Avvia worker finché quelli vivi sono count (0 = worker gestiti a parte); ritorna quanti ne ha avviati."""
+    global _last_spawn
+    if count <= 0 or time.monotonic() - _last_spawn < SPAWN_GRACE_SECONDS:
+        return 0
+    missing = count - queue.live_workers()
+    for _ in range(missing):
+        spawn_worker()
+    if missing > 0:
+        _last_spawn = time.monotonic()
+    return max(0, missing)
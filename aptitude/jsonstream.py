@@ -0,0 +1,117 @@
+# Parser JSON incrementale per le risposte Groq in streaming.
+#
+# Segue il testo man mano che arriva (stringhe, escape, profondità di annidamento) e
+# decodifica ogni chiave di primo livello appena il suo valore è chiuso: i dati del
+# candidato arrivano alla UI prima della fine della risposta, e lo stream si può chiudere
+# appena l'oggetto (o l'insieme dei campi richiesti) è completo.
+
+import re
+import json
+from typing import Any, Callable, Dict, Optional, Sequence
+
+
+def _loads_lenient(raw: str) -> Any:
+    """json.loads tollerante alle virgole finali (come safe_json_loads_maybe); ValueError se non valido."""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return json.loads(re.sub(r",\s*([}\]])", r"\1", raw.replace("\t", " ")))
+
+
+class IncrementalJSON:
+    """
+    Consumer dei pezzi di testo di una risposta JSON (vedi ResilientGroq.complete(stream_to=...)).
+    feed() ritorna None finché serve altro testo, poi il JSON completo (testo dell'oggetto, o
+    dei soli campi richiesti se sono già tutti arrivati): lo stream può essere chiuso.
+    on_field(chiave, valore) per ogni chiave di primo livello appena decodificata.
+    """
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None, required: Sequence[str] = ()):
+        self.on_field = on_field
+        self.required = tuple(required)
+        self.fields: Dict[str, Any] = {}
+        self._text = ""
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._result: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        return self._result is not None
+
+    def feed(self, chunk: str) -> Optional[str]:
+        if self._result is not None:
+            return self._result
+        self._text += chunk
+        text = self._text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = self._decode_key(text[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+            if self._depth == 0:
+                # testo o ``` prima dell'oggetto
+                if c == "{":
+                    self._start = i
+                    self._depth = 1
+                continue
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = i
+            elif c == ":" and self._depth == 1:
+                self._value_start = i + 1
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._close_value(text, i + 1)  # oggetto/lista chiusi: valore completo
+                elif self._depth == 0:
+                    if self._value_start is not None:
+                        self._close_value(text, i)
+                    self._pos = i + 1
+                    self._result = text[self._start:i + 1]
+                    return self._result
+            elif c == "," and self._depth == 1 and self._value_start is not None:
+                self._close_value(text, i)
+        self._pos = len(text)
+        if self.required and all(k in self.fields for k in self.required):
+            # campi richiesti completi: il resto della generazione non serve
+            self._result = json.dumps(self.fields, ensure_ascii=False)
+        return self._result
+
+    @staticmethod
+    def _decode_key(raw: str) -> Optional[str]:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def _close_value(self, text: str, end: int) -> None:
+        key, raw = self._key, text[self._value_start:end].strip()
+        self._key = None
+        self._value_start = None
+        if key is None or not raw:
+            return
+        try:
+            value = _loads_lenient(raw)
+        except ValueError:
+            return
+        self.fields[key] = value
+        if self.on_field is not None:
+            self.on_field(key, value)
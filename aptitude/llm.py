@@ -0,0 +1,568 @@
+# Chiamate Groq: prompt, costruzione messaggi, parsing robusto (sync + async)
+
+import os
+import re
+import json
+import asyncio
+import textwrap
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, Optional, Sequence, Set, Tuple
+
+from aptitude.compact import DEFAULT_TOKEN_BUDGET, compact_cv, estimate_tokens
+from aptitude.jsonstream import IncrementalJSON
+from aptitude.resilience import ResilientGroq, StreamConsumer
+
+# ===================== CONFIG GROQ =====================
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+GROQ_MODEL_EXTRACT = os.getenv("GROQ_MODEL_EXTRACT", os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"))
+GROQ_MODEL_SCORE = os.getenv("GROQ_MODEL_SCORE", os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"))
+GROQ_MODEL_FAST = os.getenv("GROQ_MODEL_FAST", "llama-3.1-8b-instant")  # CV semplici (vedi routing.py)
+GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "4"))
+GROQ_STREAM = os.getenv("GROQ_STREAM", "1") != "0"  # risposte in streaming (parsing incrementale)
+# Scoring a gruppi: CV per chiamata (1 = una chiamata per CV), token stimati dei JSON estratti
+# in una chiamata e secondi di attesa massima per riempire un gruppo
+GROQ_SCORE_BATCH = int(os.getenv("GROQ_SCORE_BATCH", "1"))
+GROQ_SCORE_BATCH_TOKENS = int(os.getenv("GROQ_SCORE_BATCH_TOKENS", "12000"))
+GROQ_SCORE_BATCH_WAIT = float(os.getenv("GROQ_SCORE_BATCH_WAIT", "1.0"))
+
+@lru_cache(maxsize=1)
+def groq_client() -> Optional[Any]:
+    """Client Groq sincrono, creato (e l'SDK importato) al primo uso; None senza GROQ_API_KEY."""
+    if not GROQ_API_KEY:
+        return None
+    from groq import Groq
+
+    return Groq(api_key=GROQ_API_KEY)
+
+# ===================== UTIL =====================
+def safe_json_loads_maybe(content: str) -> Optional[dict]:
+    """Estrae un JSON da testo (gestisce backticks e testo extra)."""
+    if not content:
+        return None
+    s = content.strip()
+    s = re.sub(r"^```(?:json)?\s*", "", s.strip(), flags=re.IGNORECASE)
+    s = re.sub(r"\s*```$", "", s.strip())
+    start = s.find("{")
+    end = s.rfind("}")
+    if start == -1 or end == -1 or end <= start:
+        return None
+    js = s[start : end + 1]
+    js = js.replace("\t", " ")
+    js = re.sub(r",\s*([}\]])", r"\1", js)
+    try:
+        return json.loads(js)
+    except Exception:
+        return None
+
+def detect_language_hint(text: str) -> str:
+    t = (text or "").lower()
+    if any(w in t for w in ["esperienza", "formazione", "competenze", "lavoro"]):
+        return "it"
+    if any(w in t for w in ["experience", "skills", "education"]):
+        return "en"
+    if any(w in t for w in ["experiencia", "habilidades", "educación"]):
+        return "es"
+    if any(w in t for w in ["erfahrung", "kenntnisse", "ausbildung"]):
+        return "de"
+    return "auto"
+
+# ===================== GROQ PROMPTS =====================
+EXTRACT_SYS = """
+Sei un sistema di ESTRAZIONE dati da CV (italiano/inglese/spagnolo/tedesco).
+Devi estrarre SOLO informazioni che sono SUPPORTATE dal testo del CV.
+
+Regole:
+- Restituisci SOLO un oggetto JSON valido, SENZA testo extra.
+- Se un dato non è presente nel CV, usa stringa vuota, lista vuota o false.
+- Per ogni affermazione importante (telefono strutturato, strumenti, KPI, vincoli) includi EVIDENZE:
+  brevi estratti dal CV (max 220 caratteri).
+- Non inventare aziende, date, numeri, KPI, strumenti.
+
+Schema JSON:
+
+{
+  "schema_version": "2.0",
+  "candidate": {"name": "", "surname": "", "email": "", "phones": []},
+  "extraction": {"language_hint": "it|en|es|de|auto", "confidence": 0.0, "notes": ""},
+  "experience": [
+    {
+      "role": "",
+      "company": "",
+      "start": "",
+      "end": "",
+      "description": "",
+      "is_phone_structured": false,
+      "phone_type": "inbound|outbound|mixed|none",
+      "channels": ["phone","email","chat"],
+      "tools": [],
+      "kpi_signals": [],
+      "evidence": []
+    }
+  ],
+  "skills": {
+    "office_tools": [],
+    "crm_tools": [],
+    "ticketing_tools": [],
+    "contact_center_tools": [],
+    "languages": [],
+    "other": []
+  },
+  "constraints": [{"type": "", "evidence": ""}]
+}
+
+Vincoli:
+- "experience" max 8 voci (più recenti o rilevanti).
+- "is_phone_structured"=true SOLO se segnali chiari: inbound/outbound, call center, campagne, dialer, script, KPI, presa appuntamenti, volumi.
+  Se è solo "contatti telefonici" generico/occasionale, lascialo false.
+"""
+
+_SCORES_SCHEMA = """\
+  "scores": {
+    "inbound_call_center": {
+      "score": 0,
+      "label": "Alta|Media|Bassa",
+      "dimensions": {
+        "customer_orientation": 0,
+        "process_discipline": 0,
+        "stress_kpi_environment": 0,
+        "digital_fluency": 0,
+        "communication_clarity": 0
+      },
+      "reasons": [],
+      "evidence": []
+    },
+    "outbound_telemarketing": {
+      "score": 0,
+      "label": "Alta|Media|Bassa",
+      "dimensions": {
+        "sales_drive": 0,
+        "objection_handling": 0,
+        "kpi_results": 0,
+        "process_discipline": 0,
+        "digital_fluency": 0
+      },
+      "reasons": [],
+      "evidence": []
+    },
+    "appointment_setting": {
+      "score": 0,
+      "label": "Alta|Media|Bassa",
+      "dimensions": {
+        "lead_qualification": 0,
+        "script_process": 0,
+        "kpi_volumes": 0,
+        "crm_usage": 0,
+        "communication_clarity": 0
+      },
+      "reasons": [],
+      "evidence": []
+    }
+  }"""
+
+_SCORE_RULES = """\
+- Ogni dimensione è 0-5 (intero).
+- Score 0-100 deriva da media pesata delle dimensioni.
+- Label: Alta >=75; Media 45-74; Bassa <=44.
+- reasons max 3 frasi brevi in italiano.
+- evidence max 3 estratti, scelti SOLO tra evidenze già presenti nel JSON estratto.
+"""
+
+SCORE_SYS = """
+Sei un sistema di SCORING per ruoli telefonici basato SU JSON estratto (non usare info esterne).
+Produci SOLO JSON valido:
+
+{
+  "schema_version": "2.0",
+""" + _SCORES_SCHEMA + """
+}
+
+Regole:
+""" + _SCORE_RULES
+
+# Scoring a gruppi: stesso schema e stesse regole di SCORE_SYS, ma un solo prompt di sistema
+# per più candidati. La risposta ha una voce per id, validata singolarmente.
+SCORE_BATCH_SYS = """
+Sei un sistema di SCORING per ruoli telefonici basato SU JSON estratti (non usare info esterne).
+Ricevi più candidati, ognuno con un "id" e il proprio JSON estratto: valuta ciascuno SOLO sul suo
+JSON, indipendentemente dagli altri.
+Produci SOLO JSON valido, con una voce in "results" per OGNI id ricevuto:
+
+{
+  "schema_version": "2.0",
+  "results": {
+    "<id>": {
+""" + textwrap.indent(_SCORES_SCHEMA, "    ") + """
+    }
+  }
+}
+
+Regole:
+""" + _SCORE_RULES + """- Le chiavi di "results" sono esattamente gli id ricevuti, senza aggiungerne o ometterne.
+"""
+SCORE_ROLES = ("inbound_call_center", "outbound_telemarketing", "appointment_setting")
+# Chiavi di primo livello attese: arrivate tutte, lo streaming si chiude
+EXTRACT_FIELDS = ("candidate", "extraction", "experience", "skills", "constraints")
+SCORE_FIELDS = ("scores",)
+
+# Modalità fused: estrazione + scoring in una sola risposta. Lo schema di estrazione
+# resta quello di EXTRACT_SYS, con in più la chiave "scores" di SCORE_SYS.
+FUSED_SYS = EXTRACT_SYS + """
+Nello STESSO oggetto JSON aggiungi anche lo SCORING per ruoli telefonici, basato SOLO sui dati
+che hai estratto (non usare info esterne). Chiave aggiuntiva:
+
+{
+""" + _SCORES_SCHEMA + """
+}
+
+Regole scoring:
+""" + _SCORE_RULES
+
+def empty_extract() -> Dict[str, Any]:
+    return {
+        "schema_version": "2.0",
+        "candidate": {"name": "", "surname": "", "email": "", "phones": []},
+        "extraction": {"language_hint": "auto", "confidence": 0.0, "notes": ""},
+        "experience": [],
+        "skills": {
+            "office_tools": [], "crm_tools": [], "ticketing_tools": [],
+            "contact_center_tools": [], "languages": [], "other": []
+        },
+        "constraints": []
+    }
+
+def empty_score() -> Dict[str, Any]:
+    return {
+        "schema_version": "2.0",
+        "scores": {
+            "inbound_call_center": {"score": 0, "label": "Bassa", "dimensions": {}, "reasons": [], "evidence": []},
+            "outbound_telemarketing": {"score": 0, "label": "Bassa", "dimensions": {}, "reasons": [], "evidence": []},
+            "appointment_setting": {"score": 0, "label": "Bassa", "dimensions": {}, "reasons": [], "evidence": []},
+        },
+    }
+
+def extract_messages(cv_text: str, read_conf: float, read_reason: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> List[Dict[str, str]]:
+    snippet = compact_cv(cv_text, token_budget)
+    lang_hint = detect_language_hint(cv_text)
+
+    user_payload = {
+        "text": snippet,
+        "reading": {"method_confidence": read_conf, "method_reason": read_reason, "language_hint": lang_hint},
+    }
+    return [
+        {"role": "system", "content": EXTRACT_SYS},
+        {"role": "user", "content": "Estrai i dati dal CV (testo + meta-lettura):\n" + json.dumps(user_payload, ensure_ascii=False)},
+    ]
+
+def coerce_extract(data: Any) -> Dict[str, Any]:
+    """Normalizza un JSON di estrazione (già decodificato) sullo schema di empty_extract."""
+    out = empty_extract()
+    if isinstance(data, dict):
+        out["schema_version"] = str(data.get("schema_version", "2.0"))
+        out["candidate"] = data.get("candidate", out["candidate"]) if isinstance(data.get("candidate"), dict) else out["candidate"]
+        out["extraction"] = data.get("extraction", out["extraction"]) if isinstance(data.get("extraction"), dict) else out["extraction"]
+        out["experience"] = data.get("experience", out["experience"]) if isinstance(data.get("experience"), list) else out["experience"]
+        out["skills"] = data.get("skills", out["skills"]) if isinstance(data.get("skills"), dict) else out["skills"]
+        out["constraints"] = data.get("constraints", out["constraints"]) if isinstance(data.get("constraints"), list) else out["constraints"]
+
+    if isinstance(out["experience"], list) and len(out["experience"]) > 8:
+        out["experience"] = out["experience"][:8]
+
+    try:
+        c = float(out["extraction"].get("confidence", 0.0))
+        out["extraction"]["confidence"] = max(0.0, min(1.0, c))
+    except Exception:
+        out["extraction"]["confidence"] = 0.0
+
+    return out
+
+def parse_extract(content: str) -> Dict[str, Any]:
+    return coerce_extract(safe_json_loads_maybe(content) or {})
+
+def score_messages(extracted: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SCORE_SYS},
+        {"role": "user", "content": "Esegui scoring usando SOLO questo JSON estratto:\n" + json.dumps(extracted, ensure_ascii=False)},
+    ]
+
+def parse_score(content: str) -> Dict[str, Any]:
+    data = safe_json_loads_maybe(content) or {}
+    if not isinstance(data, dict) or "scores" not in data:
+        return empty_score()
+    return data
+
+def valid_score(scored: Any) -> bool:
+    """True se scored ha tutti i ruoli, ognuno con uno score numerico 0-100."""
+    scores = scored.get("scores") if isinstance(scored, dict) else None
+    if not isinstance(scores, dict):
+        return False
+    for role in SCORE_ROLES:
+        entry = scores.get(role)
+        if not isinstance(entry, dict):
+            return False
+        try:
+            value = float(entry.get("score"))
+        except (TypeError, ValueError):
+            return False
+        if not 0 <= value <= 100:
+            return False
+    return True
+
+def score_batch_messages(batch: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, str]]:
+    candidates = [{"id": cid, "extracted": extracted} for cid, extracted in batch]
+    return [
+        {"role": "system", "content": SCORE_BATCH_SYS},
+        {"role": "user", "content": "Esegui scoring di ogni candidato usando SOLO il suo JSON estratto:\n" + json.dumps({"candidates": candidates}, ensure_ascii=False)},
+    ]
+
+def parse_score_batch(content: str, ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    id -> JSON score (stessa forma di parse_score), None per i candidati mancanti o non validi.
+    Tollera voci senza la chiave "scores" (ruoli direttamente sotto l'id).
+    """
+    data = safe_json_loads_maybe(content)
+    results = data.get("results") if isinstance(data, dict) else None
+    version = str(data.get("schema_version", "2.0")) if isinstance(data, dict) else "2.0"
+    out: Dict[str, Optional[Dict[str, Any]]] = {}
+    for cid in ids:
+        item = results.get(cid) if isinstance(results, dict) else None
+        if isinstance(item, dict) and "scores" not in item and any(r in item for r in SCORE_ROLES):
+            item = {"scores": item}
+        if valid_score(item):
+            out[cid] = {"schema_version": str(item.get("schema_version", version)), "scores": item["scores"]}
+        else:
+            out[cid] = None
+    return out
+
+def fused_messages(cv_text: str, read_conf: float, read_reason: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> List[Dict[str, str]]:
+    messages = extract_messages(cv_text, read_conf, read_reason, token_budget)
+    messages[0] = {"role": "system", "content": FUSED_SYS}
+    return messages
+
+def parse_fused(content: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Separa la risposta fused in (JSON estratto, JSON score), con gli stessi fallback delle due chiamate."""
+    data = safe_json_loads_maybe(content) or {}
+    extracted = coerce_extract(data)
+    if isinstance(data, dict) and isinstance(data.get("scores"), dict):
+        scored = {"schema_version": str(data.get("schema_version", "2.0")), "scores": data["scores"]}
+    else:
+        scored = empty_score()
+    return extracted, scored
+
+def groq_extract(cv_text: str, read_conf: float, read_reason: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> Dict[str, Any]:
+    client = groq_client()
+    if not cv_text or not cv_text.strip() or client is None:
+        return empty_extract()
+    try:
+        resp = client.chat.completions.create(
+            model=GROQ_MODEL_EXTRACT,
+            messages=extract_messages(cv_text, read_conf, read_reason, token_budget),
+            temperature=0.05,
+            max_tokens=1400,
+        )
+        content = (resp.choices[0].message.content or "").strip()
+    except Exception:
+        content = ""
+    return parse_extract(content)
+
+def groq_score(extracted: Dict[str, Any]) -> Dict[str, Any]:
+    client = groq_client()
+    if client is None:
+        return empty_score()
+    try:
+        resp = client.chat.completions.create(
+            model=GROQ_MODEL_SCORE,
+            messages=score_messages(extracted),
+            temperature=0.05,
+            max_tokens=900,
+        )
+        content = (resp.choices[0].message.content or "").strip()
+    except Exception:
+        return empty_score()
+    return parse_score(content)
+
+def groq_extract_score(cv_text: str, read_conf: float, read_reason: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Extract + score in una sola chiamata (modalità fused)."""
+    client = groq_client()
+    if not cv_text or not cv_text.strip() or client is None:
+        return empty_extract(), empty_score()
+    try:
+        resp = client.chat.completions.create(
+            model=GROQ_MODEL_EXTRACT,
+            messages=fused_messages(cv_text, read_conf, read_reason, token_budget),
+            temperature=0.05,
+            max_tokens=2300,
+        )
+        content = (resp.choices[0].message.content or "").strip()
+    except Exception:
+        content = ""
+    return parse_fused(content)
+
+# Versioni async: il client (ResilientGroq su AsyncGroq) va creato dentro l'event loop del
+# batch, perché ogni rerun Streamlit usa un nuovo loop (asyncio.run). Qui gli errori Groq
+# non diventano JSON vuoti: GroqCallError arriva alla pipeline, che marca il CV da ripetere.
+# Con stream=True la risposta passa da IncrementalJSON: on_field(chiave, valore) appena una
+# chiave di primo livello è completa, e la chiamata ritorna appena l'oggetto JSON si chiude.
+def json_stream(on_field: Optional[Callable[[str, Any], None]], required: Sequence[str]) -> Callable[[], StreamConsumer]:
+    return lambda: IncrementalJSON(on_field, required).feed
+
+async def groq_extract_async(
+    client: ResilientGroq,
+    cv_text: str,
+    read_conf: float,
+    read_reason: str,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    model: str = GROQ_MODEL_EXTRACT,
+    stream: bool = GROQ_STREAM,
+    on_field: Optional[Callable[[str, Any], None]] = None,
+) -> Dict[str, Any]:
+    if not cv_text or not cv_text.strip():
+        return empty_extract()
+    content = await client.complete(
+        stream_to=json_stream(on_field, EXTRACT_FIELDS) if stream else None,
+        model=model,
+        messages=extract_messages(cv_text, read_conf, read_reason, token_budget),
+        temperature=0.05,
+        max_tokens=1400,
+    )
+    return parse_extract(content)
+
+async def groq_score_async(client: ResilientGroq, extracted: Dict[str, Any], model: str = GROQ_MODEL_SCORE, stream: bool = GROQ_STREAM) -> Dict[str, Any]:
+    content = await client.complete(
+        stream_to=json_stream(None, SCORE_FIELDS) if stream else None,
+        model=model,
+        messages=score_messages(extracted),
+        temperature=0.05,
+        max_tokens=900,
+    )
+    return parse_score(content)
+
+async def groq_extract_score_async(
+    client: ResilientGroq,
+    cv_text: str,
+    read_conf: float,
+    read_reason: str,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    model: str = GROQ_MODEL_EXTRACT,
+    stream: bool = GROQ_STREAM,
+    on_field: Optional[Callable[[str, Any], None]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    if not cv_text or not cv_text.strip():
+        return empty_extract(), empty_score()
+    content = await client.complete(
+        stream_to=json_stream(on_field, EXTRACT_FIELDS + SCORE_FIELDS) if stream else None,
+        model=model,
+        messages=fused_messages(cv_text, read_conf, read_reason, token_budget),
+        temperature=0.05,
+        max_tokens=2300,
+    )
+    return parse_fused(content)
+
+async def groq_score_batch_async(client: ResilientGroq, batch: List[Tuple[str, Dict[str, Any]]], model: str = GROQ_MODEL_SCORE) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Scoring di più candidati (id, JSON estratto) in una chiamata: id -> score, None se non valido."""
+    content = await client.complete(
+        model=model,
+        messages=score_batch_messages(batch),
+        temperature=0.05,
+        max_tokens=900 * len(batch),
+    )
+    return parse_score_batch(content, [cid for cid, _ in batch])
+
+# ===================== SCORING A GRUPPI =====================
+class ScoreBatcher:
+    """
+    Raccoglie le richieste di scoring dei CV in volo e le invia a gruppi con un solo
+    SCORE_BATCH_SYS: un gruppo parte quando ha max_size CV, quando i JSON estratti superano
+    max_tokens (stima) o dopo `wait` secondi dal primo CV in attesa.
+    I candidati assenti o non validi nella risposta passano a una chiamata singola
+    (groq_score_async); un GroqCallError sulla chiamata di gruppo arriva a tutti i CV del gruppo.
+    Ogni chiamata (di gruppo o singola) occupa uno slot di sem. Un batcher per modello di scoring.
+    """
+
+    def __init__(
+        self,
+        client: ResilientGroq,
+        sem: asyncio.Semaphore,
+        max_size: int = GROQ_SCORE_BATCH,
+        max_tokens: int = GROQ_SCORE_BATCH_TOKENS,
+        wait: float = GROQ_SCORE_BATCH_WAIT,
+        model: str = GROQ_MODEL_SCORE,
+        stream: bool = GROQ_STREAM,
+    ):
+        self.client = client
+        self.sem = sem
+        self.model = model
+        self.stream = stream
+        self.max_size = max(1, max_size)
+        self.max_tokens = max_tokens
+        self.wait = wait
+        self.calls = 0  # chiamate di gruppo
+        self.fallbacks = 0  # chiamate singole per risposte di gruppo incomplete
+        self._pending: List[Tuple[str, Dict[str, Any], asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._seq = 0
+
+    async def score(self, extracted: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        tokens = estimate_tokens(json.dumps(extracted, ensure_ascii=False))
+        if self._pending and self._pending_tokens + tokens > self.max_tokens:
+            self._flush()
+        self._seq += 1
+        fut = loop.create_future()
+        self._pending.append((f"c{self._seq}", extracted, fut))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.max_size or self._pending_tokens >= self.max_tokens:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.wait, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _single(self, extracted: Dict[str, Any], fut: asyncio.Future) -> None:
+        try:
+            async with self.sem:
+                scored = await groq_score_async(self.client, extracted, self.model, self.stream)
+        except BaseException as exc:
+            if not fut.done():
+                fut.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        if not fut.done():
+            fut.set_result(scored)
+
+    async def _run(self, batch: List[Tuple[str, Dict[str, Any], asyncio.Future]]) -> None:
+        if len(batch) == 1:
+            # da solo (gruppo non riempito o JSON oltre il budget): prompt standard
+            await self._single(batch[0][1], batch[0][2])
+            return
+        try:
+            async with self.sem:
+                self.calls += 1
+                results = await groq_score_batch_async(self.client, [(cid, extracted) for cid, extracted, _ in batch], self.model)
+        except BaseException as exc:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        missing = []
+        for cid, extracted, fut in batch:
+            if results.get(cid) is None:
+                missing.append((extracted, fut))
+            elif not fut.done():
+                fut.set_result(results[cid])
+        # Risposta malformata o incompleta: chiamate singole solo per i CV mancanti
+        self.fallbacks += len(missing)
+        await asyncio.gather(*(self._single(extracted, fut) for extracted, fut in missing))
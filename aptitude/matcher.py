@@ -0,0 +1,113 @@
+# Matcher multi-keyword a passata singola.
+#
+# Le keyword vengono compilate una volta sola. Con pyahocorasick installato si usa un
+# automa Aho-Corasick (C); altrimenti una regex a trie (un ramo per prefisso comune)
+# cercata da ogni match in avanti di un carattere. In entrambi i casi una scansione
+# del testo trova ogni occorrenza, anche sovrapposta ("sap crm" e "crm"), con il suo
+# offset: semantica identica a `k.lower() in text.lower()` usata in precedenza.
+#
+# Opzionale:
+#   pip install pyahocorasick
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    trie: Dict[str, dict] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        pat = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # fine keyword qui ma il trie continua: suffisso opzionale (greedy = match più lungo)
+        return "(?:" + pat + ")?" if "" in node else pat
+
+    return build(trie)
+
+
+class TextScan:
+    """Risultato di KeywordMatcher.scan: prima occorrenza di ogni keyword trovata nel testo."""
+
+    def __init__(self, text: str, first: Dict[str, int], vocabulary: FrozenSet[str] = frozenset()):
+        self.text = text
+        self.first = first
+        self.vocabulary = vocabulary
+
+    def covers(self, keywords: Iterable[str]) -> bool:
+        """True se la scansione ha cercato tutte queste keyword (altrimenti serve un altro matcher)."""
+        return all(k.lower() in self.vocabulary for k in keywords)
+
+    def has(self, keyword: str) -> bool:
+        return keyword.lower() in self.first
+
+    def offset(self, keyword: str) -> int:
+        return self.first.get(keyword.lower(), -1)
+
+    def any(self, keywords: Iterable[str]) -> bool:
+        return any(k.lower() in self.first for k in keywords)
+
+    def hits(self, keywords: Iterable[str]) -> List[str]:
+        """Keyword presenti, nell'ordine (e con il maiuscolo) della lista in input."""
+        return [k for k in keywords if k.lower() in self.first]
+
+
+class KeywordMatcher:
+    """Matcher case-insensitive per un insieme fisso di keyword (costruito una volta)."""
+
+    def __init__(self, keywords: Iterable[str]):
+        words = sorted({k.lower() for k in keywords if k})
+        self.keywords: Tuple[str, ...] = tuple(words)
+        self._vocabulary = frozenset(words)
+        self._automaton = None
+        self._regex = None
+        if words and ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for w in words:
+                self._automaton.add_word(w, w)
+            self._automaton.make_automaton()
+        elif words:
+            self._regex = re.compile(_trie_pattern(words))
+        # La regex restituisce la keyword più lunga per posizione: le più corte che
+        # iniziano nello stesso punto sono i suoi prefissi.
+        self._same_start = {w: [p for p in words if w.startswith(p)] for w in words}
+
+    @property
+    def backend(self) -> str:
+        return "aho-corasick" if self._automaton is not None else "regex"
+
+    def scan(self, text: str) -> TextScan:
+        first: Dict[str, int] = {}
+        if text and self._automaton is not None:
+            for end, w in self._automaton.iter(text.lower()):
+                if w not in first:
+                    first[w] = end - len(w) + 1
+        elif text and self._regex is not None:
+            low = text.lower()
+            search = self._regex.search
+            m = search(low)
+            while m is not None:
+                pos = m.start()
+                for k in self._same_start[m.group(0)]:
+                    if k not in first:
+                        first[k] = pos
+                m = search(low, pos + 1)
+        return TextScan(text or "", first, self._vocabulary)
+
+
+@lru_cache(maxsize=64)
+def matcher_for(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """Matcher compilato (e riusato) per liste di keyword ad hoc."""
+    return KeywordMatcher(keywords)
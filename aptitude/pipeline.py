@@ -0,0 +1,699 @@
+# Pipeline di screening senza UI: lettura -> extract -> enrich -> score -> riga risultato.
+# Usata dall'app Streamlit (aptitude_clean.py) e dalla CLI (python -m aptitude).
+
+import re
+import copy
+import hashlib
+import json
+import time
+import asyncio
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+from urllib.parse import quote, quote_plus
+
+from aptitude.cache import ResultCache, result_cache_key
+from aptitude.compact import COMPACT_VERSION, DEFAULT_TOKEN_BUDGET
+from aptitude.contacts import extract_email, extract_phones, resolve_fullname
+from aptitude.dedup import DEFAULT_DEDUP_THRESHOLD, BatchDedup
+from aptitude.history import PRESCREEN_VERSION, ScreeningHistory
+from aptitude.ingest import Source, source_bytes, source_hash
+from aptitude.llm import (
+    GROQ_API_KEY,
+    GROQ_CONCURRENCY,
+    GROQ_MODEL_EXTRACT,
+    GROQ_MODEL_FAST,
+    GROQ_MODEL_SCORE,
+    GROQ_SCORE_BATCH,
+    GROQ_STREAM,
+    EXTRACT_SYS,
+    FUSED_SYS,
+    SCORE_BATCH_SYS,
+    SCORE_SYS,
+    ScoreBatcher,
+    empty_extract,
+    groq_extract_async,
+    groq_extract_score_async,
+    groq_score_async,
+)
+from aptitude.reading import ReadingPool
+from aptitude.resilience import GroqCallError, ResilientGroq
+from aptitude.routing import ESCALATED, FAST, LARGE, extract_needs_escalation, route_tier, score_needs_escalation, tier_models
+from aptitude.signals import deterministic_enrich, prescreen_score, scan_signals
+
+SUPPORTED_EXTENSIONS = ("pdf", "docx", "txt", "doc", "odt", "rtf")
+PRESCREEN_LABEL = "Bassa (pre-screen)"
+GROQ_ERROR_LABEL = "Errore Groq (da ripetere)"
+LABEL_ALTA_MIN = 75
+LABEL_MEDIA_MIN = 45
+
+
+@dataclass
+class ScreenSettings:
+    """Impostazioni di screening (in app arrivano dalla sidebar)."""
+    prefer_cc39: bool = True
+    allowed_prefixes: List[str] = field(default_factory=lambda: ["+39", "+44", "+353"])
+    min_extract_conf: float = 0.35
+    concurrency: int = GROQ_CONCURRENCY
+    debug: bool = False
+    # Pre-screen locale: sotto soglia niente chiamate Groq (prescreen=False forza lo scoring completo)
+    prescreen: bool = True
+    prescreen_threshold: int = 2
+    # Quasi duplicati (MinHash): solo il primo CV del gruppo passa da Groq
+    dedup: bool = True
+    dedup_threshold: float = DEFAULT_DEDUP_THRESHOLD
+    # Extract + score in una sola chiamata Groq (metà dei round trip, stage non separati)
+    fused: bool = False
+    # Budget token del testo CV inviato all'estrazione (sezioni più rilevanti, vedi compact.py)
+    token_budget: int = DEFAULT_TOKEN_BUDGET
+    # CV per chiamata di scoring (1 = una chiamata per CV): il prompt di scoring si paga una volta per gruppo
+    score_batch: int = GROQ_SCORE_BATCH
+    # CV semplici (lettura pulita, brevi, segnali chiari) al modello veloce, con escalation al grande
+    routing: bool = False
+    # Risposte Groq in streaming: contatti del candidato prima della fine, chiusura appena il JSON è completo
+    stream: bool = GROQ_STREAM
+
+
+# ===================== CACHE =====================
+def is_cacheable(scored: Dict[str, Any]) -> bool:
+    """Non mettiamo in cache i fallback vuoti (errore Groq): verrebbero riproposti come score 0."""
+    scores = scored.get("scores", {}) if isinstance(scored, dict) else {}
+    if not isinstance(scores, dict):
+        return False
+    return any(isinstance(v, dict) and v.get("dimensions") for v in scores.values())
+
+def is_extract_cacheable(extracted: Dict[str, Any]) -> bool:
+    """Un JSON di estrazione vuoto (risposta non parsabile) non va in cache."""
+    return extracted != empty_extract()
+
+def version_tag(*parts: str) -> str:
+    """Tag corto di modello + prompt (+ parametri): salvato con estrazioni e score nello storico."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:12]
+
+# Cambia con modello di scoring, SCORE_SYS/SCORE_BATCH_SYS o soglie Alta/Media: gli score con
+# un altro tag sono superati e si ricalcolano con rescore (solo scoring, sulle estrazioni salvate).
+# Scoring singolo e a gruppi condividono schema e regole: stessa versione, stessa voce di cache.
+def score_version(model: str = GROQ_MODEL_SCORE) -> str:
+    return version_tag(model, SCORE_SYS, SCORE_BATCH_SYS, f"labels:{LABEL_ALTA_MIN}/{LABEL_MEDIA_MIN}")
+
+SCORE_VERSION = score_version(GROQ_MODEL_SCORE)
+# Anche gli score del modello veloce (routing) sono aggiornati: il rescore non li ripete
+CURRENT_SCORE_VERSIONS = (SCORE_VERSION, score_version(GROQ_MODEL_FAST))
+
+def _compaction(settings: ScreenSettings) -> str:
+    return f"compact-v{COMPACT_VERSION}:{settings.token_budget}"
+
+def extract_version(settings: ScreenSettings, model: str = GROQ_MODEL_EXTRACT) -> str:
+    if settings.fused:
+        return "fused-" + version_tag(model, FUSED_SYS, _compaction(settings))
+    return version_tag(model, EXTRACT_SYS, _compaction(settings))
+
+def extract_cache_key(content_hash: str, settings: ScreenSettings, model: str = GROQ_MODEL_EXTRACT) -> str:
+    """
+    Voce di estrazione (testo letto + JSON extract). Le risposte fused (extract + score insieme)
+    non sono intercambiabili con quelle a due stadi: chiavi distinte.
+    Anche budget token e versione della compattazione cambiano il testo inviato a Groq.
+    model: modello che ha prodotto l'estrazione (grande o, con routing, veloce).
+    """
+    if settings.fused:
+        return result_cache_key(content_hash, model, model, FUSED_SYS, FUSED_SYS, _compaction(settings))
+    return result_cache_key(content_hash, model, "", EXTRACT_SYS, "", _compaction(settings))
+
+def score_cache_key(
+    content_hash: str,
+    settings: ScreenSettings,
+    extract_model: str = GROQ_MODEL_EXTRACT,
+    score_model: str = GROQ_MODEL_SCORE,
+) -> str:
+    """Voce di scoring, separata dall'estrazione: cambiando SCORE_SYS o modello si ripete solo lo score."""
+    return result_cache_key(
+        content_hash, extract_model, score_model, EXTRACT_SYS, SCORE_SYS, _compaction(settings), "score", score_version(score_model)
+    )
+
+
+# ===================== PRE-SCREEN =====================
+def prescreen_scored(points: int, threshold: int) -> Dict[str, Any]:
+    """JSON score sintetico per i CV scartati dal pre-screen (stessa forma di groq_score)."""
+    reason = f"Pre-screen locale: {points} segnali telefonici (soglia {threshold}), scoring Groq non eseguito"
+    role = {"score": 0, "label": PRESCREEN_LABEL, "dimensions": {}, "reasons": [reason], "evidence": []}
+    return {
+        "schema_version": "2.0",
+        "scores": {k: dict(role) for k in ("inbound_call_center", "outbound_telemarketing", "appointment_setting")},
+    }
+
+
+# ===================== ERRORI GROQ =====================
+def groq_error_scored(status: str) -> Dict[str, Any]:
+    """JSON score per i CV la cui chiamata Groq è fallita: non è uno score 0, va ripetuto."""
+    reason = f"Chiamata Groq fallita ({status}): CV da rianalizzare"
+    role = {"score": 0, "label": GROQ_ERROR_LABEL, "dimensions": {}, "reasons": [reason], "evidence": []}
+    return {
+        "schema_version": "2.0",
+        "scores": {k: dict(role) for k in ("inbound_call_center", "outbound_telemarketing", "appointment_setting")},
+    }
+
+
+# ===================== PIPELINE ASYNC =====================
+@contextmanager
+def stage_timer(timings: Dict[str, float], stage: str) -> Iterator[None]:
+    """Somma in timings[stage] i secondi spesi nel blocco (attese su semafori escluse)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - t0
+
+async def analyze_file_async(
+    client: ResilientGroq,
+    name: str,
+    source: Source,
+    settings: ScreenSettings,
+    sem: asyncio.Semaphore,
+    read_sem: asyncio.Semaphore,
+    reading_pool: ReadingPool,
+    result_cache: ResultCache,
+    dedup: Optional[BatchDedup] = None,
+    idx: int = 0,
+    batchers: Optional[Dict[str, ScoreBatcher]] = None,
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Lettura -> extract -> enrich -> score per un singolo CV (con settings.fused extract e
+    score arrivano da una sola chiamata, poi enrich).
+    La lettura gira nel pool di processi e non occupa il semaforo Groq: i testi dei
+    file successivi sono pronti quando si libera uno slot.
+    source: bytes o SpooledCV; i byte di un file su disco restano in memoria solo durante la lettura.
+    Con dedup, un quasi duplicato di un CV già visto nel batch riusa il suo risultato.
+    Estrazione e score hanno voci di cache separate: con un'estrazione in cache (stesso prompt
+    e modello di extract) si ripete solo lo scoring, ad es. dopo una modifica di SCORE_SYS.
+    Con batchers (modello di scoring -> ScoreBatcher) lo scoring va in un gruppo di CV: lo slot
+    di sem si libera dopo l'estrazione e il tempo "score" comprende l'attesa che il gruppo parta.
+    Con settings.routing i CV semplici passano dal modello veloce (vedi routing.py); un'estrazione
+    o uno score veloce non valido si ripete col modello grande. res["route"]: fast, large, escalated.
+    Con settings.stream on_partial(contact_columns(...)) arriva appena l'estrazione in streaming
+    contiene l'oggetto "candidate", prima del resto della risposta e dello scoring.
+    Se Groq fallisce dopo i retry il risultato ha "llm_error" (stato) e non va in cache.
+    res["timings"]: secondi per fase (read, extract, enrich, score; fused: extract_score).
+    res["extract_version"] / res["score_version"]: tag di modello + prompt (vedi version_tag).
+    """
+    timings: Dict[str, float] = {}
+    content_hash = source_hash(source)
+    # Un'estrazione del modello grande va bene anche per un CV da modello veloce: si cerca per prima
+    extract_models = [GROQ_MODEL_EXTRACT]
+    if settings.routing and GROQ_MODEL_FAST != GROQ_MODEL_EXTRACT:
+        extract_models.append(GROQ_MODEL_FAST)
+    cached: Optional[Dict[str, Any]] = None
+    extract_model = GROQ_MODEL_EXTRACT
+    for model in extract_models:
+        cached = result_cache.get(extract_cache_key(content_hash, settings, model))
+        if cached is not None:
+            extract_model = model
+            break
+    if cached is not None:
+        raw_text, read_conf, read_reason = cached["text"], float(cached["read_conf"]), cached["read_reason"]
+    else:
+        async with read_sem:
+            with stage_timer(timings, "read"):
+                raw_text, read_conf, read_reason = await reading_pool.read(name, source_bytes(source))
+
+    res = {"name": name, "raw_text": raw_text, "read_conf": read_conf, "read_reason": read_reason, "timings": timings}
+    if not raw_text or not raw_text.strip():
+        return res
+
+    if dedup is not None:
+        rep = dedup.claim(idx, raw_text)
+        if rep is not None:
+            rep_res = await dedup.wait(rep)
+            res.update({
+                "email_fb": rep_res["email_fb"],
+                "extracted": copy.deepcopy(rep_res["extracted"]),
+                "scored": copy.deepcopy(rep_res["scored"]),
+                "duplicate_of": rep_res["name"],
+            })
+            for flag in ("prescreened", "llm_error", "extract_version", "score_version", "route"):
+                if flag in rep_res:
+                    res[flag] = rep_res[flag]
+            return res
+
+    email_fb = extract_email(raw_text)
+    phones_fb = extract_phones(raw_text, prefer_cc39_if_missing=settings.prefer_cc39, allowed_prefixes=settings.allowed_prefixes)
+
+    scan = scan_signals(raw_text)  # una sola scansione keyword per pre-screen + enrich
+    points = prescreen_score(raw_text, scan) if settings.prescreen and cached is None else None
+
+    def on_field(key: str, value: Any) -> None:
+        if key == "candidate" and isinstance(value, dict) and on_partial is not None:
+            on_partial(contact_columns(name, value, raw_text, email_fb, phones_fb))
+
+    tier = LARGE
+    if cached is not None:
+        tier = FAST if extract_model != GROQ_MODEL_EXTRACT else LARGE
+    elif settings.routing:
+        tier, _ = route_tier(raw_text, read_conf, read_reason, scan)
+    extract_model, score_model = tier_models(tier)
+    if settings.routing:
+        res["route"] = tier
+
+    extracted: Optional[Dict[str, Any]] = None
+    scored: Optional[Dict[str, Any]] = None
+    fresh_score = False
+    if cached is not None:
+        llm_extracted = cached["extracted"]
+        extracted = deterministic_enrich(copy.deepcopy(llm_extracted), raw_text, email_fb, phones_fb, scan)
+        scored = cached.get("scored")  # voce fused: extract e score insieme
+        # score del modello del livello o, dopo un'escalation, del grande
+        for model in dict.fromkeys((score_model, GROQ_MODEL_SCORE)):
+            if scored is not None:
+                break
+            cached_score = result_cache.get(score_cache_key(content_hash, settings, extract_model, model))
+            if cached_score is not None:
+                scored, score_model = cached_score["scored"], model
+    elif points is not None and points < settings.prescreen_threshold:
+        extracted = deterministic_enrich(empty_extract(), raw_text, email_fb, phones_fb, scan)
+        scored = prescreen_scored(points, settings.prescreen_threshold)
+        res["prescreened"] = True
+        res["score_version"] = PRESCREEN_VERSION  # niente estrazione Groq: il rescore non si applica
+
+    if scored is None:
+        try:
+            async with sem:
+                if extracted is None and settings.fused:
+                    with stage_timer(timings, "extract_score"):
+                        extracted, scored = await groq_extract_score_async(
+                            client, raw_text, read_conf, read_reason, settings.token_budget, extract_model, settings.stream, on_field
+                        )
+                    if tier == FAST and (extract_needs_escalation(extracted) or score_needs_escalation(scored)):
+                        extract_model = score_model = GROQ_MODEL_EXTRACT
+                        res["route"] = ESCALATED
+                        with stage_timer(timings, "extract_score"):
+                            extracted, scored = await groq_extract_score_async(
+                                client, raw_text, read_conf, read_reason, settings.token_budget, extract_model, settings.stream, on_field
+                            )
+                    llm_extracted = copy.deepcopy(extracted)
+                    with stage_timer(timings, "enrich"):
+                        extracted = deterministic_enrich(extracted, raw_text, email_fb, phones_fb, scan)
+                else:
+                    if extracted is None:
+                        with stage_timer(timings, "extract"):
+                            extracted = await groq_extract_async(
+                                client, raw_text, read_conf, read_reason, settings.token_budget, extract_model, settings.stream, on_field
+                            )
+                        if tier == FAST and extract_needs_escalation(extracted):
+                            extract_model, score_model = tier_models(LARGE)
+                            res["route"] = ESCALATED
+                            with stage_timer(timings, "extract"):
+                                extracted = await groq_extract_async(
+                                    client, raw_text, read_conf, read_reason, settings.token_budget, extract_model, settings.stream, on_field
+                                )
+                        llm_extracted = copy.deepcopy(extracted)
+                        with stage_timer(timings, "enrich"):
+                            extracted = deterministic_enrich(extracted, raw_text, email_fb, phones_fb, scan)
+                    if batchers is None:
+                        with stage_timer(timings, "score"):
+                            scored = await groq_score_async(client, extracted, score_model, settings.stream)
+            if scored is None:
+                # scoring a gruppi: la chiamata di gruppo prende il suo slot
+                with stage_timer(timings, "score"):
+                    scored = await batchers[score_model].score(extracted)
+            if not settings.fused and score_model != GROQ_MODEL_SCORE and score_needs_escalation(scored):
+                score_model = GROQ_MODEL_SCORE
+                res["route"] = ESCALATED
+                with stage_timer(timings, "score"):
+                    if batchers is not None:
+                        scored = await batchers[score_model].score(extracted)
+                    else:
+                        async with sem:
+                            scored = await groq_score_async(client, extracted, score_model, settings.stream)
+            fresh_score = True
+        except GroqCallError as exc:
+            extracted = deterministic_enrich(empty_extract(), raw_text, email_fb, phones_fb, scan)
+            scored = groq_error_scored(exc.status)
+            res["llm_error"] = exc.status
+
+    if "prescreened" not in res and "llm_error" not in res:
+        res["extract_version"] = extract_version(settings, extract_model)
+        res["score_version"] = res["extract_version"] if settings.fused else score_version(score_model)
+        cache_key = extract_cache_key(content_hash, settings, extract_model)
+        if settings.fused:
+            if cached is None and is_cacheable(scored):
+                result_cache.set(cache_key, {
+                    "text": raw_text, "read_conf": read_conf, "read_reason": read_reason,
+                    "extracted": llm_extracted, "scored": scored,
+                })
+        else:
+            if cached is None and is_extract_cacheable(llm_extracted):
+                result_cache.set(cache_key, {
+                    "text": raw_text, "read_conf": read_conf, "read_reason": read_reason,
+                    "extracted": llm_extracted,
+                })
+            if fresh_score and is_cacheable(scored):
+                result_cache.set(score_cache_key(content_hash, settings, extract_model, score_model), {"scored": scored})
+
+    res.update({"email_fb": email_fb, "extracted": extracted, "scored": scored})
+    return res
+
+async def analyze_batch_async(
+    items: List[Tuple[str, Source]],
+    settings: ScreenSettings,
+    reading_pool: ReadingPool,
+    result_cache: ResultCache,
+    on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    on_partial: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Analizza (nome, bytes o SpooledCV) con al massimo settings.concurrency CV in fase Groq. Risultati in ordine di input.
+    on_result(indice, risultato) viene chiamato appena ogni CV è completo (stesso thread dell'event loop).
+    on_partial(indice, colonne di contatto) appena l'estrazione in streaming ha il candidato.
+    """
+    from groq import AsyncGroq  # SDK importato solo quando un batch chiama Groq
+
+    sem = asyncio.Semaphore(max(1, settings.concurrency))
+    read_sem = reading_pool.slots()
+    dedup = BatchDedup(settings.dedup_threshold) if settings.dedup else None
+
+    # Retry/backoff li gestisce ResilientGroq: quelli interni dell'SDK sono disattivati
+    async with AsyncGroq(api_key=GROQ_API_KEY, max_retries=0) as groq_async:
+        client = ResilientGroq(groq_async)
+        batchers = None
+        if settings.score_batch > 1 and not settings.fused:
+            batchers = {
+                m: ScoreBatcher(client, sem, settings.score_batch, model=m, stream=settings.stream)
+                for m in (GROQ_MODEL_SCORE, GROQ_MODEL_FAST)
+            }
+
+        async def _one(idx: int, name: str, data: Source) -> Dict[str, Any]:
+            partial = (lambda contacts: on_partial(idx, contacts)) if on_partial is not None else None
+            try:
+                res = await analyze_file_async(client, name, data, settings, sem, read_sem, reading_pool, result_cache, dedup, idx, batchers, partial)
+            except BaseException as exc:
+                if dedup is not None:
+                    dedup.fail(idx, exc)
+                raise
+            if dedup is not None:
+                dedup.resolve(idx, res)
+            if on_result is not None:
+                on_result(idx, res)
+            return res
+
+        return await asyncio.gather(*(_one(i, name, data) for i, (name, data) in enumerate(items)))
+
+
+# ===================== MESSAGGI STANDARD =====================
+standard_message = (
+    "Buongiorno,\n"
+    "abbiamo ricevuto il tuo CV in merito alla posizione di operatore telefonico. "
+    "Quando preferisci essere contattato?\n"
+    "Grazie e buona giornata"
+)
+email_subject = "Selezione per attività operatore telefonico"
+
+
+# ===================== RIGA RISULTATO =====================
+def label_for_score(score: int) -> str:
+    return "Alta" if score >= LABEL_ALTA_MIN else "Media" if score >= LABEL_MEDIA_MIN else "Bassa"
+
+def pick_score(d: dict) -> Tuple[int, str, str, str]:
+    sc = int(d.get("score", 0) or 0)
+    lab = str(d.get("label", "Bassa") or "Bassa")
+    reasons = d.get("reasons", [])
+    if not isinstance(reasons, list):
+        reasons = []
+    evid = d.get("evidence", [])
+    if not isinstance(evid, list):
+        evid = []
+    return sc, lab, " • ".join([str(x) for x in reasons[:3]]), "\n".join([str(x) for x in evid[:3]])
+
+def short_list(x, n=6):
+    if not isinstance(x, list):
+        return ""
+    y = [str(i).strip() for i in x if str(i).strip()]
+    return ", ".join(list(dict.fromkeys(y))[:n])
+
+def extraction_confidence(res: Dict[str, Any]) -> float:
+    """Combina affidabilità della lettura (PDF testo vs OCR) e confidence dichiarata dall'LLM."""
+    extracted = res.get("extracted", {})
+    llm_conf = 0.0
+    try:
+        llm_conf = float(extracted.get("extraction", {}).get("confidence", 0.0))
+    except Exception:
+        llm_conf = 0.0
+    return max(0.0, min(1.0, 0.55 * float(res.get("read_conf", 0.0)) + 0.45 * llm_conf))
+
+def score_columns(extracted: Dict[str, Any], scored: Dict[str, Any], llm_error: bool = False, prescreened: bool = False) -> Dict[str, Any]:
+    """Colonne della riga che dipendono dallo score (usate anche dal rescore sullo storico)."""
+    cand = extracted.get("candidate", {}) if isinstance(extracted.get("candidate"), dict) else {}
+    scores = scored.get("scores", {}) if isinstance(scored.get("scores"), dict) else {}
+    inbound = scores.get("inbound_call_center", {}) if isinstance(scores.get("inbound_call_center"), dict) else {}
+    outbound = scores.get("outbound_telemarketing", {}) if isinstance(scores.get("outbound_telemarketing"), dict) else {}
+    appoint = scores.get("appointment_setting", {}) if isinstance(scores.get("appointment_setting"), dict) else {}
+
+    sc_in, lab_in, rs_in, ev_in = pick_score(inbound)
+    sc_out, lab_out, rs_out, ev_out = pick_score(outbound)
+    sc_ap, lab_ap, rs_ap, ev_ap = pick_score(appoint)
+
+    best_score = max(sc_in, sc_out, sc_ap)
+    if llm_error:
+        label_best = GROQ_ERROR_LABEL
+    elif prescreened:
+        label_best = PRESCREEN_LABEL
+    else:
+        label_best = label_for_score(best_score)
+
+    whatsapp_url = ""
+    phones = cand.get("phones", [])
+    first_phone = ""
+    if isinstance(phones, list) and phones:
+        first_phone = str(phones[0]).strip()
+    if label_best in ("Alta", "Media") and first_phone:
+        phone_digits = re.sub(r"[^\d]", "", first_phone)
+        if phone_digits:
+            encoded_text = quote(standard_message)
+            whatsapp_url = f"https://api.whatsapp.com/send?phone={phone_digits}&text={encoded_text}"
+
+    return {
+        "Inbound score": sc_in,
+        "Inbound label": lab_in,
+        "Inbound reasons": rs_in,
+        "Inbound evidence": ev_in,
+        "Outbound score": sc_out,
+        "Outbound label": lab_out,
+        "Outbound reasons": rs_out,
+        "Outbound evidence": ev_out,
+        "Appoint score": sc_ap,
+        "Appoint label": lab_ap,
+        "Appoint reasons": rs_ap,
+        "Appoint evidence": ev_ap,
+        "Best score": best_score,
+        "Best label": label_best,
+        "Whatsapp": whatsapp_url,
+    }
+
+def contact_columns(name: str, candidate: Dict[str, Any], raw_text: str, email_fb: str, phones_fb: List[str]) -> Dict[str, Any]:
+    """Colonne di contatto dal solo oggetto "candidate" (estrazione in streaming non ancora completa)."""
+    email = candidate.get("email", "") or email_fb
+    phones = candidate.get("phones") if isinstance(candidate.get("phones"), list) and candidate.get("phones") else phones_fb
+    return {
+        "Nome file": name,
+        "Nome e Cognome": resolve_fullname(candidate.get("name", ""), candidate.get("surname", ""), raw_text, candidate.get("email", "")),
+        "E-mail": email,
+        "Numero/Numeri telefono": " | ".join(str(p) for p in phones),
+    }
+
+def build_row(res: Dict[str, Any], settings: ScreenSettings, read_link: Optional[str] = None) -> Dict[str, Any]:
+    """Riga tabella/export per un CV analizzato. read_link=None omette la colonna "Read" (CLI)."""
+    raw_text = res["raw_text"]
+    read_reason = res["read_reason"]
+    email_fb = res["email_fb"]
+    extracted = res["extracted"]
+    scored = res["scored"]
+
+    cand = extracted.get("candidate", {}) if isinstance(extracted.get("candidate"), dict) else {}
+    fullname = resolve_fullname(cand.get("name", ""), cand.get("surname", ""), raw_text, cand.get("email", ""))
+    scoring = score_columns(extracted, scored, bool(res.get("llm_error")), bool(res.get("prescreened")))
+
+    skills = extracted.get("skills", {}) if isinstance(extracted.get("skills"), dict) else {}
+    office_tools = skills.get("office_tools", [])
+    crm_tools = skills.get("crm_tools", [])
+    ticket_tools = skills.get("ticketing_tools", [])
+    cc_tools = skills.get("contact_center_tools", [])
+
+    tools_str = " | ".join(
+        [s for s in [short_list(office_tools, 4), short_list(crm_tools, 4), short_list(ticket_tools, 3), short_list(cc_tools, 3)] if s]
+    )
+
+    exp = extracted.get("experience", [])
+    phone_struct = 0
+    phone_types = []
+    evid_phone = []
+    if isinstance(exp, list):
+        for e in exp:
+            if not isinstance(e, dict):
+                continue
+            if bool(e.get("is_phone_structured", False)):
+                phone_struct += 1
+                pt = str(e.get("phone_type", "none"))
+                if pt and pt not in phone_types:
+                    phone_types.append(pt)
+                ev = e.get("evidence", [])
+                if isinstance(ev, list):
+                    for s in ev[:1]:
+                        if s and s not in evid_phone:
+                            evid_phone.append(str(s))
+    phone_type_str = ", ".join(phone_types) if phone_types else "none"
+    evid_phone_str = "\n".join(evid_phone[:3])
+
+    phones = cand.get("phones", [])
+    email = cand.get("email", "") or email_fb
+    mailto = ""
+    if isinstance(email, str) and email.strip():
+        subject_enc = quote_plus(email_subject)
+        body_enc = quote(standard_message)
+        mailto = f"mailto:{email}?subject={subject_enc}&body={body_enc}"
+
+    row = {
+        "Nome file": res["name"],
+        "Nome e Cognome": fullname,
+        "Confidence estrazione": round(extraction_confidence(res), 2),
+        "Metodo lettura": read_reason,
+        "Tools/Stack": tools_str if tools_str else "-",
+        "Phone structured (#exp)": phone_struct,
+        "Phone type": phone_type_str,
+        "Evidenze phone": evid_phone_str,
+        **{k: v for k, v in scoring.items() if k != "Whatsapp"},
+        "Duplicato di": res.get("duplicate_of", ""),
+        "Duplicati": "",
+        "Read": read_link,
+        "Numero/Numeri telefono": " | ".join([str(p) for p in phones]) if isinstance(phones, list) else "",
+        "Whatsapp": scoring["Whatsapp"],
+        "E-Mail": mailto,
+    }
+    if read_link is None:
+        del row["Read"]
+
+    if settings.debug:
+        row["_debug_extract_json"] = json.dumps(extracted, ensure_ascii=False)
+        row["_debug_score_json"] = json.dumps(scored, ensure_ascii=False)
+        if "route" in res:
+            row["_debug_route"] = res["route"]
+
+    return row
+
+
+def link_duplicates(rows: List[Dict[str, Any]]) -> None:
+    """Compila "Duplicati" sulla riga del rappresentante con i file raggruppati sotto di lui."""
+    by_name = {row["Nome file"]: row for row in rows if not row.get("Duplicato di")}
+    for row in rows:
+        rep = by_name.get(row.get("Duplicato di") or "")
+        if rep is not None:
+            rep["Duplicati"] = " | ".join([x for x in [rep["Duplicati"], row["Nome file"]] if x])
+
+
+# ===================== STORICO =====================
+def record_result(history: Optional[ScreeningHistory], content_hash: str, res: Dict[str, Any], settings: ScreenSettings) -> None:
+    """Salva nello storico un CV analizzato (non i file non letti né gli errori Groq, da ripetere)."""
+    if history is None or not res["raw_text"] or not res["raw_text"].strip() or res.get("llm_error"):
+        return
+    try:
+        history.record(content_hash, res, build_row(res, settings))
+    except sqlite3.Error:
+        pass  # lo storico non deve bloccare lo screening
+
+
+# ===================== RESCORE (STORICO) =====================
+async def rescore_history_async(
+    history: ScreeningHistory,
+    settings: ScreenSettings,
+    on_result: Optional[Callable[[str, Optional[Dict[str, Any]]], None]] = None,
+    batch_size: int = 200,
+) -> Tuple[int, int]:
+    """
+    Ripete solo groq_score sulle estrazioni salvate nello storico con uno score di un'altra
+    versione (SCORE_VERSION), settings.concurrency chiamate in parallelo (a gruppi di
+    settings.score_batch CV): niente lettura, OCR o estrazione. Si usa sempre il modello di
+    scoring grande (il routing dipende dalla lettura, che qui non si ripete).
+    Ritorna (aggiornati, falliti); i falliti restano da ricalcolare.
+    on_result(hash, riga aggiornata o None se fallito) dopo ogni CV.
+    """
+    from groq import AsyncGroq
+
+    sem = asyncio.Semaphore(max(1, settings.concurrency))
+    updated = failed = 0
+
+    async with AsyncGroq(api_key=GROQ_API_KEY, max_retries=0) as groq_async:
+        client = ResilientGroq(groq_async)
+        batcher = ScoreBatcher(client, sem, settings.score_batch, stream=settings.stream) if settings.score_batch > 1 else None
+
+        async def _one(entry: Dict[str, Any]) -> Dict[str, Any]:
+            if batcher is not None:
+                scored = await batcher.score(entry["extracted"])
+            else:
+                async with sem:
+                    scored = await groq_score_async(client, entry["extracted"], stream=settings.stream)
+            if not is_cacheable(scored):
+                raise GroqCallError("api_error", "risposta di scoring non valida")
+            row = {**entry["row"], **score_columns(entry["extracted"], scored)}
+            history.update_score(entry["content_hash"], scored, row, SCORE_VERSION)
+            return row
+
+        after = ""
+        while True:
+            batch = history.stale_scores(CURRENT_SCORE_VERSIONS, after, batch_size)
+            if not batch:
+                break
+            after = batch[-1]["content_hash"]
+            outcomes = await asyncio.gather(*(_one(e) for e in batch), return_exceptions=True)
+            for entry, out in zip(batch, outcomes):
+                if isinstance(out, GroqCallError):
+                    failed += 1
+                elif isinstance(out, BaseException):
+                    raise out
+                else:
+                    updated += 1
+                if on_result is not None:
+                    on_result(entry["content_hash"], None if isinstance(out, BaseException) else out)
+    return updated, failed
+
+def rescore_history(history: ScreeningHistory, settings: Optional[ScreenSettings] = None) -> Tuple[int, int]:
+    """Versione sincrona di rescore_history_async (CLI / script)."""
+    return asyncio.run(rescore_history_async(history, settings or ScreenSettings()))
+
+
+# ===================== BATCH SINCRONO (CLI / librerie) =====================
+def screen_documents(
+    items: List[Tuple[str, Source]],
+    settings: Optional[ScreenSettings] = None,
+    reading_pool: Optional[ReadingPool] = None,
+    result_cache: Optional[ResultCache] = None,
+    history: Optional[ScreeningHistory] = None,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Screening headless di (nome, bytes o SpooledCV). Ritorna (righe sopra soglia confidence, file non letti).
+    Con history ogni CV analizzato viene salvato nello storico.
+    """
+    settings = settings or ScreenSettings()
+    own_pool = reading_pool is None
+    reading_pool = reading_pool or ReadingPool()
+    result_cache = result_cache or ResultCache()
+    try:
+        results = asyncio.run(analyze_batch_async(items, settings, reading_pool, result_cache))
+    finally:
+        if own_pool:
+            reading_pool.shutdown()
+
+    rows: List[Dict[str, Any]] = []
+    unreadable: List[str] = []
+    for (_, data), res in zip(items, results):
+        record_result(history, source_hash(data), res, settings)
+        if not res["raw_text"] or not res["raw_text"].strip():
+            unreadable.append(f"{res['name']} ({res['read_reason']})")
+            continue
+        # i CV con errore Groq restano visibili (confidence bassa per forza): vanno ripetuti
+        if res.get("llm_error") or extraction_confidence(res) >= settings.min_extract_conf:
+            rows.append(build_row(res, settings))
+    link_duplicates(rows)
+    return rows, unreadable
@@ -0,0 +1,327 @@
+# Store delle anteprime: ogni documento salvato una sola volta su disco (per hash contenuto).
+# Tabella ed export contengono solo un riferimento corto; la conversione in PDF e la
+# preview avvengono solo quando il link viene aperto.
+#
+# La conversione (DOCX/DOC/ODT/RTF -> PDF) gira in un pool in background avviato alla
+# prima anteprima richiesta, con un LibreOffice headless locale, e il PDF resta in cache
+# per hash del contenuto: riaprire un'anteprima o fare un rerun non riconverte nulla.
+
+import os
+import re
+import time
+import shutil
+import socket
+import atexit
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aptitude.cache import DEFAULT_CACHE_DIR, sha256_hex
+
+try:
+    from docx2pdf import convert as docx2pdf_convert
+except ImportError:
+    docx2pdf_convert = None
+
+DEFAULT_PREVIEW_DIR = os.path.join(DEFAULT_CACHE_DIR, "previews")
+DEFAULT_PREVIEW_MAX_BYTES = int(float(os.getenv("APTITUDE_PREVIEW_MAX_MB", "1024")) * 1024 * 1024)
+EVICT_TARGET = 0.9  # superato il limite si libera fino al 90%: niente scansione a ogni inserimento al limite
+
+SOFFICE_BIN = os.getenv("SOFFICE_PATH") or shutil.which("soffice") or shutil.which("libreoffice")
+UNOSERVER_BIN = shutil.which("unoserver")
+UNOCONVERT_BIN = shutil.which("unoconvert")
+PDF_WORKERS = int(os.getenv("APTITUDE_PDF_WORKERS", "2"))
+PDF_TIMEOUT = float(os.getenv("APTITUDE_PDF_TIMEOUT", "120"))  # secondi per conversione
+PDF_WAIT = 15.0  # attesa della pagina anteprima prima di mostrare "conversione in corso"
+OFFICE_EXTENSIONS = ("docx", "doc", "odt", "rtf")
+
+_REF_RE = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{1,5}$")
+
+
+# ===================== CONVERSIONE A PDF =====================
+class PreviewPending(Exception):
+    """Conversione in PDF avviata ma non ancora finita: riprovare più tardi."""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class PdfConverter:
+    """
+    Pool di conversione in PDF (thread che pilotano un processo office esterno).
+    Backend, in ordine: unoserver (un LibreOffice headless resta acceso tra le conversioni),
+    soffice --convert-to con un profilo persistente per thread (niente creazione del
+    profilo a ogni file), docx2pdf (Word, solo DOCX). Senza backend non converte nulla.
+    I PDF vanno in out_dir/<hash>.pdf; le richieste in corso sullo stesso hash si uniscono.
+    """
+
+    def __init__(self, out_dir: str, workers: int = PDF_WORKERS, timeout: float = PDF_TIMEOUT):
+        self.out_dir = out_dir
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        os.makedirs(out_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        self._server: Optional[subprocess.Popen] = None
+        self._server_port = 0
+        self._local = threading.local()
+
+    @property
+    def backend(self) -> Optional[str]:
+        if UNOSERVER_BIN and UNOCONVERT_BIN:
+            return "unoserver"
+        if SOFFICE_BIN:
+            return "soffice"
+        if docx2pdf_convert is not None:
+            return "docx2pdf"
+        return None
+
+    def can_convert(self, ext: str) -> bool:
+        backend = self.backend
+        return ext in OFFICE_EXTENSIONS and backend is not None and (backend != "docx2pdf" or ext == "docx")
+
+    def cached_path(self, content_hash: str) -> Optional[str]:
+        path = os.path.join(self.out_dir, f"{content_hash}.pdf")
+        return path if os.path.exists(path) else None
+
+    def submit(self, src_path: str, ext: str, content_hash: str) -> Future:
+        """Future con il percorso del PDF (None se la conversione fallisce)."""
+        with self._lock:
+            fut = self._pending.get(content_hash)
+            if fut is not None:
+                return fut
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="aptitude-pdf")
+            fut = self._executor.submit(self._convert, src_path, ext, content_hash)
+            self._pending[content_hash] = fut
+        fut.add_done_callback(lambda _: self._forget(content_hash))
+        return fut
+
+    def _forget(self, content_hash: str) -> None:
+        with self._lock:
+            self._pending.pop(content_hash, None)
+
+    def _convert(self, src_path: str, ext: str, content_hash: str) -> Optional[str]:
+        cached = self.cached_path(content_hash)
+        if cached is not None:
+            return cached
+        out_path = os.path.join(self.out_dir, f"{content_hash}.pdf")
+        try:
+            with tempfile.TemporaryDirectory(dir=self.out_dir) as tmpdir:
+                in_path = os.path.join(tmpdir, f"input.{ext}")
+                shutil.copyfile(src_path, in_path)
+                tmp_pdf = os.path.join(tmpdir, "input.pdf")
+                backend = self.backend
+                if backend == "unoserver":
+                    self._unoconvert(in_path, tmp_pdf)
+                elif backend == "soffice":
+                    self._soffice(in_path, tmpdir)
+                else:
+                    docx2pdf_convert(in_path, tmp_pdf)
+                with open(tmp_pdf, "rb") as fh:
+                    if fh.read(5) != b"%PDF-":
+                        return None
+                os.replace(tmp_pdf, out_path)
+        except Exception:
+            return None
+        return out_path
+
+    def _soffice(self, in_path: str, out_dir: str) -> None:
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            profile = self._local.profile = os.path.join(self.out_dir, "lo-profiles", threading.current_thread().name)
+        subprocess.run(
+            [SOFFICE_BIN, f"-env:UserInstallation={Path(profile).absolute().as_uri()}", "--headless", "--invisible",
+             "--nologo", "--norestore", "--convert-to", "pdf", "--outdir", out_dir, in_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout, check=True,
+        )
+
+    def _unoconvert(self, in_path: str, out_path: str) -> None:
+        port = self._ensure_server()
+        subprocess.run(
+            [UNOCONVERT_BIN, "--host", "127.0.0.1", "--port", str(port), in_path, out_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout, check=True,
+        )
+
+    def _ensure_server(self) -> int:
+        """Avvia (o riavvia se è morto) il LibreOffice persistente e attende che accetti connessioni."""
+        with self._lock:
+            if self._server is not None and self._server.poll() is None:
+                return self._server_port
+            port, uno_port = _free_port(), _free_port()
+            self._server = subprocess.Popen(
+                [UNOSERVER_BIN, "--interface", "127.0.0.1", "--port", str(port), "--uno-port", str(uno_port)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            self._server_port = port
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline and self._server.poll() is None:
+                try:
+                    with socket.create_connection(("127.0.0.1", port), timeout=1):
+                        return port
+                except OSError:
+                    time.sleep(0.25)
+            raise RuntimeError("unoserver non avviato")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            server, self._server = self._server, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if server is not None and server.poll() is None:
+            server.terminate()
+
+
+_pdf_converters: Dict[str, PdfConverter] = {}
+_pdf_converters_lock = threading.Lock()
+
+def pdf_converter(out_dir: str) -> PdfConverter:
+    """Convertitore del processo per out_dir (condiviso tra sessioni Streamlit), creato alla prima anteprima."""
+    with _pdf_converters_lock:
+        converter = _pdf_converters.get(out_dir)
+        if converter is None:
+            converter = _pdf_converters[out_dir] = PdfConverter(out_dir)
+            atexit.register(converter.shutdown)
+    return converter
+
+
+# ===================== STORE =====================
+def preview_ref(filename: str, content_hash: str) -> str:
+    """Riferimento di un documento nello store: hash del contenuto + estensione del file."""
+    ext = re.sub(r"[^a-z0-9]", "", filename.rsplit(".", 1)[-1].lower())[:5] or "bin"
+    return f"{content_hash}.{ext}"
+
+
+class PreviewStore:
+    """
+    Documenti originali su disco, nome file = <sha256>.<ext>. Eviction per dimensione (mtime più vecchio).
+    Il totale occupato è tenuto in memoria: la cartella si scansiona alla prima scrittura e
+    quando il limite viene superato, non a ogni inserimento.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = DEFAULT_PREVIEW_MAX_BYTES):
+        self.root = root or DEFAULT_PREVIEW_DIR
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def put(self, filename: str, data: bytes) -> str:
+        """Salva (se non presente) e ritorna il riferimento da mettere in tabella."""
+        ref = preview_ref(filename, sha256_hex(data))
+        path = os.path.join(self.root, ref)
+        if os.path.exists(path):
+            os.utime(path)
+            return ref
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        self._added(len(data))
+        return ref
+
+    def put_file(self, filename: str, src_path: str, content_hash: str) -> str:
+        """Come put() per un file già su disco (hash noto): copia senza caricarlo in memoria."""
+        ref = preview_ref(filename, content_hash)
+        path = os.path.join(self.root, ref)
+        if os.path.exists(path):
+            os.utime(path)
+            return ref
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+        os.close(fd)
+        shutil.copyfile(src_path, tmp)
+        os.replace(tmp, path)
+        self._added(os.path.getsize(path))
+        return ref
+
+    def path(self, ref: str) -> Optional[str]:
+        if not _REF_RE.match(ref or ""):
+            return None
+        path = os.path.join(self.root, ref)
+        return path if os.path.exists(path) else None
+
+    def load(self, ref: str) -> Optional[bytes]:
+        path = self.path(ref)
+        if path is None:
+            return None
+        with open(path, "rb") as fh:
+            return fh.read()
+
+    def load_pdf(self, ref: str, wait: float = PDF_WAIT) -> Optional[Tuple[bytes, bool]]:
+        """
+        (bytes, is_pdf): il PDF (convertito in background e in cache) o, se non convertibile,
+        l'originale. PreviewPending se la conversione non finisce entro wait secondi.
+        """
+        path = self.path(ref)
+        if path is None:
+            return None
+        content_hash, ext = ref.rsplit(".", 1)
+        converter = pdf_converter(os.path.join(self.root, "pdf")) if ext in OFFICE_EXTENSIONS else None
+        if converter is not None and converter.can_convert(ext):
+            pdf_path = converter.cached_path(content_hash)
+            if pdf_path is None:
+                fut = converter.submit(path, ext, content_hash)
+                try:
+                    pdf_path = fut.result(timeout=wait)
+                except FutureTimeout:
+                    raise PreviewPending(ref) from None
+                if pdf_path is not None:
+                    self._added(os.path.getsize(pdf_path))
+            if pdf_path is not None:
+                os.utime(pdf_path)
+                with open(pdf_path, "rb") as fh:
+                    return fh.read(), True
+        data = self.load(ref)
+        if data is None:
+            return None
+        return data, data[:5] == b"%PDF-"
+
+    def _added(self, size: int) -> None:
+        """Aggiorna il totale dopo una scrittura; scansione ed eviction solo oltre il limite."""
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._entries())  # include già il nuovo file
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) di originali e PDF convertiti (sottocartella pdf/)."""
+        entries = []
+        pdf_dir = os.path.join(self.root, "pdf")
+        scans = [os.scandir(self.root)] + ([os.scandir(pdf_dir)] if os.path.isdir(pdf_dir) else [])
+        for scan in scans:
+            with scan:
+                for e in scan:
+                    if e.is_file() and (_REF_RE.match(e.name) or e.name.endswith(".pdf")):
+                        st = e.stat()
+                        entries.append((st.st_mtime, st.st_size, e.path))
+        return entries
+
+    def _evict(self) -> None:
+        """
+        Originali e PDF convertiti condividono il limite di spazio. La scansione ricalcola il
+        totale reale (anche i file scritti da altri processi) e libera fino a EVICT_TARGET.
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * EVICT_TARGET)
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+        self._total = total
@@ -0,0 +1,446 @@
+# Lettura CV (PDF testo / OCR / DOCX / testo semplice) + pool di processi per i batch.
+#
+# PdfReader e python-docx sono parser Python puri che tengono il GIL: per usare tutti i
+# core la lettura gira in processi separati. Le funzioni stanno in un modulo importabile
+# perché i worker (avviati con "spawn") devono poterle ritrovare per nome.
+# Parser e OCR si importano al primo file che li usa: avvio di app, CLI, worker e processi
+# di lettura non paga PyPDF2, python-docx, pdf2image e pytesseract se non servono.
+
+import os
+import io
+import json
+import signal
+import sqlite3
+import asyncio
+import queue
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import Any, List, Optional, Tuple
+
+from aptitude.cache import DEFAULT_CACHE_DIR, DiskCache, sha256_hex
+
+# ===================== OCR =====================
+# Disponibilità verificata senza importare i moduli (vedi ocr_modules)
+OCR_AVAILABLE = find_spec("pdf2image") is not None and find_spec("pytesseract") is not None
+OCR_LANG = os.getenv("TESSERACT_LANG", "").strip()  # es. "ita+eng" (serve il traineddata)
+
+# Cache OCR per pagina su disco, condivisa da sessioni, riavvii e worker (0 = disattivata)
+OCR_CACHE_MAX_BYTES = int(float(os.getenv("APTITUDE_OCR_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+READ_WORKERS = int(os.getenv("APTITUDE_READ_WORKERS", "0")) or (os.cpu_count() or 1)
+READ_TIMEOUT = float(os.getenv("APTITUDE_READ_TIMEOUT", "60"))
+READ_ATTEMPTS = 3  # un file in volo quando il pool viene ricreato per un altro si ripete
+
+# ===================== LETTURA FILE =====================
+PAGE_BREAK = "\f"  # separatore pagine nei PDF (serve alla compattazione per header/footer)
+
+OCR_DPI = 200
+OCR_MAX_PAGES = 8  # pagine OCR per documento (solo quelle senza testo)
+MIN_PAGE_TEXT_CHARS = 40  # sotto questa soglia il layer testo della pagina non è utilizzabile
+TEXT_PAGE_CONF = 1.0
+OCR_PAGE_MAX_CONF = 0.8
+UNUSABLE_PAGE_CONF = 0.2  # layer testo scartato da page_text_usable e nessun testo dall'OCR
+
+def page_text_usable(text: str) -> bool:
+    """Layer testo utilizzabile: abbastanza caratteri e per lo più alfanumerici (no glifi spazzatura)."""
+    t = "".join((text or "").split())
+    if len(t) < MIN_PAGE_TEXT_CHARS:
+        return False
+    return sum(ch.isalnum() for ch in t) / len(t) >= 0.5
+
+def _page_runs(pages: List[int]) -> List[Tuple[int, int]]:
+    """[1, 2, 3, 5] -> [(1, 3), (5, 5)]: una conversione pdf2image per blocco di pagine contigue."""
+    runs: List[Tuple[int, int]] = []
+    for p in sorted(pages):
+        if runs and p == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], p)
+        else:
+            runs.append((p, p))
+    return runs
+
+@lru_cache(maxsize=1)
+def ocr_modules() -> Optional[Tuple[Any, Any]]:
+    """(convert_from_bytes, pytesseract) importati al primo OCR; None se non importabili."""
+    if not OCR_AVAILABLE:
+        return None
+    try:
+        from pdf2image import convert_from_bytes
+        import pytesseract
+    except ImportError:
+        return None
+    # Configurazione opzionale percorso Tesseract (es. per Windows)
+    tess_cmd = os.getenv("TESSERACT_CMD", "").strip()
+    if tess_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tess_cmd
+    return convert_from_bytes, pytesseract
+
+@lru_cache(maxsize=1)
+def pdf_reader_class() -> Any:
+    from PyPDF2 import PdfReader
+    return PdfReader
+
+@lru_cache(maxsize=1)
+def docx_document_class() -> Any:
+    from docx import Document
+    return Document
+
+@lru_cache(maxsize=1)
+def tesseract_version() -> str:
+    try:
+        return str(ocr_modules()[1].get_tesseract_version())
+    except Exception:
+        return "unknown"
+
+_ocr_cache: Optional[DiskCache] = None
+
+def ocr_cache() -> Optional[DiskCache]:
+    """DiskCache OCR del processo (aperta al primo uso; None se disattivata o non apribile)."""
+    global _ocr_cache
+    if _ocr_cache is None and OCR_CACHE_MAX_BYTES > 0:
+        try:
+            _ocr_cache = DiskCache(os.path.join(DEFAULT_CACHE_DIR, "ocr.sqlite"), OCR_CACHE_MAX_BYTES)
+        except (OSError, sqlite3.Error):
+            return None
+    return _ocr_cache
+
+def ocr_page_key(doc_hash: str, page_no: int) -> str:
+    """Pagina di un documento + parametri che cambiano l'OCR (DPI, lingua, versione Tesseract)."""
+    return "|".join([doc_hash, str(page_no), str(OCR_DPI), OCR_LANG or "default", tesseract_version()])
+
+def ocr_image(img) -> Tuple[str, float]:
+    """OCR di una pagina: (testo, confidence 0-OCR_PAGE_MAX_CONF dalla media delle parole Tesseract)."""
+    pytesseract = ocr_modules()[1]
+    data = pytesseract.image_to_data(img, lang=OCR_LANG or None, output_type=pytesseract.Output.DICT)
+    lines: dict = {}
+    confs = []
+    for i, word in enumerate(data.get("text", [])):
+        word = (word or "").strip()
+        if not word:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        try:
+            c = float(data["conf"][i])
+        except (TypeError, ValueError):
+            continue
+        if c >= 0:
+            confs.append(c)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    if not text:
+        return "", 0.0
+    conf = (sum(confs) / len(confs) / 100.0) if confs else 0.5
+    return text, round(max(0.0, min(1.0, conf)) * OCR_PAGE_MAX_CONF, 3)
+
+def ocr_pdf_pages(data: bytes, pages: List[int]) -> dict:
+    """
+    OCR delle sole pagine indicate (1-based): {pagina: (testo, confidence)}.
+    Le pagine già in cache non vengono né renderizzate né passate a Tesseract.
+    """
+    out: dict = {}
+    modules = ocr_modules()
+    if modules is None or not data or not pages:
+        return out
+    convert_from_bytes = modules[0]
+    cache = ocr_cache()
+    doc_hash = sha256_hex(data)
+    todo: List[int] = []
+    for page_no in pages:
+        raw = None
+        if cache is not None:
+            try:
+                raw = cache.get(ocr_page_key(doc_hash, page_no))
+            except sqlite3.Error:
+                raw = None
+        if raw is None:
+            todo.append(page_no)
+            continue
+        hit = json.loads(raw.decode("utf-8"))
+        out[page_no] = (hit["text"], float(hit["conf"]))
+
+    for first, last in _page_runs(todo):
+        try:
+            images = convert_from_bytes(data, dpi=OCR_DPI, first_page=first, last_page=last)
+        except Exception:
+            continue
+        for page_no, img in zip(range(first, last + 1), images):
+            try:
+                text, conf = ocr_image(img)
+            except Exception:
+                out[page_no] = ("", 0.0)  # errore: non in cache, si riprova la prossima volta
+                continue
+            out[page_no] = (text, conf)
+            if cache is not None:
+                try:
+                    cache.set(ocr_page_key(doc_hash, page_no), json.dumps({"text": text, "conf": conf}, ensure_ascii=False).encode("utf-8"))
+                except sqlite3.Error:
+                    pass
+    return out
+
+def combine_pages(pages: List[Tuple[str, float, str]]) -> Tuple[str, float, str]:
+    """
+    Unisce le pagine (testo, confidence, metodo) in ordine. Confidence del documento: media
+    delle pagine pesata sui caratteri. Metodo: pdf_text, pdf_ocr o pdf_mixed.
+    """
+    kept = [(t.strip(), c, m) for t, c, m in pages if t and t.strip()]
+    if not kept:
+        return "", 0.0, "pdf_unreadable"
+    chars = sum(len(t) for t, _, _ in kept)
+    conf = sum(len(t) * c for t, c, _ in kept) / chars
+    methods = {m for _, _, m in kept}
+    reason = "pdf_mixed" if len(methods) > 1 else "pdf_" + methods.pop()
+    return PAGE_BREAK.join(t for t, _, _ in kept), round(conf, 3), reason
+
+def ocr_pdf_bytes(data: bytes, max_pages: int = OCR_MAX_PAGES) -> Tuple[str, float]:
+    """OCR per PDF immagine (prime max_pages pagine). Ritorna (testo, confidence)."""
+    if not OCR_AVAILABLE or not data:
+        return "", 0.0
+    try:
+        ocr = ocr_pdf_pages(data, list(range(1, max_pages + 1)))
+    except Exception:
+        return "", 0.0
+    text, conf, _ = combine_pages([(t, c, "ocr") for _, (t, c) in sorted(ocr.items())])
+    return text, conf
+
+def read_pdf_pages(data: bytes, max_ocr_pages: int = OCR_MAX_PAGES) -> List[Tuple[str, float, str]]:
+    """
+    Lettura pagina per pagina: layer testo (PyPDF2) dove è utilizzabile, OCR solo sulle
+    altre pagine (al massimo max_ocr_pages). Ritorna [(testo, confidence, "text"|"ocr")].
+    """
+    reader = pdf_reader_class()(io.BytesIO(data))
+    pages: List[Tuple[str, float, str]] = []
+    missing: List[int] = []
+    for i, p in enumerate(reader.pages, start=1):
+        try:
+            t = p.extract_text() or ""
+        except Exception:
+            t = ""
+        if page_text_usable(t):
+            pages.append((t, TEXT_PAGE_CONF, "text"))
+        else:
+            # se l'OCR non dà nulla resta il poco testo che c'è, ma con confidence bassa:
+            # è testo scartato (troppo corto o glifi spazzatura), non un'estrazione riuscita
+            pages.append((t, UNUSABLE_PAGE_CONF if t.strip() else 0.0, "text"))
+            missing.append(i)
+
+    for page_no, (t, c) in ocr_pdf_pages(data, missing[:max_ocr_pages]).items():
+        if t.strip():
+            pages[page_no - 1] = (t, c, "ocr")
+    return pages
+
+def extract_text(file, original_bytes: bytes = None) -> Tuple[str, float, str]:
+    """
+    Ritorna (text, confidence, reason).
+    confidence: 1.0 se estrazione testuale ok, fino a 0.8 se OCR, 0 se fallisce.
+    PDF: testo e OCR decisi pagina per pagina (PDF misti -> "pdf_mixed").
+    """
+    ext = file.name.split(".")[-1].lower()
+    if original_bytes is None:
+        try:
+            original_bytes = file.getvalue()
+        except Exception:
+            original_bytes = None
+
+    try:
+        if ext == "pdf":
+            if original_bytes is None:
+                file.seek(0)
+                original_bytes = file.read()
+            return combine_pages(read_pdf_pages(original_bytes))
+
+        if ext == "docx":
+            file.seek(0)
+            txt = "\n".join(p.text for p in docx_document_class()(file).paragraphs).strip()
+            return txt, (1.0 if txt else 0.0), "docx_text" if txt else "docx_unreadable"
+
+        # DOC/ODT/RTF/TXT: best-effort
+        file.seek(0)
+        raw = file.read()
+        try:
+            txt = raw.decode("utf-8", "ignore").strip()
+        except Exception:
+            txt = ""
+        if len(txt) < 200 and ext in ("doc", "odt", "rtf"):
+            return "", 0.0, f"{ext}_unsupported"
+        return txt, (1.0 if txt else 0.0), f"{ext}_text" if txt else f"{ext}_unreadable"
+    except Exception:
+        if ext == "pdf" and original_bytes:
+            ocr_text, ocr_conf = ocr_pdf_bytes(original_bytes)
+            return ocr_text.strip(), ocr_conf, "pdf_ocr" if ocr_text.strip() else "pdf_unreadable"
+        return "", 0.0, "extract_error"
+
+# ===================== POOL DI LETTURA =====================
+class NamedBytesIO(io.BytesIO):
+    """BytesIO con .name, compatibile con l'UploadedFile di Streamlit per extract_text."""
+
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+
+
+class ReadTimeout(BaseException):
+    # BaseException: extract_text/ocr_pdf_bytes intercettano Exception e ripiegherebbero sull'OCR
+    pass
+
+
+def _raise_read_timeout(signum, frame):
+    raise ReadTimeout()
+
+
+def read_document(name: str, data: bytes, timeout: Optional[float] = None) -> Tuple[str, float, str]:
+    """
+    Entry point dei worker: (text, confidence, reason) per un file.
+    Su POSIX il timeout interrompe il parsing dall'interno (SIGALRM): il worker resta
+    utilizzabile per i file successivi.
+    """
+    use_alarm = bool(timeout) and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_read_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return extract_text(NamedBytesIO(name, data), data)
+    except ReadTimeout:
+        return "", 0.0, "read_timeout"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+_started: Any = None  # coda (id task, pid) del processo di lettura, impostata da _init_reader
+
+def _init_reader(started: Any) -> None:
+    global _started
+    _started = started
+    # un feeder bloccato (pipe piena) non deve mai impedire al processo di terminare
+    started.cancel_join_thread()
+
+def _read_task(task_id: int, name: str, data: bytes, timeout: Optional[float]) -> Tuple[str, float, str]:
+    """read_document che prima comunica quale processo sta leggendo il file (vedi ReadingPool._kill_task)."""
+    _started.put((task_id, os.getpid()))
+    return read_document(name, data, timeout)
+
+
+class ReadingPool:
+    """
+    Pool di processi per la lettura dei CV, condiviso tra batch (avvio lazy).
+    Se un worker non risponde entro timeout + margine (es. blocco in codice C o Windows
+    senza SIGALRM) il file viene marcato "read_timeout" e si termina solo il processo che
+    lo sta leggendo. ProcessPoolExecutor considera rotto un pool con un worker morto: il
+    pool viene ricreato e gli altri file in volo si ripetono sul nuovo, senza errori.
+    """
+
+    def __init__(self, max_workers: int = READ_WORKERS, timeout: float = READ_TIMEOUT):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._ctx = multiprocessing.get_context("spawn")  # niente fork di un processo multi-thread (Streamlit/asyncio)
+        self._started: Any = None
+        self._task_ids = itertools.count()
+        self._task_pids: dict = {}
+        self._in_flight: set = set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                if self._started is None:
+                    self._started = self._ctx.Queue()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=self._ctx,
+                    initializer=_init_reader,
+                    initargs=(self._started,),
+                )
+            return self._executor
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> None:
+        """I prossimi file vanno su un pool nuovo; quello vecchio si chiude senza attendere."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _drain_started(self) -> None:
+        """
+        Svuota la coda dei pid (da chiamare con self._lock): si tengono solo i task ancora in
+        volo. Va fatto a ogni lettura, altrimenti la pipe si riempie e i worker non escono più.
+        """
+        while True:
+            try:
+                tid, pid = self._started.get_nowait()
+            except queue.Empty:
+                break
+            if tid in self._in_flight:
+                self._task_pids[tid] = pid
+
+    def _kill_task(self, task_id: int) -> None:
+        """Termina il processo che legge task_id (pid comunicato da _read_task all'avvio del task)."""
+        with self._lock:
+            self._drain_started()
+            pid = self._task_pids.pop(task_id, None)
+        if pid is None:
+            return
+        try:
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+        except OSError:
+            pass  # già terminato
+
+    async def read(self, name: str, data: bytes) -> Tuple[str, float, str]:
+        """
+        Legge un file nel pool. Il chiamante limita i file in volo a max_workers
+        (vedi slots()), così il timeout misura il parsing e non l'attesa in coda.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(READ_ATTEMPTS):
+            executor = self._get_executor()
+            task_id = next(self._task_ids)
+            with self._lock:
+                self._in_flight.add(task_id)
+            fut = loop.run_in_executor(executor, _read_task, task_id, name, data, self.timeout)
+            try:
+                return await asyncio.wait_for(fut, self.timeout + 5)
+            except asyncio.TimeoutError:
+                self._kill_task(task_id)
+                self._recycle(executor)
+                return "", 0.0, "read_timeout"
+            except BrokenProcessPool:
+                # pool rotto da un altro file (timeout o worker morto): si ripete sul pool nuovo
+                self._recycle(executor)
+            except Exception:
+                return "", 0.0, "extract_error"  # es. errore di pickling: il pool resta valido
+            finally:
+                with self._lock:
+                    self._in_flight.discard(task_id)
+                    self._drain_started()
+                    self._task_pids.pop(task_id, None)
+        return "", 0.0, "extract_error"
+
+    def slots(self) -> asyncio.Semaphore:
+        """Semaforo per il batch corrente (da creare dentro l'event loop)."""
+        return asyncio.Semaphore(self.max_workers)
+
+    def read_many(self, items: List[Tuple[str, bytes]]) -> List[Tuple[str, float, str]]:
+        """Versione sincrona per script/CLI: risultati nell'ordine di input."""
+
+        async def _run():
+            sem = self.slots()
+
+            async def _one(name: str, data: bytes):
+                async with sem:
+                    return await self.read(name, data)
+
+            return await asyncio.gather(*(_one(n, d) for n, d in items))
+
+        return asyncio.run(_run())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
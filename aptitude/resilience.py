@@ -0,0 +1,240 @@
+# Chiamate Groq resilienti: retry con backoff esponenziale + jitter (rispetta retry-after),
+# timeout per chiamata, circuit breaker e richieste "hedged" opzionali per la coda di latenza.
+# In streaming il testo passa a un consumer che può chiudere la generazione in anticipo.
+#
+# Gli errori non vengono più trasformati in JSON vuoti (score 0): escono come GroqCallError
+# con uno stato (rate_limited, timeout, unavailable, circuit_open, api_error) e il CV può
+# essere rianalizzato.
+# L'SDK groq (e httpx/pydantic) si importa solo quando parte una chiamata: chi importa il
+# modulo per GroqCallError (UI, CLI storico) non ne paga l'avvio.
+
+import os
+import time
+import random
+import asyncio
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, Tuple, Type
+
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+
+# Consumer dei pezzi di testo in streaming: None = continua, stringa = risposta completa (chiude lo stream)
+StreamConsumer = Callable[[str], Optional[str]]
+
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+GROQ_MAX_ATTEMPTS = int(os.getenv("GROQ_MAX_ATTEMPTS", "4"))
+GROQ_HEDGE_AFTER = float(os.getenv("GROQ_HEDGE_AFTER", "0"))  # secondi, 0 = niente hedging
+
+@lru_cache(maxsize=1)
+def retryable_errors() -> Tuple[Type[BaseException], ...]:
+    """Errori transitori: si riprova. Gli altri (400, 401, 403, 404, 422) falliscono subito."""
+    import groq
+
+    return (
+        groq.RateLimitError,
+        groq.APITimeoutError,
+        groq.APIConnectionError,
+        groq.InternalServerError,
+        groq.ConflictError,
+    )
+
+
+class GroqCallError(Exception):
+    """Chiamata Groq fallita dopo i retry. status: rate_limited | timeout | unavailable | circuit_open | api_error."""
+
+    def __init__(self, status: str, message: str = ""):
+        super().__init__(f"{status}: {message}" if message else status)
+        self.status = status
+
+
+def error_status(exc: BaseException) -> str:
+    import groq
+
+    if isinstance(exc, groq.RateLimitError):
+        return "rate_limited"
+    if isinstance(exc, (groq.APITimeoutError, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(exc, (groq.APIConnectionError, groq.InternalServerError, groq.ConflictError)):
+        return "unavailable"
+    return "api_error"
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Attesa suggerita dal server (header retry-after / x-ratelimit-reset-*), se presente."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        value = headers.get(name)
+        if not value:
+            continue
+        value = value.strip().lower()
+        try:
+            if value.endswith("ms"):
+                return float(value[:-2]) / 1000.0
+            return float(value.rstrip("s"))
+        except ValueError:
+            continue
+    return None
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = GROQ_MAX_ATTEMPTS
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    timeout: float = GROQ_TIMEOUT  # per singola chiamata
+    hedge_after: float = GROQ_HEDGE_AFTER
+
+    def backoff(self, attempt: int, exc: BaseException) -> float:
+        """Full jitter sul backoff esponenziale; se il server indica un'attesa, almeno quella."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        hint = retry_after_seconds(exc)
+        if hint is not None:
+            delay = max(delay, min(hint, self.max_delay) + random.uniform(0, self.base_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Dopo `failure_threshold` errori consecutivi il circuito si apre: per `reset_after`
+    secondi le chiamate falliscono subito (niente code di retry su un servizio giù).
+    Poi passa una chiamata di prova (half-open): se riesce il circuito si richiude.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_after: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_aborted(self) -> None:
+        """Chiamata annullata (es. batch interrotto): non dice nulla sullo stato del servizio."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+
+class ResilientGroq:
+    """Wrapper di AsyncGroq condiviso da tutte le chiamate di un batch (stesso event loop)."""
+
+    def __init__(self, client: Optional["AsyncGroq"], policy: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None):
+        self.client = client
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+
+    async def _once(self, stream_to: Optional[Callable[[], StreamConsumer]] = None, **kwargs: Any) -> str:
+        if stream_to is None:
+            resp = await self.client.chat.completions.create(timeout=self.policy.timeout, **kwargs)
+            return (resp.choices[0].message.content or "").strip()
+        import groq
+        import httpx
+
+        consume = stream_to()  # un consumer nuovo per ogni tentativo
+        parts = []
+        stream = await self.client.chat.completions.create(timeout=self.policy.timeout, stream=True, **kwargs)
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                parts.append(delta)
+                final = consume(delta)
+                if final is not None:
+                    return final.strip()
+        except httpx.TimeoutException as exc:
+            # errori a metà stream: arrivano da httpx, si riportano a quelli dell'SDK (ripetibili)
+            raise groq.APITimeoutError(request=stream.response.request) from exc
+        except httpx.TransportError as exc:
+            raise groq.APIConnectionError(request=stream.response.request) from exc
+        finally:
+            # chiusura anticipata: la connessione si interrompe e Groq smette di generare
+            await stream.close()
+        return "".join(parts).strip()
+
+    async def _hedged(self, call: Callable[[], Awaitable[str]]) -> str:
+        """Se la prima richiesta non risponde entro hedge_after, ne parte una seconda: vince la prima."""
+        first = asyncio.ensure_future(call())
+        pending = {first}
+        error: Optional[BaseException] = None
+        try:
+            # anche l'attesa della prima è nel try: se il chiamante viene cancellato la richiesta si chiude
+            done, _ = await asyncio.wait(pending, timeout=self.policy.hedge_after)
+            if done:
+                return first.result()
+            pending = {first, asyncio.ensure_future(call())}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def complete(self, stream_to: Optional[Callable[[], StreamConsumer]] = None, **kwargs: Any) -> str:
+        """
+        Contenuto della risposta chat; GroqCallError se fallisce dopo i retry.
+        stream_to: factory del consumer (vedi StreamConsumer) per una risposta in streaming.
+        """
+        if self.client is None:
+            raise GroqCallError("api_error", "GROQ_API_KEY non impostata")
+        import groq
+
+        last: Optional[BaseException] = None
+        for attempt in range(max(1, self.policy.max_attempts)):
+            if not self.breaker.allow():
+                raise GroqCallError("circuit_open", "troppi errori consecutivi, Groq temporaneamente escluso")
+            try:
+                if self.policy.hedge_after > 0:
+                    content = await self._hedged(lambda: self._once(stream_to, **kwargs))
+                else:
+                    content = await self._once(stream_to, **kwargs)
+            except retryable_errors() as exc:
+                self.breaker.record_failure()
+                last = exc
+                if attempt + 1 < self.policy.max_attempts:
+                    await asyncio.sleep(self.policy.backoff(attempt, exc))
+                continue
+            except groq.APIError as exc:
+                # Errore della richiesta (es. 400): ripeterla non serve, e il servizio ha risposto
+                self.breaker.record_success()
+                raise GroqCallError(error_status(exc), str(exc)) from exc
+            except Exception as exc:
+                # Risposta inattesa (es. senza choices): errore della chiamata, non si ripete
+                self.breaker.record_aborted()
+                raise GroqCallError("api_error", str(exc)) from exc
+            except BaseException:
+                self.breaker.record_aborted()
+                raise
+            self.breaker.record_success()
+            return content
+        raise GroqCallError(error_status(last), str(last)) from last
@@ -0,0 +1,108 @@
+# Risultati di un batch in forma colonnare, costruiti una volta e riusati a ogni rerun.
+#
+# Label come categoriche, score come array uint8, ordinamento per ruolo calcolato in
+# anticipo e indice di sottostringhe su nome e file: filtri, ricerca e pagina visibile
+# costano O(righe) in numpy invece di copiare e riordinare un DataFrame a ogni tasto.
+
+import re
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Vista ruolo -> (score, label, reasons, evidence)
+ROLE_VIEWS = {
+    "Best": ("Best score", "Best label", "Inbound reasons", "Inbound evidence"),
+    "Inbound": ("Inbound score", "Inbound label", "Inbound reasons", "Inbound evidence"),
+    "Outbound": ("Outbound score", "Outbound label", "Outbound reasons", "Outbound evidence"),
+    "Appoint": ("Appoint score", "Appoint label", "Appoint reasons", "Appoint evidence"),
+}
+SEARCH_COLUMNS = ("Nome e Cognome", "Nome file")
+_SEP = "\n"  # non compare nei valori indicizzati (normalizzati in _search_key)
+
+
+def _search_key(values: Sequence[Any]) -> str:
+    return " | ".join(re.sub(r"\s+", " ", "" if pd.isna(v) else str(v)).lower() for v in values)
+
+
+class ResultsTable:
+    """
+    Tabella risultati immutabile. select() ritorna le posizioni delle righe filtrate, già
+    ordinate per score del ruolo (desc); page() materializza solo le righe richieste.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], label_order: Sequence[str]):
+        self.df = pd.DataFrame(rows)
+        self._codes: Dict[str, np.ndarray] = {}
+        self._scores: Dict[str, np.ndarray] = {}
+        self._order: Dict[str, np.ndarray] = {}
+        for score_col, label_col, _, _ in ROLE_VIEWS.values():
+            if score_col in self._scores or score_col not in self.df.columns:
+                continue
+            scores = self.df[score_col].fillna(0).astype(np.int64).clip(0, 100).astype(np.uint8)
+            labels = pd.Categorical(self.df[label_col], categories=list(label_order))
+            self.df[score_col] = scores
+            self.df[label_col] = labels
+            self._scores[score_col] = scores.to_numpy()
+            self._codes[label_col] = labels.codes
+            # stabile: a parità di score resta l'ordine del batch
+            self._order[score_col] = np.argsort(-self._scores[score_col].astype(np.int16), kind="stable")
+
+        # Indice di ricerca: una stringa con tutte le chiavi e la posizione d'inizio di ogni
+        # riga; una query è una scansione in C (str.find) + searchsorted per la riga.
+        search_cols = [self.df[c] if c in self.df.columns else [""] * len(self.df) for c in SEARCH_COLUMNS]
+        keys = [_search_key(vals) for vals in zip(*search_cols)]
+        self._haystack = _SEP.join(keys)
+        self._starts = np.cumsum([0] + [len(k) + len(_SEP) for k in keys[:-1]]).astype(np.int64) if keys else np.zeros(0, np.int64)
+        self._keys = keys
+        self._matches: Dict[str, np.ndarray] = {"": np.ones(len(keys), dtype=bool)}
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def search(self, query: str) -> np.ndarray:
+        """Maschera delle righe il cui nome o file contiene query (minuscole, spazi normalizzati)."""
+        q = re.sub(r"\s+", " ", query.strip()).lower()
+        cached = self._matches.get(q)
+        if cached is not None:
+            return cached
+        # Digitando si allunga la query: si riparte dalle righe trovate per il prefisso più lungo
+        prefix = max((p for p in self._matches if q.startswith(p)), key=len)
+        if prefix:
+            mask = self._matches[prefix].copy()
+            for i in np.flatnonzero(mask):
+                mask[i] = q in self._keys[i]
+        else:
+            mask = np.zeros(len(self._keys), dtype=bool)
+            pos = self._haystack.find(q)
+            while pos != -1:
+                row = int(np.searchsorted(self._starts, pos, side="right")) - 1
+                mask[row] = True
+                # riga successiva: un'altra occorrenza nella stessa riga non aggiunge nulla
+                nxt = self._starts[row + 1] if row + 1 < len(self._starts) else len(self._haystack)
+                pos = self._haystack.find(q, int(nxt))
+        if len(self._matches) > 64:
+            self._matches = {"": self._matches[""]}
+        self._matches[q] = mask
+        return mask
+
+    def select(self, role: str, labels: Sequence[str], min_score: int = 0, query: str = "") -> np.ndarray:
+        """Posizioni delle righe che passano i filtri, ordinate per score del ruolo (desc)."""
+        score_col, label_col, _, _ = ROLE_VIEWS.get(role, ROLE_VIEWS["Best"])
+        if score_col not in self._scores:
+            return np.zeros(0, dtype=np.int64)
+        categories = self.df[label_col].cat.categories
+        allowed = [categories.get_loc(l) for l in labels if l in categories]
+        mask = np.isin(self._codes[label_col], allowed) & (self._scores[score_col] >= min_score)
+        if query.strip():
+            mask &= self.search(query)
+        order = self._order[score_col]
+        return order[mask[order]]
+
+    def page(self, positions: np.ndarray, columns: Sequence[str], page: int = 1, page_size: Optional[int] = None) -> pd.DataFrame:
+        """Righe (solo le colonne richieste) della pagina page (1-based); page_size None = tutte."""
+        if page_size:
+            start = (max(1, page) - 1) * page_size
+            positions = positions[start:start + page_size]
+        cols = [c for c in columns if c in self.df.columns]
+        return self.df.iloc[positions][cols]
@@ -0,0 +1,59 @@
+# Routing tra il modello Groq veloce (piccolo) e quello grande.
+#
+# I CV letti in modo pulito (testo nativo, confidenza alta), brevi e ricchi di segnali
+# telefonici vanno al modello veloce; OCR, letture incerte, CV lunghi o con pochi segnali
+# (casi ambigui) restano sul modello grande. Una risposta del modello veloce che non passa
+# la validazione (JSON vuoto o non valido, confidenza bassa) si ripete sul modello grande.
+
+import os
+from typing import Dict, Any, Optional, Tuple
+
+from aptitude.compact import estimate_tokens
+from aptitude.llm import GROQ_MODEL_EXTRACT, GROQ_MODEL_FAST, GROQ_MODEL_SCORE, empty_extract, valid_score
+from aptitude.matcher import TextScan
+from aptitude.signals import prescreen_score
+
+ROUTE_MIN_READ_CONF = float(os.getenv("APTITUDE_ROUTE_MIN_READ_CONF", "0.95"))
+ROUTE_MAX_TOKENS = int(os.getenv("APTITUDE_ROUTE_MAX_TOKENS", "1500"))  # testo CV stimato
+ROUTE_MIN_SIGNALS = int(os.getenv("APTITUDE_ROUTE_MIN_SIGNALS", "4"))  # punti pre-screen
+ESCALATE_MIN_CONF = float(os.getenv("APTITUDE_ESCALATE_MIN_CONF", "0.6"))  # confidence dell'estrazione veloce
+
+# Letture senza OCR (vedi reading.extract_text): "pdf_mixed" e "pdf_ocr" restano sul modello grande
+CLEAN_READ_REASONS = ("pdf_text", "docx_text", "txt_text", "rtf_text", "odt_text", "doc_text")
+
+FAST = "fast"
+LARGE = "large"
+ESCALATED = "escalated"  # partito dal modello veloce, ripetuto col grande
+
+
+def tier_models(tier: str) -> Tuple[str, str]:
+    """(modello extract, modello score) del livello."""
+    return (GROQ_MODEL_FAST, GROQ_MODEL_FAST) if tier == FAST else (GROQ_MODEL_EXTRACT, GROQ_MODEL_SCORE)
+
+def route_tier(raw_text: str, read_conf: float, read_reason: str, scan: Optional[TextScan] = None) -> Tuple[str, str]:
+    """(livello, motivo): FAST solo se lettura pulita, testo breve e segnali telefonici chiari."""
+    if read_reason not in CLEAN_READ_REASONS or read_conf < ROUTE_MIN_READ_CONF:
+        return LARGE, f"lettura {read_reason} ({read_conf:.2f})"
+    tokens = estimate_tokens(raw_text)
+    if tokens > ROUTE_MAX_TOKENS:
+        return LARGE, f"testo lungo (~{tokens} token)"
+    points = prescreen_score(raw_text, scan)
+    if points < ROUTE_MIN_SIGNALS:
+        return LARGE, f"pochi segnali telefonici ({points})"
+    return FAST, f"lettura pulita, ~{tokens} token, {points} segnali"
+
+def extract_needs_escalation(extracted: Dict[str, Any]) -> bool:
+    """Estrazione del modello veloce da ripetere col grande: vuota, senza esperienze o incerta."""
+    if extracted == empty_extract() or not extracted.get("experience"):
+        return True
+    try:
+        conf = float((extracted.get("extraction") or {}).get("confidence", 0.0))
+    except (TypeError, ValueError):
+        return True
+    return conf < ESCALATE_MIN_CONF
+
+def score_needs_escalation(scored: Dict[str, Any]) -> bool:
+    """Score del modello veloce da ripetere col grande: ruoli mancanti, score non numerici o senza dimensioni."""
+    if not valid_score(scored):
+        return True
+    return not any(isinstance(v, dict) and v.get("dimensions") for v in scored["scores"].values())
@@ -0,0 +1,166 @@
+# Segnali deterministici: keyword, snippet di evidenza, arricchimento del JSON estratto
+
+import re
+from typing import Dict, Any, List, Optional
+
+from aptitude.matcher import KeywordMatcher, TextScan, matcher_for
+
+# ===================== KEYWORDS / SIGNALS (deterministici) =====================
+CRM_KW = ["Salesforce", "HubSpot", "Dynamics", "Zoho", "Pipedrive", "SAP CRM", "Oracle CRM", "CRM"]
+TICKETING_KW = ["Zendesk", "Freshdesk", "Jira Service", "ServiceNow", "OTRS", "Ticketing", "Ticket"]
+CC_TOOLS_KW = ["Genesys", "Avaya", "Five9", "Talkdesk", "NICE", "Twilio Flex", "Dialer", "CTI", "VoIP"]
+OFFICE_KW = ["Microsoft Office", "MS Office", "Office 365", "Excel", "Word", "PowerPoint", "Outlook", "Google Sheets", "Google Docs", "Google Workspace", "Teams", "Zoom", "Meet"]
+
+INBOUND_KW = ["inbound", "incoming calls", "chiamate in entrata", "assistenza", "supporto", "help desk", "service desk", "customer care"]
+OUTBOUND_KW = ["outbound", "cold calling", "chiamate in uscita", "telemarketing", "telesales", "vendita telefonica", "recall", "presa appuntamenti", "lead qualification"]
+KPI_KW = ["kpi", "target", "obiettivi", "quota", "conversion", "conversione", "chiusure", "appointments", "appuntamenti", "calls/day", "chiamate al giorno"]
+STRONG_PHONE_KW = ["call center", "contact center", "telemarketing", "telesales", "dialer", "cold calling"]
+KPI_STEM_KW = ["kpi", "target", "obiettiv", "conversion", "appunt"]
+PHONE_EVIDENCE_KW = ["call center", "contact center", "telemarketing", "telesales", "chiamate in uscita", "chiamate in entrata", "presa appuntamenti", "dialer", "kpi", "target"]
+TOOL_EVIDENCE_KW = ["crm", "salesforce", "hubspot", "zendesk", "kpi", "target", "appuntamenti"]
+
+# Tutte le keyword usate da pre-screen, enrich e snippet: una sola scansione per CV.
+SIGNAL_MATCHER = KeywordMatcher(
+    CRM_KW + TICKETING_KW + CC_TOOLS_KW + OFFICE_KW + INBOUND_KW + OUTBOUND_KW + KPI_KW
+    + STRONG_PHONE_KW + KPI_STEM_KW + PHONE_EVIDENCE_KW + TOOL_EVIDENCE_KW
+)
+
+def scan_signals(text: str) -> TextScan:
+    return SIGNAL_MATCHER.scan(text)
+
+def find_snippets(text: str, keywords: List[str], max_snippets: int = 3, window: int = 140, scan: Optional[TextScan] = None) -> List[str]:
+    if not text:
+        return []
+    if scan is None or not scan.covers(keywords):
+        scan = matcher_for(tuple(keywords)).scan(text)
+    snippets: List[str] = []
+    for kw in keywords:
+        idx = scan.offset(kw)
+        if idx == -1:
+            continue
+        start = max(0, idx - window)
+        end = min(len(text), idx + len(kw) + window)
+        snip = text[start:end].strip().replace("\n", " ")
+        snip = re.sub(r"\s+", " ", snip)
+        if snip and snip not in snippets:
+            snippets.append(snip[:220])
+        if len(snippets) >= max_snippets:
+            break
+    return snippets
+
+# ===================== PRE-SCREEN (deterministico) =====================
+PRESCREEN_FAMILIES = {
+    "inbound": INBOUND_KW,
+    "outbound": OUTBOUND_KW,
+    "kpi": KPI_KW,
+    "cc_tools": CC_TOOLS_KW,
+    "crm": CRM_KW,
+}
+
+def prescreen_hits(text: str, scan: Optional[TextScan] = None) -> Dict[str, int]:
+    """Keyword distinte trovate per famiglia + segnali forti (call center, dialer, ...)."""
+    scan = scan or scan_signals(text)
+    hits = {fam: len(scan.hits(kws)) for fam, kws in PRESCREEN_FAMILIES.items()}
+    hits["strong"] = len(scan.hits(STRONG_PHONE_KW))
+    return hits
+
+def prescreen_score(text: str, scan: Optional[TextScan] = None) -> int:
+    """Punteggio locale: ogni keyword di famiglia vale 1, i segnali forti 2 (come in deterministic_enrich)."""
+    hits = prescreen_hits(text, scan)
+    return sum(v for k, v in hits.items() if k != "strong") + 2 * hits["strong"]
+
+# ===================== FALLBACK/ENRICH (deterministico) =====================
+def deterministic_enrich(
+    extracted: Dict[str, Any],
+    raw_text: str,
+    email_fallback: str,
+    phones_fallback: List[str],
+    scan: Optional[TextScan] = None,
+) -> Dict[str, Any]:
+    """scan: scansione keyword del testo già calcolata (scan_signals), se disponibile."""
+    out = extracted if isinstance(extracted, dict) else {}
+
+    cand = out.get("candidate", {}) if isinstance(out.get("candidate"), dict) else {}
+    if not cand.get("email"):
+        cand["email"] = email_fallback
+
+    phones_ai = cand.get("phones", [])
+    if not isinstance(phones_ai, list):
+        phones_ai = []
+    merged = []
+    seen = set()
+    for p in phones_ai + phones_fallback:
+        s = str(p).strip()
+        if not s:
+            continue
+        if s not in seen:
+            seen.add(s)
+            merged.append(s)
+    cand["phones"] = merged
+    out["candidate"] = cand
+
+    skills = out.get("skills", {}) if isinstance(out.get("skills"), dict) else {}
+    txt = raw_text or ""
+    scan = scan if scan is not None and scan.text == txt else scan_signals(txt)
+
+    def fill_if_empty(field: str, kw_list: List[str]):
+        arr = skills.get(field, [])
+        if not isinstance(arr, list):
+            arr = []
+        if arr:
+            return
+        hits = scan.hits(kw_list)
+        skills[field] = list(dict.fromkeys(hits))[:8] if hits else []
+
+    fill_if_empty("office_tools", OFFICE_KW)
+    fill_if_empty("crm_tools", CRM_KW)
+    fill_if_empty("ticketing_tools", TICKETING_KW)
+    fill_if_empty("contact_center_tools", CC_TOOLS_KW)
+    out["skills"] = skills
+
+    exp = out.get("experience", [])
+    if not isinstance(exp, list):
+        exp = []
+    for e in exp:
+        if not isinstance(e, dict):
+            continue
+        ev = e.get("evidence", [])
+        if not isinstance(ev, list):
+            ev = []
+
+        desc = (e.get("description") or "")
+        is_struct = bool(e.get("is_phone_structured", False))
+
+        if not is_struct:
+            block = scan_signals(str(e.get("role", "")) + " " + str(desc))
+            is_out = block.any(OUTBOUND_KW)
+            is_in = block.any(INBOUND_KW)
+            strong = block.any(STRONG_PHONE_KW) or (is_out and block.any(KPI_STEM_KW))
+            if strong:
+                e["is_phone_structured"] = True
+                if is_out and is_in:
+                    e["phone_type"] = "mixed"
+                elif is_out:
+                    e["phone_type"] = "outbound"
+                elif is_in:
+                    e["phone_type"] = "inbound"
+                else:
+                    e["phone_type"] = "mixed"
+                if not ev:
+                    ev = find_snippets(txt, PHONE_EVIDENCE_KW, 2, scan=scan)
+
+        if not ev:
+            ev2 = find_snippets(txt, TOOL_EVIDENCE_KW, 1, scan=scan)
+            ev = ev2
+
+        e["evidence"] = ev[:3]
+    out["experience"] = exp
+
+    ex = out.get("extraction", {}) if isinstance(out.get("extraction"), dict) else {}
+    try:
+        c = float(ex.get("confidence", 0.0))
+    except Exception:
+        c = 0.0
+    ex["confidence"] = max(0.0, min(1.0, c))
+    out["extraction"] = ex
+    return out
@@ -8,46 +8,37 @@
 #
 # Requisiti:
 #   pip install streamlit pandas PyPDF2 python-docx groq pdf2image pytesseract docx2pdf
+# Opzionale (matcher keyword più veloce):
+#   pip install pyahocorasick
+# Opzionale (anteprime PDF di DOCX/DOC/ODT/RTF con LibreOffice headless persistente):
+#   apt install libreoffice-writer && pip install unoserver
 
-import os
-import re
-import io
+import time
 import json
 import base64
-import tempfile
-from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, time as dt_time
+from typing import List, Tuple
 
 import pandas as pd
 import streamlit as st
-from PyPDF2 import PdfReader
-from docx import Document
-from difflib import SequenceMatcher
-from urllib.parse import quote, quote_plus
-from groq import Groq
 
-# ===================== OCR / CONVERSIONE =====================
-try:
-    from pdf2image import convert_from_bytes
-except ImportError:
-    convert_from_bytes = None
-
-try:
-    import pytesseract
-except ImportError:
-    pytesseract = None
-
-try:
-    from docx2pdf import convert as docx2pdf_convert
-except ImportError:
-    docx2pdf_convert = None
-
-# Configurazione opzionale percorso Tesseract (es. per Windows)
-if pytesseract is not None:
-    tess_cmd = os.getenv("TESSERACT_CMD", "").strip()
-    if tess_cmd:
-        pytesseract.pytesseract.tesseract_cmd = tess_cmd
-
-OCR_AVAILABLE = convert_from_bytes is not None and pytesseract is not None
+from aptitude.contacts import parse_prefixes
+from aptitude.history import ROLE_COLUMNS, ScreeningHistory
+from aptitude.ingest import ARCHIVE_EXTENSIONS, Spool, SpooledCV
+from aptitude.jobs import FAILED, FINISHED, POLL_SECONDS, QUEUED, JobQueue, ensure_workers
+from aptitude.llm import GROQ_API_KEY, GROQ_CONCURRENCY, GROQ_MODEL_FAST
+from aptitude.pipeline import (
+    CURRENT_SCORE_VERSIONS,
+    GROQ_ERROR_LABEL,
+    PRESCREEN_LABEL,
+    SUPPORTED_EXTENSIONS,
+    ScreenSettings,
+    build_row,
+    extraction_confidence,
+    link_duplicates,
+)
+from aptitude.preview import PreviewPending, PreviewStore, preview_ref
+from aptitude.results import ROLE_VIEWS, ResultsTable
 
 # ===================== CONFIGURAZIONE PAGINA =====================
 st.set_page_config(page_title="APTITUDE v2", layout="wide")
@@ -126,16 +117,48 @@ button:hover { background-color: #157347 !important; border-color: #146c43 !impo
     unsafe_allow_html=True,
 )
 
+# ===================== PAGINA ANTEPRIMA (?preview=<ref>) =====================
+# I link "PDF" della tabella aprono l'app in una nuova scheda con ?preview=<ref>:
+# il documento viene letto dallo store solo a questo punto; la conversione in PDF gira in
+# background (LibreOffice) e resta in cache, quindi la pagina non blocca l'app.
+# Lo store è condiviso (cache_resource): il totale dei byte in memoria vale per tutte le pagine.
+@st.cache_resource
+def get_preview_store() -> PreviewStore:
+    return PreviewStore()
+
+def render_preview_page(ref: str) -> None:
+    try:
+        with st.spinner("Conversione in PDF..."):
+            loaded = get_preview_store().load_pdf(ref)
+    except PreviewPending:
+        st.info("Conversione in PDF ancora in corso.")
+        if st.button("Aggiorna anteprima"):
+            st.rerun()
+        return
+    if loaded is None:
+        st.error("Documento non disponibile (riferimento non valido o rimosso dalla cache).")
+        return
+    data, is_pdf = loaded
+    if is_pdf:
+        b64 = base64.b64encode(data).decode("utf-8")
+        st.markdown(
+            f'<iframe src="data:application/pdf;base64,{b64}" width="100%" height="900" style="border:none;"></iframe>',
+            unsafe_allow_html=True,
+        )
+        st.download_button("Scarica PDF", data=data, file_name=ref.rsplit(".", 1)[0][:12] + ".pdf", mime="application/pdf")
+    else:
+        st.info("Anteprima PDF non disponibile per questo formato: scarica il file originale.")
+        st.download_button("Scarica file", data=data, file_name=ref[:12] + "." + ref.rsplit(".", 1)[-1])
+
+requested_preview = st.query_params.get("preview")
+if requested_preview:
+    render_preview_page(requested_preview)
+    st.stop()
+
 # ===================== HEADER =====================
 st.markdown('<div id="custom-title">TLK Aptitude Screener</div>', unsafe_allow_html=True)
 st.markdown('<div id="subtitle">AI-Assisted • v2 (Extract → Score)</div>', unsafe_allow_html=True)
 
-# ===================== CONFIG GROQ =====================
-GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
-GROQ_MODEL_EXTRACT = os.getenv("GROQ_MODEL_EXTRACT", os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"))
-GROQ_MODEL_SCORE = os.getenv("GROQ_MODEL_SCORE", os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"))
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
-
 # ===================== CONFIG APP (SIDEBAR) =====================
 with st.sidebar:
     st.markdown("### Impostazioni")
@@ -150,6 +173,48 @@ with st.sidebar:
         help="Lascia vuoto per accettare tutti i prefissi. Esempio: +39,+41,+33",
     )
     min_extract_conf = st.slider("Soglia Confidence estrazione", 0.0, 1.0, 0.35, 0.05)
+    groq_concurrency = st.slider(
+        "CV analizzati in parallelo",
+        1, 16, max(1, min(16, GROQ_CONCURRENCY)), 1,
+        help="Numero massimo di CV con chiamate Groq in corso contemporaneamente (limite rate-limit).",
+    )
+    force_full_scoring = st.checkbox(
+        "Forza scoring completo (salta pre-screen)",
+        value=False,
+        help="Di default i CV senza segnali telefonici (keyword inbound/outbound/KPI/tool contact center/CRM) non vengono inviati a Groq.",
+    )
+    prescreen_threshold = st.slider(
+        "Soglia pre-screen (segnali telefonici)",
+        0, 10, ScreenSettings.prescreen_threshold, 1,
+        disabled=force_full_scoring,
+        help="Keyword distinte trovate (segnali forti come call center/dialer valgono 2). Sotto soglia: label Bassa (pre-screen).",
+    )
+    dedup_enabled = st.checkbox(
+        "Raggruppa CV quasi duplicati",
+        value=True,
+        help="Stesso CV in più formati/versioni: viene analizzato una sola volta, le copie sono collegate nella colonna Duplicati.",
+    )
+    token_budget = st.slider(
+        "Budget token testo CV",
+        1000, 8000, ScreenSettings.token_budget, 250,
+        help="Il testo viene ripulito (header/footer, privacy, rumore OCR) e ridotto alle sezioni più rilevanti per i ruoli telefonici entro questo budget.",
+    )
+    fused_mode = st.checkbox(
+        "Modalità veloce (extract + score in una chiamata)",
+        value=False,
+        help="Una sola chiamata Groq per CV invece di due: circa metà latenza e token in input, ma lo scoring non vede l'arricchimento deterministico.",
+    )
+    score_batch = st.slider(
+        "CV per chiamata di scoring",
+        1, 10, max(1, min(10, ScreenSettings.score_batch)), 1,
+        disabled=fused_mode,
+        help="Più CV nella stessa richiesta di scoring: prompt e regole si inviano una volta per gruppo (meno token, più CV al minuto sui limiti Groq). 1 = una chiamata per CV.",
+    )
+    routing_enabled = st.checkbox(
+        "Modello veloce per i CV semplici",
+        value=ScreenSettings.routing,
+        help=f"CV con testo nativo, brevi e con segnali telefonici chiari vanno a {GROQ_MODEL_FAST}; OCR e casi ambigui restano sul modello grande, che ripete anche le risposte veloci non valide.",
+    )
     st.markdown("---")
     show_legend_expanded = st.checkbox("Legenda: apri automaticamente", value=False)
     show_debug = st.checkbox("Mostra debug JSON (per file)", value=False)
@@ -159,44 +224,23 @@ with st.sidebar:
     st.markdown("- **Alta** ≥ 75\n- **Media** 45–74\n- **Bassa** ≤ 44")
     st.markdown("**Phone structured**: esperienze con inbound/outbound/call center/dialer/script/KPI.")
     st.markdown("**Confidence estrazione**: affidabilità lettura (PDF testo vs OCR).")
-
-ALLOWED_PREFIXES = [p.strip() for p in allowed_prefixes_str.split(",") if p.strip()]
-ACCEPT_ALL_PREFIXES = len(ALLOWED_PREFIXES) == 0
-
-# ===================== UTIL =====================
-def _similar(a: str, b: str) -> float:
-    return SequenceMatcher(None, a, b).ratio()
-
-def safe_json_loads_maybe(content: str) -> Optional[dict]:
-    """Estrae un JSON da testo (gestisce backticks e testo extra)."""
-    if not content:
-        return None
-    s = content.strip()
-    s = re.sub(r"^```(?:json)?\s*", "", s.strip(), flags=re.IGNORECASE)
-    s = re.sub(r"\s*```$", "", s.strip())
-    start = s.find("{")
-    end = s.rfind("}")
-    if start == -1 or end == -1 or end <= start:
-        return None
-    js = s[start : end + 1]
-    js = js.replace("\t", " ")
-    js = re.sub(r",\s*([}\]])", r"\1", js)
-    try:
-        return json.loads(js)
-    except Exception:
-        return None
-
-def detect_language_hint(text: str) -> str:
-    t = (text or "").lower()
-    if any(w in t for w in ["esperienza", "formazione", "competenze", "lavoro"]):
-        return "it"
-    if any(w in t for w in ["experience", "skills", "education"]):
-        return "en"
-    if any(w in t for w in ["experiencia", "habilidades", "educación"]):
-        return "es"
-    if any(w in t for w in ["erfahrung", "kenntnisse", "ausbildung"]):
-        return "de"
-    return "auto"
+    st.markdown(f"**{PRESCREEN_LABEL}**: nessuna chiamata Groq, pochi segnali telefonici nel testo.")
+    st.markdown(f"**{GROQ_ERROR_LABEL}**: Groq non ha risposto dopo i tentativi, il CV non è stato valutato.")
+
+settings = ScreenSettings(
+    prefer_cc39=default_cc,
+    allowed_prefixes=parse_prefixes(allowed_prefixes_str),
+    min_extract_conf=min_extract_conf,
+    concurrency=groq_concurrency,
+    debug=show_debug,
+    prescreen=not force_full_scoring,
+    prescreen_threshold=prescreen_threshold,
+    dedup=dedup_enabled,
+    fused=fused_mode,
+    token_budget=token_budget,
+    score_batch=score_batch,
+    routing=routing_enabled,
+)
 
 # ===================== LEGENDA (UI) =====================
 def render_legend(expanded: bool = False):
@@ -246,712 +290,190 @@ def render_legend(expanded: bool = False):
 # Mostra legenda centrale (esplicita)
 render_legend(expanded=show_legend_expanded)
 
-# ===================== LETTURA FILE + OCR =====================
-def ocr_pdf_bytes(data: bytes, max_pages: int = 8) -> Tuple[str, float]:
-    """OCR per PDF immagine. Ritorna (testo, confidence approx)."""
-    if not OCR_AVAILABLE or not data:
-        return "", 0.0
-    try:
-        images = convert_from_bytes(data, first_page=1, last_page=max_pages)
-        texts = []
-        nonempty = 0
-        for img in images:
-            txt = pytesseract.image_to_string(img)
-            txt = (txt or "").strip()
-            if txt:
-                nonempty += 1
-                texts.append(txt)
-        if not texts:
-            return "", 0.0
-        conf = min(1.0, 0.25 + 0.1 * nonempty)  # euristica
-        return "\n".join(texts), conf
-    except Exception:
-        return "", 0.0
-
-def extract_text(file, original_bytes: bytes = None) -> Tuple[str, float, str]:
-    """
-    Ritorna (text, confidence, reason).
-    confidence: 1.0 se estrazione testuale ok, 0.4-0.8 se OCR, 0 se fallisce.
-    """
-    ext = file.name.split(".")[-1].lower()
-    if original_bytes is None:
-        try:
-            original_bytes = file.getvalue()
-        except Exception:
-            original_bytes = None
-
-    try:
-        if ext == "pdf":
-            text = ""
-            if original_bytes is not None:
-                reader = PdfReader(io.BytesIO(original_bytes))
-            else:
-                file.seek(0)
-                reader = PdfReader(file)
-            pages_text = []
-            for p in reader.pages:
-                t = p.extract_text() or ""
-                pages_text.append(t)
-            text = "\n".join(pages_text).strip()
-            if text:
-                return text, 1.0, "pdf_text"
-            if original_bytes is not None:
-                ocr_text, ocr_conf = ocr_pdf_bytes(original_bytes)
-                return ocr_text.strip(), ocr_conf, "pdf_ocr" if ocr_text.strip() else "pdf_unreadable"
-            return "", 0.0, "pdf_unreadable"
-
-        if ext == "docx":
-            file.seek(0)
-            txt = "\n".join(p.text for p in Document(file).paragraphs).strip()
-            return txt, (1.0 if txt else 0.0), "docx_text" if txt else "docx_unreadable"
-
-        # DOC/ODT/RTF/TXT: best-effort
-        file.seek(0)
-        raw = file.read()
-        try:
-            txt = raw.decode("utf-8", "ignore").strip()
-        except Exception:
-            txt = ""
-        if len(txt) < 200 and ext in ("doc", "odt", "rtf"):
-            return "", 0.0, f"{ext}_unsupported"
-        return txt, (1.0 if txt else 0.0), f"{ext}_text" if txt else f"{ext}_unreadable"
-    except Exception:
-        if ext == "pdf" and original_bytes:
-            ocr_text, ocr_conf = ocr_pdf_bytes(original_bytes)
-            return ocr_text.strip(), ocr_conf, "pdf_ocr" if ocr_text.strip() else "pdf_unreadable"
-        return "", 0.0, "extract_error"
-
-# ===================== EMAIL / TELEFONI =====================
-def extract_email(text: str) -> str:
-    m = re.search(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", text or "")
-    return m.group(0) if m else ""
-
-def normalize_phone_candidate(raw: str) -> str:
-    s = (raw or "").strip()
-    s = re.sub(r"[^\d+]", "", s)
-    s = re.sub(r"^\+{2,}", "+", s)
-    return s
-
-def looks_like_italian_national(num_digits: str) -> bool:
-    return len(num_digits) == 10 and num_digits.startswith("3")
-
-def extract_phones(text: str, prefer_cc39_if_missing: bool = True) -> List[str]:
-    t = text or ""
-    found: List[str] = []
-    seen = set()
-
-    # 1) numeri con +
-    for m in re.findall(r"(\+\d[0-9\s().-]{7,20}\d)", t):
-        cand = normalize_phone_candidate(m)
-        digits = re.sub(r"\D", "", cand)
-        if not digits:
-            continue
-        if 8 <= len(digits) <= 15:
-            if not ACCEPT_ALL_PREFIXES and not any(cand.startswith(p) for p in ALLOWED_PREFIXES):
-                continue
-            if cand not in seen:
-                seen.add(cand)
-                found.append(cand)
-
-    # 2) numeri senza + (euristiche)
-    for m in re.findall(r"(?<!\+)(?:\b\d[\d\s().-]{7,20}\d\b)", t):
-        cand = re.sub(r"[^\d]", "", m)
-        if not cand or len(cand) < 9 or len(cand) > 12:
-            continue
-        if len(cand) == 8 and cand.startswith(("19", "20")):
-            continue
-
-        if prefer_cc39_if_missing and looks_like_italian_national(cand):
-            out = "+39" + cand
-        else:
-            out = cand
-
-        if out.startswith("+") and (not ACCEPT_ALL_PREFIXES) and (not any(out.startswith(p) for p in ALLOWED_PREFIXES)):
-            continue
-
-        if out not in seen:
-            seen.add(out)
-            found.append(out)
-
-    return found
-
-# ===================== NAME EXTRACTION (fallback) =====================
-def extract_name_fallback(text: str) -> str:
-    lines = [l.strip() for l in (text or "").splitlines() if l.strip()]
-    bad_tokens = [
-        "work experience", "esperienza lavorativa", "esperienze lavorative",
-        "esperienza professionale", "professional experience",
-        "informazioni personali", "dati personali", "personal information",
-        "curriculum vitae", "curriculum", "profile", "profilo",
-        "education", "istruzione", "formazione",
-    ]
-    for l in lines[:25]:
-        low = l.lower()
-        if any(b in low for b in bad_tokens):
-            continue
-        if any(ch.isdigit() for ch in l):
-            continue
-        parts = l.split()
-        if 2 <= len(parts) <= 4:
-            return l
-    return ""
-
-def guess_from_email(email: str) -> str:
-    if not email:
-        return ""
-    nick = re.sub(r"[\d_.-]+", " ", email.split("@")[0])
-    p = [x for x in nick.split() if len(x) > 1]
-    return f"{p[0].capitalize()} {p[1].capitalize()}" if len(p) >= 2 else ""
-
-def clean_name(n: str) -> str:
-    p = [
-        re.sub(r"\d", "", x)
-        for x in (n or "").split()
-        if x.lower() not in {"cv", "profilo", "profile", "mr", "sig", "sig.", "dr", "dott", "dott."}
-    ]
-    return " ".join(x.capitalize() for x in p[:3]) if len(p) >= 2 else ""
-
-def resolve_fullname(name: str, surname: str, text: str, email: str) -> str:
-    for v in [
-        clean_name(f"{name} {surname}".strip()),
-        clean_name(extract_name_fallback(text)),
-        clean_name(guess_from_email(email)),
-    ]:
-        if v:
-            return v
-    return ""
-
-# ===================== KEYWORDS / SIGNALS (deterministici) =====================
-CRM_KW = ["Salesforce", "HubSpot", "Dynamics", "Zoho", "Pipedrive", "SAP CRM", "Oracle CRM", "CRM"]
-TICKETING_KW = ["Zendesk", "Freshdesk", "Jira Service", "ServiceNow", "OTRS", "Ticketing", "Ticket"]
-CC_TOOLS_KW = ["Genesys", "Avaya", "Five9", "Talkdesk", "NICE", "Twilio Flex", "Dialer", "CTI", "VoIP"]
-OFFICE_KW = ["Microsoft Office", "MS Office", "Office 365", "Excel", "Word", "PowerPoint", "Outlook", "Google Sheets", "Google Docs", "Google Workspace", "Teams", "Zoom", "Meet"]
-
-INBOUND_KW = ["inbound", "incoming calls", "chiamate in entrata", "assistenza", "supporto", "help desk", "service desk", "customer care"]
-OUTBOUND_KW = ["outbound", "cold calling", "chiamate in uscita", "telemarketing", "telesales", "vendita telefonica", "recall", "presa appuntamenti", "lead qualification"]
-KPI_KW = ["kpi", "target", "obiettivi", "quota", "conversion", "conversione", "chiusure", "appointments", "appuntamenti", "calls/day", "chiamate al giorno"]
-
-def find_snippets(text: str, keywords: List[str], max_snippets: int = 3, window: int = 140) -> List[str]:
-    if not text:
-        return []
-    low = text.lower()
-    snippets: List[str] = []
-    for kw in keywords:
-        k = kw.lower()
-        idx = low.find(k)
-        if idx == -1:
-            continue
-        start = max(0, idx - window)
-        end = min(len(text), idx + len(kw) + window)
-        snip = text[start:end].strip().replace("\n", " ")
-        snip = re.sub(r"\s+", " ", snip)
-        if snip and snip not in snippets:
-            snippets.append(snip[:220])
-        if len(snippets) >= max_snippets:
-            break
-    return snippets
-
-# ===================== GROQ PROMPTS =====================
-EXTRACT_SYS = """
-Sei un sistema di ESTRAZIONE dati da CV (italiano/inglese/spagnolo/tedesco).
-Devi estrarre SOLO informazioni che sono SUPPORTATE dal testo del CV.
-
-Regole:
-- Restituisci SOLO un oggetto JSON valido, SENZA testo extra.
-- Se un dato non è presente nel CV, usa stringa vuota, lista vuota o false.
-- Per ogni affermazione importante (telefono strutturato, strumenti, KPI, vincoli) includi EVIDENZE:
-  brevi estratti dal CV (max 220 caratteri).
-- Non inventare aziende, date, numeri, KPI, strumenti.
-
-Schema JSON:
-
-{
-  "schema_version": "2.0",
-  "candidate": {"name": "", "surname": "", "email": "", "phones": []},
-  "extraction": {"language_hint": "it|en|es|de|auto", "confidence": 0.0, "notes": ""},
-  "experience": [
-    {
-      "role": "",
-      "company": "",
-      "start": "",
-      "end": "",
-      "description": "",
-      "is_phone_structured": false,
-      "phone_type": "inbound|outbound|mixed|none",
-      "channels": ["phone","email","chat"],
-      "tools": [],
-      "kpi_signals": [],
-      "evidence": []
-    }
-  ],
-  "skills": {
-    "office_tools": [],
-    "crm_tools": [],
-    "ticketing_tools": [],
-    "contact_center_tools": [],
-    "languages": [],
-    "other": []
-  },
-  "constraints": [{"type": "", "evidence": ""}]
-}
-
-Vincoli:
-- "experience" max 8 voci (più recenti o rilevanti).
-- "is_phone_structured"=true SOLO se segnali chiari: inbound/outbound, call center, campagne, dialer, script, KPI, presa appuntamenti, volumi.
-  Se è solo "contatti telefonici" generico/occasionale, lascialo false.
-"""
-
-SCORE_SYS = """
-Sei un sistema di SCORING per ruoli telefonici basato SU JSON estratto (non usare info esterne).
-Produci SOLO JSON valido:
-
-{
-  "schema_version": "2.0",
-  "scores": {
-    "inbound_call_center": {
-      "score": 0,
-      "label": "Alta|Media|Bassa",
-      "dimensions": {
-        "customer_orientation": 0,
-        "process_discipline": 0,
-        "stress_kpi_environment": 0,
-        "digital_fluency": 0,
-        "communication_clarity": 0
-      },
-      "reasons": [],
-      "evidence": []
-    },
-    "outbound_telemarketing": {
-      "score": 0,
-      "label": "Alta|Media|Bassa",
-      "dimensions": {
-        "sales_drive": 0,
-        "objection_handling": 0,
-        "kpi_results": 0,
-        "process_discipline": 0,
-        "digital_fluency": 0
-      },
-      "reasons": [],
-      "evidence": []
-    },
-    "appointment_setting": {
-      "score": 0,
-      "label": "Alta|Media|Bassa",
-      "dimensions": {
-        "lead_qualification": 0,
-        "script_process": 0,
-        "kpi_volumes": 0,
-        "crm_usage": 0,
-        "communication_clarity": 0
-      },
-      "reasons": [],
-      "evidence": []
-    }
-  }
-}
-
-Regole:
-- Ogni dimensione è 0-5 (intero).
-- Score 0-100 deriva da media pesata delle dimensioni.
-- Label: Alta >=75; Media 45-74; Bassa <=44.
-- reasons max 3 frasi brevi in italiano.
-- evidence max 3 estratti, scelti SOLO tra evidenze già presenti nel JSON estratto.
-"""
-
-def groq_extract(cv_text: str, read_conf: float, read_reason: str) -> Dict[str, Any]:
-    empty = {
-        "schema_version": "2.0",
-        "candidate": {"name": "", "surname": "", "email": "", "phones": []},
-        "extraction": {"language_hint": "auto", "confidence": 0.0, "notes": ""},
-        "experience": [],
-        "skills": {
-            "office_tools": [], "crm_tools": [], "ticketing_tools": [],
-            "contact_center_tools": [], "languages": [], "other": []
-        },
-        "constraints": []
-    }
-    if not cv_text or not cv_text.strip() or groq_client is None:
-        return empty
-
-    snippet = cv_text[:16000]
-    lang_hint = detect_language_hint(cv_text)
-
-    user_payload = {
-        "text": snippet,
-        "reading": {"method_confidence": read_conf, "method_reason": read_reason, "language_hint": lang_hint},
+# ===================== CACHE RISULTATI =====================
+# Lettura, OCR e chiamate Groq girano nei worker della coda (vedi aptitude/jobs.py):
+# l'app accoda i CV e legge l'avanzamento, senza lavoro pesante nel processo Streamlit.
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    return JobQueue()
+
+@st.cache_resource
+def get_history() -> ScreeningHistory:
+    return ScreeningHistory()
+
+# ===================== AVANZAMENTO BATCH =====================
+def analysis_key(name: str, content_hash: str, settings: ScreenSettings) -> str:
+    """Chiave risultato in sessione: file + impostazioni che cambiano l'analisi (telefoni, pre-screen, fused, budget token, routing)."""
+    return "|".join([
+        name, content_hash, str(settings.prefer_cc39), ",".join(settings.allowed_prefixes),
+        str(settings.prescreen), str(settings.prescreen_threshold), str(settings.dedup),
+        str(settings.fused), str(settings.token_budget), str(settings.routing),
+    ])
+
+def live_status_row(res: dict) -> dict:
+    """Riga sintetica per la tabella live mostrata durante il batch."""
+    if not res["raw_text"] or not res["raw_text"].strip():
+        return {
+            "Nome file": res["name"], "Stato": f"non letto ({res['read_reason']})", "Nome e Cognome": "",
+            "Numero/Numeri telefono": "", "Best score": None, "Best label": "",
+        }
+    row = build_row(res, settings)
+    return {
+        "Nome file": res["name"],
+        "Stato": (
+            f"errore Groq ({res['llm_error']})" if res.get("llm_error")
+            else f"duplicato di {res['duplicate_of']}" if res.get("duplicate_of")
+            else "ok"
+        ),
+        "Nome e Cognome": row["Nome e Cognome"],
+        "Numero/Numeri telefono": row["Numero/Numeri telefono"],
+        "Best score": row["Best score"],
+        "Best label": row["Best label"],
     }
 
-    try:
-        resp = groq_client.chat.completions.create(
-            model=GROQ_MODEL_EXTRACT,
-            messages=[
-                {"role": "system", "content": EXTRACT_SYS},
-                {"role": "user", "content": "Estrai i dati dal CV (testo + meta-lettura):\n" + json.dumps(user_payload, ensure_ascii=False)},
-            ],
-            temperature=0.05,
-            max_tokens=1400,
-        )
-        content = (resp.choices[0].message.content or "").strip()
-        data = safe_json_loads_maybe(content) or {}
-    except Exception:
-        data = {}
-
-    out = empty
-    if isinstance(data, dict):
-        out["schema_version"] = str(data.get("schema_version", "2.0"))
-        out["candidate"] = data.get("candidate", out["candidate"]) if isinstance(data.get("candidate"), dict) else out["candidate"]
-        out["extraction"] = data.get("extraction", out["extraction"]) if isinstance(data.get("extraction"), dict) else out["extraction"]
-        out["experience"] = data.get("experience", out["experience"]) if isinstance(data.get("experience"), list) else out["experience"]
-        out["skills"] = data.get("skills", out["skills"]) if isinstance(data.get("skills"), dict) else out["skills"]
-        out["constraints"] = data.get("constraints", out["constraints"]) if isinstance(data.get("constraints"), list) else out["constraints"]
-
-    if isinstance(out["experience"], list) and len(out["experience"]) > 8:
-        out["experience"] = out["experience"][:8]
-
-    try:
-        c = float(out["extraction"].get("confidence", 0.0))
-        out["extraction"]["confidence"] = max(0.0, min(1.0, c))
-    except Exception:
-        out["extraction"]["confidence"] = 0.0
-
-    return out
-
-def groq_score(extracted: Dict[str, Any]) -> Dict[str, Any]:
-    empty = {
-        "schema_version": "2.0",
-        "scores": {
-            "inbound_call_center": {"score": 0, "label": "Bassa", "dimensions": {}, "reasons": [], "evidence": []},
-            "outbound_telemarketing": {"score": 0, "label": "Bassa", "dimensions": {}, "reasons": [], "evidence": []},
-            "appointment_setting": {"score": 0, "label": "Bassa", "dimensions": {}, "reasons": [], "evidence": []},
-        },
+def live_partial_row(contacts: dict) -> dict:
+    """Riga live di un CV con i contatti già estratti (streaming) e lo scoring ancora in corso."""
+    return {
+        "Nome file": contacts["Nome file"], "Stato": "contatti estratti, scoring in corso",
+        "Nome e Cognome": contacts["Nome e Cognome"], "Numero/Numeri telefono": contacts["Numero/Numeri telefono"],
+        "Best score": None, "Best label": "",
     }
-    if groq_client is None:
-        return empty
-    try:
-        resp = groq_client.chat.completions.create(
-            model=GROQ_MODEL_SCORE,
-            messages=[
-                {"role": "system", "content": SCORE_SYS},
-                {"role": "user", "content": "Esegui scoring usando SOLO questo JSON estratto:\n" + json.dumps(extracted, ensure_ascii=False)},
-            ],
-            temperature=0.05,
-            max_tokens=900,
-        )
-        content = (resp.choices[0].message.content or "").strip()
-        data = safe_json_loads_maybe(content) or {}
-        if not isinstance(data, dict) or "scores" not in data:
-            return empty
-        return data
-    except Exception:
-        return empty
-
-# ===================== FALLBACK/ENRICH (deterministico) =====================
-def deterministic_enrich(extracted: Dict[str, Any], raw_text: str, email_fallback: str, phones_fallback: List[str]) -> Dict[str, Any]:
-    out = extracted if isinstance(extracted, dict) else {}
-
-    cand = out.get("candidate", {}) if isinstance(out.get("candidate"), dict) else {}
-    if not cand.get("email"):
-        cand["email"] = email_fallback
-
-    phones_ai = cand.get("phones", [])
-    if not isinstance(phones_ai, list):
-        phones_ai = []
-    merged = []
-    seen = set()
-    for p in phones_ai + phones_fallback:
-        s = str(p).strip()
-        if not s:
-            continue
-        if s not in seen:
-            seen.add(s)
-            merged.append(s)
-    cand["phones"] = merged
-    out["candidate"] = cand
-
-    skills = out.get("skills", {}) if isinstance(out.get("skills"), dict) else {}
-    txt = raw_text or ""
-    low = txt.lower()
-
-    def fill_if_empty(field: str, kw_list: List[str]):
-        arr = skills.get(field, [])
-        if not isinstance(arr, list):
-            arr = []
-        if arr:
-            return
-        hits = []
-        for k in kw_list:
-            if k.lower() in low:
-                hits.append(k)
-        skills[field] = list(dict.fromkeys(hits))[:8] if hits else []
-
-    fill_if_empty("office_tools", OFFICE_KW)
-    fill_if_empty("crm_tools", CRM_KW)
-    fill_if_empty("ticketing_tools", TICKETING_KW)
-    fill_if_empty("contact_center_tools", CC_TOOLS_KW)
-    out["skills"] = skills
 
-    exp = out.get("experience", [])
-    if not isinstance(exp, list):
-        exp = []
-    for e in exp:
-        if not isinstance(e, dict):
-            continue
-        ev = e.get("evidence", [])
-        if not isinstance(ev, list):
-            ev = []
-
-        desc = (e.get("description") or "")
-        block = (str(e.get("role", "")) + " " + str(desc)).lower()
-        is_struct = bool(e.get("is_phone_structured", False))
-
-        if not is_struct:
-            strong = any(k in block for k in ["call center", "contact center", "telemarketing", "telesales", "dialer", "cold calling"])
-            strong = strong or (any(k in block for k in OUTBOUND_KW) and any(k in block for k in ["kpi", "target", "obiettiv", "conversion", "appunt"]))
-            if strong:
-                e["is_phone_structured"] = True
-                if any(k in block for k in OUTBOUND_KW) and any(k in block for k in INBOUND_KW):
-                    e["phone_type"] = "mixed"
-                elif any(k in block for k in OUTBOUND_KW):
-                    e["phone_type"] = "outbound"
-                elif any(k in block for k in INBOUND_KW):
-                    e["phone_type"] = "inbound"
-                else:
-                    e["phone_type"] = "mixed"
-                if not ev:
-                    ev = find_snippets(
-                        txt,
-                        ["call center", "contact center", "telemarketing", "telesales", "chiamate in uscita", "chiamate in entrata", "presa appuntamenti", "dialer", "kpi", "target"],
-                        2,
-                    )
-
-        if not ev:
-            ev2 = find_snippets(txt, ["crm", "salesforce", "hubspot", "zendesk", "kpi", "target", "appuntamenti"], 1)
-            ev = ev2
-
-        e["evidence"] = ev[:3]
-    out["experience"] = exp
-
-    ex = out.get("extraction", {}) if isinstance(out.get("extraction"), dict) else {}
-    try:
-        c = float(ex.get("confidence", 0.0))
-    except Exception:
-        c = 0.0
-    ex["confidence"] = max(0.0, min(1.0, c))
-    out["extraction"] = ex
-    return out
-
-# ===================== CONVERSIONE A PDF + DATA URI =====================
-def to_pdf_bytes(original_bytes: bytes, ext: str) -> bytes:
-    ext = (ext or "").lower()
-    if ext == "pdf":
-        return original_bytes
-    if ext == "docx" and docx2pdf_convert is not None:
-        try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                in_path = os.path.join(tmpdir, "input.docx")
-                out_path = os.path.join(tmpdir, "output.pdf")
-                with open(in_path, "wb") as f_in:
-                    f_in.write(original_bytes)
-                docx2pdf_convert(in_path, out_path)
-                with open(out_path, "rb") as f_out:
-                    return f_out.read()
-        except Exception:
-            return original_bytes
-    return original_bytes
-
-def build_pdf_data_uri(filename: str, original_bytes: bytes) -> str:
-    ext = filename.split(".")[-1].lower()
-    pdf_bytes = to_pdf_bytes(original_bytes, ext)
-    b64 = base64.b64encode(pdf_bytes).decode("utf-8")
-    return f"data:application/pdf;base64,{b64}"
-
-# ===================== MESSAGGI STANDARD =====================
-standard_message = (
-    "Buongiorno,\n"
-    "abbiamo ricevuto il tuo CV in merito alla posizione di operatore telefonico. "
-    "Quando preferisci essere contattato?\n"
-    "Grazie e buona giornata"
-)
-email_subject = "Selezione per attività operatore telefonico"
+# ===================== INGESTIONE =====================
+def ingest_uploads(files) -> Tuple[List[SpooledCV], List[str]]:
+    """
+    Upload copiati su disco a blocchi (archivi zip/tar espansi, tipo dal contenuto) una
+    sola volta per file: i rerun riusano i metadati. I file rimossi dall'uploader
+    vengono eliminati dallo spool della sessione.
+    """
+    spool = st.session_state.get("spool")
+    if spool is None:
+        spool = st.session_state["spool"] = Spool(SUPPORTED_EXTENSIONS)
+    ingested = st.session_state.setdefault("ingested", {})
+    current = {f.file_id for f in files}
+    for file_id in [fid for fid in ingested if fid not in current]:
+        for cv in ingested.pop(file_id)[0]:
+            spool.discard(cv)
+
+    cvs: List[SpooledCV] = []
+    skipped: List[str] = []
+    for f in files:
+        if f.file_id not in ingested:
+            spool.skipped = []
+            f.seek(0)
+            ingested[f.file_id] = (list(spool.add(f.name, f)), spool.skipped)
+        cvs.extend(ingested[f.file_id][0])
+        skipped.extend(ingested[f.file_id][1])
+    return cvs, skipped
 
 # ===================== UI UPLOADER =====================
 uploaded_files = st.file_uploader(
     "Import CV",
     accept_multiple_files=True,
-    type=["pdf", "docx", "txt", "doc", "odt", "rtf"],
+    type=list(SUPPORTED_EXTENSIONS) + list(ARCHIVE_EXTENSIONS),
     label_visibility="collapsed",
+    help="CV singoli o archivi zip/tar (anche annidati) esportati dai job board.",
 )
 
-if uploaded_files and groq_client is None:
+if uploaded_files and not GROQ_API_KEY:
     st.error("GROQ_API_KEY non impostata. Imposta la chiave Groq e riavvia l'app.")
 
 # ===================== ANALISI =====================
-if uploaded_files and groq_client is not None:
-    status_box = st.empty()
-    status_box.info("Analisi in corso sui CV caricati...")
-
-    rows = []
-    unreadable = []
-
-    for f in uploaded_files:
-        original_bytes = f.getvalue()
-        raw_text, read_conf, read_reason = extract_text(f, original_bytes)
-
-        if not raw_text or not raw_text.strip():
-            unreadable.append(f"{f.name} ({read_reason})")
-            continue
-
-        email_fb = extract_email(raw_text)
-        phones_fb = extract_phones(raw_text, prefer_cc39_if_missing=default_cc)
-
-        extracted = groq_extract(raw_text, read_conf, read_reason)
-        extracted = deterministic_enrich(extracted, raw_text, email_fb, phones_fb)
-
-        cand = extracted.get("candidate", {}) if isinstance(extracted.get("candidate"), dict) else {}
-        fullname = resolve_fullname(cand.get("name", ""), cand.get("surname", ""), raw_text, cand.get("email", ""))
-
-        llm_conf = 0.0
-        try:
-            llm_conf = float(extracted.get("extraction", {}).get("confidence", 0.0))
-        except Exception:
-            llm_conf = 0.0
-        extraction_confidence = max(0.0, min(1.0, 0.55 * read_conf + 0.45 * llm_conf))
-
-        scored = groq_score(extracted)
-
-        scores = scored.get("scores", {}) if isinstance(scored.get("scores"), dict) else {}
-        inbound = scores.get("inbound_call_center", {}) if isinstance(scores.get("inbound_call_center"), dict) else {}
-        outbound = scores.get("outbound_telemarketing", {}) if isinstance(scores.get("outbound_telemarketing"), dict) else {}
-        appoint = scores.get("appointment_setting", {}) if isinstance(scores.get("appointment_setting"), dict) else {}
-
-        def pick_score(d: dict) -> Tuple[int, str, str, str]:
-            sc = int(d.get("score", 0) or 0)
-            lab = str(d.get("label", "Bassa") or "Bassa")
-            reasons = d.get("reasons", [])
-            if not isinstance(reasons, list):
-                reasons = []
-            evid = d.get("evidence", [])
-            if not isinstance(evid, list):
-                evid = []
-            return sc, lab, " • ".join([str(x) for x in reasons[:3]]), "\n".join([str(x) for x in evid[:3]])
-
-        sc_in, lab_in, rs_in, ev_in = pick_score(inbound)
-        sc_out, lab_out, rs_out, ev_out = pick_score(outbound)
-        sc_ap, lab_ap, rs_ap, ev_ap = pick_score(appoint)
-
-        skills = extracted.get("skills", {}) if isinstance(extracted.get("skills"), dict) else {}
-        office_tools = skills.get("office_tools", [])
-        crm_tools = skills.get("crm_tools", [])
-        ticket_tools = skills.get("ticketing_tools", [])
-        cc_tools = skills.get("contact_center_tools", [])
-
-        def short_list(x, n=6):
-            if not isinstance(x, list):
-                return ""
-            y = [str(i).strip() for i in x if str(i).strip()]
-            return ", ".join(list(dict.fromkeys(y))[:n])
-
-        tools_str = " | ".join(
-            [s for s in [short_list(office_tools, 4), short_list(crm_tools, 4), short_list(ticket_tools, 3), short_list(cc_tools, 3)] if s]
-        )
-
-        exp = extracted.get("experience", [])
-        phone_struct = 0
-        phone_types = []
-        evid_phone = []
-        if isinstance(exp, list):
-            for e in exp:
-                if not isinstance(e, dict):
-                    continue
-                if bool(e.get("is_phone_structured", False)):
-                    phone_struct += 1
-                    pt = str(e.get("phone_type", "none"))
-                    if pt and pt not in phone_types:
-                        phone_types.append(pt)
-                    ev = e.get("evidence", [])
-                    if isinstance(ev, list):
-                        for s in ev[:1]:
-                            if s and s not in evid_phone:
-                                evid_phone.append(str(s))
-        phone_type_str = ", ".join(phone_types) if phone_types else "none"
-        evid_phone_str = "\n".join(evid_phone[:3])
-
-        pdf_data_uri = build_pdf_data_uri(f.name, original_bytes)
-
-        best_score = max(sc_in, sc_out, sc_ap)
-        label_best = "Alta" if best_score >= 75 else "Media" if best_score >= 45 else "Bassa"
-
-        whatsapp_url = ""
-        phones = cand.get("phones", [])
-        first_phone = ""
-        if isinstance(phones, list) and phones:
-            first_phone = str(phones[0]).strip()
-        if label_best in ("Alta", "Media") and first_phone:
-            phone_digits = re.sub(r"[^\d]", "", first_phone)
-            if phone_digits:
-                encoded_text = quote(standard_message)
-                whatsapp_url = f"https://api.whatsapp.com/send?phone={phone_digits}&text={encoded_text}"
-
-        email = cand.get("email", "") or email_fb
-        mailto = ""
-        if isinstance(email, str) and email.strip():
-            subject_enc = quote_plus(email_subject)
-            body_enc = quote(standard_message)
-            mailto = f"mailto:{email}?subject={subject_enc}&body={body_enc}"
-
-        row = {
-            "Nome file": f.name,
-            "Nome e Cognome": fullname,
-            "Confidence estrazione": round(extraction_confidence, 2),
-            "Metodo lettura": read_reason,
-            "Tools/Stack": tools_str if tools_str else "-",
-            "Phone structured (#exp)": phone_struct,
-            "Phone type": phone_type_str,
-            "Evidenze phone": evid_phone_str,
-            "Inbound score": sc_in,
-            "Inbound label": lab_in,
-            "Inbound reasons": rs_in,
-            "Inbound evidence": ev_in,
-            "Outbound score": sc_out,
-            "Outbound label": lab_out,
-            "Outbound reasons": rs_out,
-            "Outbound evidence": ev_out,
-            "Appoint score": sc_ap,
-            "Appoint label": lab_ap,
-            "Appoint reasons": rs_ap,
-            "Appoint evidence": ev_ap,
-            "Best score": best_score,
-            "Best label": label_best,
-            "Read": pdf_data_uri,
-            "Numero/Numeri telefono": " | ".join([str(p) for p in phones]) if isinstance(phones, list) else "",
-            "Whatsapp": whatsapp_url,
-            "E-Mail": mailto,
-        }
-
-        if show_debug:
-            row["_debug_extract_json"] = json.dumps(extracted, ensure_ascii=False)
-            row["_debug_score_json"] = json.dumps(scored, ensure_ascii=False)
-
-        if extraction_confidence >= min_extract_conf:
-            rows.append(row)
+if uploaded_files and GROQ_API_KEY:
+    cvs, skipped = ingest_uploads(uploaded_files)
+    if skipped:
+        st.warning("Alcuni file non sono stati importati: " + ", ".join(skipped))
+    keys = [analysis_key(cv.name, cv.content_hash, settings) for cv in cvs]
+
+    # Risultati completati restano in sessione: un rerun (o un batch interrotto) riparte
+    # dai file mancanti. Teniamo solo quelli dell'upload corrente.
+    done = st.session_state.setdefault("analysis_done", {})
+    for k in [k for k in done if k not in set(keys)]:
+        del done[k]
+    pending = [i for i, k in enumerate(keys) if k not in done]
+
+    if pending:
+        # Job nella coda condivisa: chiudere o ricaricare la pagina non ferma l'analisi, e
+        # lo stesso batch inviato da un'altra sessione si aggancia al job già in corso.
+        job_queue = get_job_queue()
+        ensure_workers(job_queue)
+        job_id = job_queue.submit([cvs[i] for i in pending], [keys[i] for i in pending], settings)
+        progress = st.progress(0.0, text="CV in coda per l'analisi...")
+        live_table = st.empty()
+        live_rows = {k: live_status_row(done[k]) for k in keys if k in done}
+        seq = 0
+        while True:
+            # stato prima delle novità: a job concluso tutti i risultati sono già visibili
+            job = job_queue.job(job_id)
+            changed, seq = job_queue.changes(job_id, seq)
+            for item in changed:
+                if item["result"] is not None:
+                    done[item["key"]] = item["result"]
+                    live_rows[item["key"]] = live_status_row(item["result"])
+                elif item["partial"] is not None and item["key"] not in done:
+                    live_rows[item["key"]] = live_partial_row(item["partial"])
+            if changed:
+                n_done = sum(1 for k in keys if k in done)
+                progress.progress(n_done / len(keys), text=f"{n_done}/{len(keys)} CV analizzati")
+                live_table.dataframe(pd.DataFrame(list(live_rows.values())), hide_index=True, use_container_width=True)
+            if job is None or job["status"] in FINISHED:
+                break
+            if job["status"] == QUEUED:
+                waiting = "in attesa di un worker libero" if job_queue.live_workers() else "nessun worker attivo (python -m aptitude worker)"
+                progress.progress(0.0, text=f"CV in coda: {waiting}...")
+            time.sleep(POLL_SECONDS)
+        progress.empty()
+        live_table.empty()
+        if job is None or any(k not in done for k in keys):
+            reason = (job["error"] or f"stato {job['status']}") if job else "job non trovato"
+            st.error(f"Analisi interrotta: {reason}. I CV mancanti si ripetono al prossimo aggiornamento.")
+            cvs = [cv for cv, k in zip(cvs, keys) if k in done]
+            keys = [k for k in keys if k in done]
+        else:
+            st.success("Analisi completata.")
+
+    # CV con errore Groq (rate limit, timeout, servizio giù): non sono score 0, si ripetono
+    failed = [k for k in keys if done[k].get("llm_error")]
+    if failed:
+        st.warning(f"{len(failed)} CV non valutati per errore Groq ({GROQ_ERROR_LABEL}).")
+        if st.button("Riprova CV con errore Groq"):
+            for k in failed:
+                del done[k]
+            st.rerun()
+
+    # Tabella risultati colonnare: ricostruita solo se cambiano risultati o soglia,
+    # i rerun dei filtri (ogni tasto nella ricerca) lavorano sugli indici già pronti.
+    label_options = ["Alta", "Media", "Bassa", PRESCREEN_LABEL, GROQ_ERROR_LABEL]
+    table_sig = (tuple(keys), tuple(id(done[k]) for k in keys), min_extract_conf, settings.debug)
+    cached_table = st.session_state.get("results_table")
+    if cached_table is None or cached_table[0] != table_sig:
+        rows = []
+        unreadable = []
+        for cv, k in zip(cvs, keys):
+            res = done[k]
+            if not res["raw_text"] or not res["raw_text"].strip():
+                unreadable.append(f"{cv.name} ({res['read_reason']})")
+                continue
 
-    status_box.empty()
-    st.success("Analisi completata.")
+            if res.get("llm_error") or extraction_confidence(res) >= min_extract_conf:
+                ref = get_preview_store().put_file(cv.name, cv.path, cv.content_hash)
+                rows.append(build_row(res, settings, read_link=f"./?preview={ref}"))
+        link_duplicates(rows)
+        cached_table = st.session_state["results_table"] = (table_sig, ResultsTable(rows, label_options), unreadable)
+    _, table, unreadable = cached_table
 
     if unreadable:
         st.warning("Alcuni CV non sono stati letti correttamente e non sono stati analizzati.")
         st.write(", ".join(unreadable))
 
-    if rows:
-        df = pd.DataFrame(rows)
-
+    if len(table):
         # ======= FILTRI UI =======
         st.markdown("### Risultati")
         c1, c2, c3, c4 = st.columns([1, 1, 1.2, 1.2])
         with c1:
             role_filter = st.selectbox(
                 "Vista ruolo",
-                ["Best", "Inbound", "Outbound", "Appoint"],
+                list(ROLE_VIEWS),
                 index=0,
                 help=(
                     "Best=mostra il punteggio migliore. "
@@ -961,7 +483,7 @@ if uploaded_files and groq_client is not None:
         with c2:
             min_score = st.slider("Score minimo", 0, 100, 0, 5)
         with c3:
-            label_filter = st.multiselect("Label", ["Alta", "Media", "Bassa"], default=["Alta", "Media", "Bassa"])
+            label_filter = st.multiselect("Label", label_options, default=label_options)
         with c4:
             name_query = st.text_input("Cerca (nome/file)", value="")
 
@@ -973,27 +495,8 @@ if uploaded_files and groq_client is not None:
         }
         st.caption(f"**Criteri vista {role_filter}:** {role_help.get(role_filter, '')}")
 
-        def role_cols(role: str) -> Tuple[str, str, str, str]:
-            if role == "Inbound":
-                return "Inbound score", "Inbound label", "Inbound reasons", "Inbound evidence"
-            if role == "Outbound":
-                return "Outbound score", "Outbound label", "Outbound reasons", "Outbound evidence"
-            if role == "Appoint":
-                return "Appoint score", "Appoint label", "Appoint reasons", "Appoint evidence"
-            return "Best score", "Best label", "Inbound reasons", "Inbound evidence"
-
-        score_col, label_col, reasons_col, evidence_col = role_cols(role_filter)
-
-        view = df.copy()
-        view = view[view[label_col].isin(label_filter)]
-        view = view[view[score_col] >= min_score]
-
-        if name_query.strip():
-            q = name_query.strip().lower()
-            view = view[
-                view["Nome e Cognome"].fillna("").str.lower().str.contains(q)
-                | view["Nome file"].fillna("").str.lower().str.contains(q)
-            ]
+        score_col, label_col, reasons_col, evidence_col = ROLE_VIEWS[role_filter]
+        positions = table.select(role_filter, label_filter, min_score, name_query)
 
         base_cols = [
             "Nome file",
@@ -1008,21 +511,31 @@ if uploaded_files and groq_client is not None:
             label_col,
             reasons_col,
             evidence_col,
+            "Duplicato di",
+            "Duplicati",
             "Read",
             "Numero/Numeri telefono",
             "Whatsapp",
             "E-Mail",
         ]
-        base_cols = [c for c in base_cols if c in view.columns]
-        view = view[base_cols].sort_values(by=score_col, ascending=False)
 
-        st.download_button(
-            "Export CSV (vista corrente)",
-            data=view.to_csv(index=False).encode("utf-8"),
-            file_name="screening_export.csv",
-            mime="text/csv",
-        )
+        # Solo la pagina visibile viene serializzata verso il browser
+        p1, p2, p3 = st.columns([1, 1, 2])
+        with p1:
+            page_size = st.selectbox("Righe per pagina", [50, 100, 250, 500], index=1)
+        n_pages = max(1, -(-len(positions) // page_size))
+        with p2:
+            page = st.number_input("Pagina", min_value=1, max_value=n_pages, value=1, step=1)
+        with p3:
+            st.caption(f"{len(positions)} CV nella vista • pagina {page}/{n_pages}")
+            st.download_button(
+                "Export CSV (vista corrente)",
+                data=lambda: table.page(positions, base_cols).to_csv(index=False).encode("utf-8"),
+                file_name="screening_export.csv",
+                mime="text/csv",
+            )
 
+        view = table.page(positions, base_cols, page, page_size)
         n_rows = len(view)
         table_height = min(760, 44 + n_rows * 32)
 
@@ -1043,6 +556,123 @@ if uploaded_files and groq_client is not None:
     else:
         st.info("Nessun CV supera la soglia di Confidence estrazione selezionata.")
 
+# ===================== STORICO =====================
+# CV analizzati in sessioni precedenti (SQLite locale): consultabili senza ricaricare i file
+# e senza chiamate Groq. Filtri, ordinamento e paginazione girano come query indicizzate.
+history = get_history()
+history_total = history.count()
+if history_total:
+    with st.expander(f"Storico screening ({history_total} CV)", expanded=not uploaded_files):
+        # Dopo una modifica di SCORE_SYS / modello di scoring / soglie: solo groq_score sulle
+        # estrazioni salvate (per CV o a gruppi), senza ricaricare né rileggere i file.
+        # Il ricalcolo è un job dei worker come lo screening: la pagina lo accoda e ne legge
+        # l'avanzamento, chiuderla non lo ferma e un solo ricalcolo è aperto alla volta.
+        job_queue = get_job_queue()
+        stale = history.count_stale(CURRENT_SCORE_VERSIONS)
+        open_rescore = job_queue.open_rescore()
+        stale_note = None
+        if stale:
+            s1, s2 = st.columns([3, 1])
+            with s1:
+                stale_note = st.empty()
+                if open_rescore is not None and st.session_state.get("rescore_job") != open_rescore:
+                    stale_note.caption(f"{stale} CV con uno score di una versione precedente: ricalcolo già in corso.")
+                else:
+                    stale_note.caption(f"{stale} CV hanno uno score calcolato con una versione precedente dello scoring.")
+            with s2:
+                run_rescore = st.button("Ricalcola score", disabled=not GROQ_API_KEY or open_rescore is not None)
+            if run_rescore:
+                ensure_workers(job_queue)
+                st.session_state["rescore_job"] = job_queue.submit_rescore(settings, stale)
+
+        rescore_job_id = st.session_state.get("rescore_job")
+        if rescore_job_id is not None:
+            rescore_progress = st.progress(0.0, text="Ricalcolo score in coda...")
+            while True:
+                rescore_job = job_queue.job(rescore_job_id)
+                if rescore_job is None or rescore_job["status"] in FINISHED:
+                    break
+                if rescore_job["status"] == QUEUED:
+                    waiting = "in attesa di un worker libero" if job_queue.live_workers() else "nessun worker attivo (python -m aptitude worker)"
+                    rescore_progress.progress(0.0, text=f"Ricalcolo score in coda: {waiting}...")
+                else:
+                    n_rescored, n_stale = rescore_job["completed"], max(1, rescore_job["total"])
+                    rescore_progress.progress(min(1.0, n_rescored / n_stale), text=f"{n_rescored}/{n_stale} CV ricalcolati")
+                time.sleep(POLL_SECONDS)
+            rescore_progress.empty()
+            if stale_note is not None:
+                stale_note.empty()
+            del st.session_state["rescore_job"]
+            if rescore_job is None or rescore_job["status"] == FAILED:
+                reason = (rescore_job["error"] or f"stato {rescore_job['status']}") if rescore_job else "job non trovato"
+                st.error(f"Ricalcolo score interrotto: {reason}. I CV mancanti restano da ricalcolare.")
+            else:
+                outcome = json.loads(rescore_job["result_json"] or "{}")
+                updated, failed_rescore = outcome.get("updated", 0), outcome.get("failed", 0)
+                if failed_rescore:
+                    st.warning(f"{updated} CV aggiornati, {failed_rescore} non ricalcolati per errore Groq (riprovare).")
+                else:
+                    st.success(f"{updated} CV aggiornati.")
+
+        h1, h2, h3, h4, h5 = st.columns([1, 1, 1.2, 1.2, 1])
+        with h1:
+            hist_role = st.selectbox("Vista ruolo", list(ROLE_COLUMNS), key="hist_role")
+        with h2:
+            hist_min_score = st.slider("Score minimo", 0, 100, 0, 5, key="hist_min_score")
+        with h3:
+            hist_label_options = ["Alta", "Media", "Bassa", PRESCREEN_LABEL]
+            hist_labels = st.multiselect("Label", hist_label_options, default=hist_label_options, key="hist_labels")
+        with h4:
+            hist_search = st.text_input("Cerca (nome/file)", value="", key="hist_search")
+        with h5:
+            hist_since = st.date_input("Analizzati dal", value=None, key="hist_since")
+
+        h6, h7, h8 = st.columns([1, 1, 1])
+        with h6:
+            hist_sort = st.selectbox("Ordina per", ["Score", "Ultimo screening"], key="hist_sort")
+        with h7:
+            hist_page_size = st.selectbox("Righe per pagina", [25, 50, 100, 250], index=1, key="hist_page_size")
+
+        hist_query = dict(
+            role=hist_role,
+            labels=hist_labels,
+            min_score=hist_min_score,
+            search=hist_search,
+            since=datetime.combine(hist_since, dt_time.min).timestamp() if hist_since else None,
+            sort="score" if hist_sort == "Score" else "last_seen",
+        )
+        _, hist_matches = history.query(**hist_query, limit=0)
+        hist_pages = max(1, -(-hist_matches // hist_page_size))
+        with h8:
+            hist_page = st.number_input("Pagina", min_value=1, max_value=hist_pages, value=1, step=1, key="hist_page")
+
+        t0 = time.perf_counter()
+        hist_rows, _ = history.query(**hist_query, limit=hist_page_size, offset=(hist_page - 1) * hist_page_size)
+        hist_ms = (time.perf_counter() - t0) * 1000
+        st.caption(f"{hist_matches} CV trovati • pagina {hist_page}/{hist_pages} • query {hist_ms:.1f} ms")
+
+        if hist_rows:
+            hist_df = pd.DataFrame(hist_rows)
+            hist_df["Read"] = [f"./?preview={preview_ref(n, h)}" for n, h in zip(hist_df["Nome file"], hist_df["Hash"])]
+            hist_df["Ultimo screening"] = pd.to_datetime(hist_df["Ultimo screening"], unit="s")
+            h_score, h_label, h_reasons, _ = ROLE_VIEWS[hist_role]
+            hist_cols = [
+                "Ultimo screening", "Nome file", "Nome e Cognome", "Confidence estrazione", h_score, h_label,
+                h_reasons, "Phone type", "Read", "Numero/Numeri telefono", "Whatsapp", "E-Mail",
+            ]
+            st.dataframe(
+                hist_df[[c for c in hist_cols if c in hist_df.columns]],
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    h_score: st.column_config.ProgressColumn(h_score, min_value=0, max_value=100, format="%d"),
+                    "Ultimo screening": st.column_config.DatetimeColumn("Ultimo screening", format="YYYY-MM-DD HH:mm"),
+                    "Read": st.column_config.LinkColumn("PDF", display_text="PDF"),
+                    "Whatsapp": st.column_config.LinkColumn("WhatsApp", display_text="WhatsApp"),
+                    "E-Mail": st.column_config.LinkColumn("E-mail", display_text="E-mail"),
+                },
+            )
+
 # ===================== FOOTER =====================
 st.markdown(
     """
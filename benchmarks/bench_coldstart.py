@@ -0,0 +1,138 @@
+# Benchmark di avvio a freddo: import e memoria all'avvio di app, CLI/worker e processi di
+# lettura, più il costo del primo file che carica i parser (import lazy, vedi reading.py).
+#
+#   python benchmarks/bench_coldstart.py [--repeat 5] [--json report.json]
+#
+# Ogni scenario gira in un interprete nuovo (niente moduli già in sys.modules): si misurano
+# il tempo del blocco di import/avvio, il tempo totale del processo (interprete incluso),
+# il picco RSS e quali dipendenze pesanti risultano caricate alla fine.
+
+import os
+import ast
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pipeline import Document, docx_bytes, text_pdf  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("streamlit", "pandas", "numpy", "groq", "httpx", "PyPDF2", "docx", "pdf2image", "pytesseract", "docx2pdf")
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - t0
+rss = None
+try:
+    # VmHWM riparte da zero a ogni exec; ru_maxrss su Linux eredita il picco del processo padre
+    with open("/proc/self/status") as fh:
+        rss = next(int(l.split()[1]) / 1024 for l in fh if l.startswith("VmHWM:"))
+except (OSError, StopIteration):
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    except ImportError:  # Windows
+        pass
+print(json.dumps({{"ms": elapsed * 1000, "rss_mb": rss, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def app_imports() -> str:
+    """Import di primo livello di aptitude_clean.py (senza eseguire la pagina Streamlit)."""
+    with open(os.path.join(ROOT, "aptitude_clean.py"), encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    lines = [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(lines)
+
+def scenarios(tmp: str) -> List[Tuple[str, str]]:
+    """(nome, codice) misurati in un processo nuovo."""
+    lines = ["Mario Rossi", "Operatore call center inbound, 3 anni", "Tel. +39 333 123 4567"] * 10
+    pdf_path = os.path.join(tmp, "cv.pdf")
+    with open(pdf_path, "wb") as fh:
+        fh.write(text_pdf(lines))
+    out = [
+        ("lettura: import", "import aptitude.reading"),
+        ("lettura: primo PDF", f"from aptitude.reading import read_document\nread_document('cv.pdf', open({pdf_path!r}, 'rb').read())"),
+    ]
+    if Document is not None:
+        docx_path = os.path.join(tmp, "cv.docx")
+        with open(docx_path, "wb") as fh:
+            fh.write(docx_bytes(lines))
+        out.append(("lettura: primo DOCX", f"from aptitude.reading import read_document\nread_document('cv.docx', open({docx_path!r}, 'rb').read())"))
+    out += [
+        ("cli: import", "import aptitude.cli"),
+        ("worker: pronto", (
+            "import aptitude.cli\n"
+            "from aptitude.cache import ResultCache\n"
+            "from aptitude.history import ScreeningHistory\n"
+            "from aptitude.jobs import JobQueue\n"
+            "from aptitude.reading import ReadingPool\n"
+            "JobQueue(); ResultCache(); ScreeningHistory(); ReadingPool()"
+        )),
+        ("app: import", app_imports()),
+    ]
+    return out
+
+def run_once(body: str, env: Dict[str, str]) -> Dict[str, Any]:
+    code = _CHILD.format(body=body, heavy=HEAVY_MODULES)
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}")
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+    out["wall_ms"] = wall
+    return out
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"python": sys.version.split()[0], "repeat": args.repeat, "scenarios": {}}
+    with tempfile.TemporaryDirectory(prefix="aptitude-coldstart-") as tmp:
+        # cache, storico e coda in una cartella vuota: l'avvio non dipende dai file esistenti
+        env = {**os.environ, "APTITUDE_CACHE_DIR": os.path.join(tmp, "cache"), "PYTHONPATH": ROOT}
+        for name, body in scenarios(tmp):
+            try:
+                runs = [run_once(body, env) for _ in range(args.repeat)]
+            except RuntimeError as exc:
+                report["scenarios"][name] = {"error": str(exc)}
+                continue
+            rss = [r["rss_mb"] for r in runs if r["rss_mb"] is not None]
+            report["scenarios"][name] = {
+                "import_ms_p50": round(statistics.median(r["ms"] for r in runs), 1),
+                "process_ms_p50": round(statistics.median(r["wall_ms"] for r in runs), 1),
+                "rss_mb_max": round(max(rss), 1) if rss else None,
+                "loaded": runs[-1]["loaded"],
+            }
+    return report
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Python {report['python']}, {report['repeat']} avvii per scenario (mediana)")
+    print(f"{'scenario':<22}{'import ms':>11}{'processo ms':>13}{'RSS MB':>9}  dipendenze caricate")
+    for name, s in report["scenarios"].items():
+        if "error" in s:
+            print(f"{name:<22}  errore: {s['error']}")
+            continue
+        rss = "-" if s["rss_mb_max"] is None else f"{s['rss_mb_max']:.1f}"
+        print(f"{name:<22}{s['import_ms_p50']:>11.1f}{s['process_ms_p50']:>13.1f}{rss:>9}  {', '.join(s['loaded']) or '-'}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--repeat", type=int, default=5, help="Avvii per scenario")
+    ap.add_argument("--json", default=None, help="Salva il report in JSON (confronto tra versioni)")
+    args = ap.parse_args(argv)
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# Micro-benchmark: scansioni keyword per-lista (implementazione precedente) vs matcher a
+# passata singola (aptitude.matcher) su CV lunghi "OCR-like".
+#
+#   python benchmarks/bench_matcher.py [--pages 12] [--repeat 50]
+
+import os
+import re
+import sys
+import copy
+import time
+import random
+import argparse
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aptitude.signals import (  # noqa: E402
+    CC_TOOLS_KW, CRM_KW, INBOUND_KW, KPI_KW, OFFICE_KW, OUTBOUND_KW, STRONG_PHONE_KW, TICKETING_KW,
+    PRESCREEN_FAMILIES, SIGNAL_MATCHER, deterministic_enrich, prescreen_hits, scan_signals,
+)
+
+
+# ===================== IMPLEMENTAZIONE PRECEDENTE (riferimento) =====================
+def legacy_find_snippets(text: str, keywords: List[str], max_snippets: int = 3, window: int = 140) -> List[str]:
+    if not text:
+        return []
+    low = text.lower()
+    snippets: List[str] = []
+    for kw in keywords:
+        k = kw.lower()
+        idx = low.find(k)
+        if idx == -1:
+            continue
+        start = max(0, idx - window)
+        end = min(len(text), idx + len(kw) + window)
+        snip = text[start:end].strip().replace("\n", " ")
+        snip = re.sub(r"\s+", " ", snip)
+        if snip and snip not in snippets:
+            snippets.append(snip[:220])
+        if len(snippets) >= max_snippets:
+            break
+    return snippets
+
+def legacy_prescreen_hits(text: str) -> Dict[str, int]:
+    low = (text or "").lower()
+    hits = {fam: sum(1 for k in kws if k.lower() in low) for fam, kws in PRESCREEN_FAMILIES.items()}
+    hits["strong"] = sum(1 for k in STRONG_PHONE_KW if k in low)
+    return hits
+
+def legacy_enrich(out: Dict[str, Any], txt: str) -> Dict[str, Any]:
+    skills = out["skills"]
+    low = txt.lower()
+    for field, kw_list in (("office_tools", OFFICE_KW), ("crm_tools", CRM_KW), ("ticketing_tools", TICKETING_KW), ("contact_center_tools", CC_TOOLS_KW)):
+        if not skills.get(field):
+            hits = [k for k in kw_list if k.lower() in low]
+            skills[field] = list(dict.fromkeys(hits))[:8] if hits else []
+    for e in out["experience"]:
+        ev = e.get("evidence", [])
+        block = (str(e.get("role", "")) + " " + str(e.get("description") or "")).lower()
+        if not e.get("is_phone_structured"):
+            strong = any(k in block for k in STRONG_PHONE_KW)
+            strong = strong or (any(k in block for k in OUTBOUND_KW) and any(k in block for k in ["kpi", "target", "obiettiv", "conversion", "appunt"]))
+            if strong:
+                e["is_phone_structured"] = True
+                if any(k in block for k in OUTBOUND_KW) and any(k in block for k in INBOUND_KW):
+                    e["phone_type"] = "mixed"
+                elif any(k in block for k in OUTBOUND_KW):
+                    e["phone_type"] = "outbound"
+                elif any(k in block for k in INBOUND_KW):
+                    e["phone_type"] = "inbound"
+                else:
+                    e["phone_type"] = "mixed"
+                if not ev:
+                    ev = legacy_find_snippets(txt, ["call center", "contact center", "telemarketing", "telesales", "chiamate in uscita", "chiamate in entrata", "presa appuntamenti", "dialer", "kpi", "target"], 2)
+        if not ev:
+            ev = legacy_find_snippets(txt, ["crm", "salesforce", "hubspot", "zendesk", "kpi", "target", "appuntamenti"], 1)
+        e["evidence"] = ev[:3]
+    return out
+
+
+# ===================== CORPUS SINTETICO =====================
+FILLER = (
+    "esperienza lavorativa gestione clienti responsabile ufficio amministrazione magazzino logistica "
+    "formazione diploma laurea competenze linguistiche patente disponibilità trasferte pag rn lI 0O "
+    "experience education skills team work problem solving reporting documents"
+).split()
+
+def synthetic_cv(pages: int, seed: int) -> str:
+    rnd = random.Random(seed)
+    signals = OUTBOUND_KW + INBOUND_KW + KPI_KW + CRM_KW[:4] + OFFICE_KW[:5] + STRONG_PHONE_KW
+    out = []
+    for p in range(pages):
+        out.append(f"Mario Rossi - Curriculum Vitae - pagina {p + 1}")
+        words = [rnd.choice(FILLER) for _ in range(600)]
+        for _ in range(6):
+            words.insert(rnd.randrange(len(words)), rnd.choice(signals).upper() if rnd.random() < 0.3 else rnd.choice(signals))
+        out.append(" ".join(words))
+    return "\n".join(out)
+
+def extracted_for(seed: int) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    roles = ["Operatore outbound", "Addetto customer care inbound", "Magazziniere", "Impiegata amministrativa", "Agente telemarketing"]
+    return {
+        "candidate": {"name": "", "surname": "", "email": "", "phones": []},
+        "extraction": {"confidence": 0.5},
+        "skills": {"office_tools": [], "crm_tools": [], "ticketing_tools": [], "contact_center_tools": []},
+        "experience": [
+            {"role": rnd.choice(roles), "description": "campagne con target giornalieri e appuntamenti", "evidence": []}
+            for _ in range(8)
+        ],
+    }
+
+
+def bench(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=12)
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--docs", type=int, default=5)
+    args = ap.parse_args()
+
+    docs = [(synthetic_cv(args.pages, s), extracted_for(s)) for s in range(args.docs)]
+
+    # stesso output (pre-screen + enrich) prima di misurare
+    for text, ex in docs:
+        assert legacy_prescreen_hits(text) == prescreen_hits(text)
+        a = legacy_enrich(copy.deepcopy(ex), text)
+        b = deterministic_enrich(copy.deepcopy(ex), text, "", [])
+        assert a["skills"] == {k: b["skills"][k] for k in a["skills"]}
+        assert a["experience"] == b["experience"]
+
+    def run_legacy():
+        for text, ex in docs:
+            legacy_prescreen_hits(text)
+            legacy_enrich(copy.deepcopy(ex), text)
+
+    def run_single_pass():
+        for text, ex in docs:
+            scan = scan_signals(text)
+            prescreen_hits(text, scan)
+            deterministic_enrich(copy.deepcopy(ex), text, "", [], scan)
+
+    chars = sum(len(t) for t, _ in docs) / len(docs)
+    t_old = bench(run_legacy, args.repeat) / len(docs)
+    t_new = bench(run_single_pass, args.repeat) / len(docs)
+    print(f"CV medio: {chars:,.0f} caratteri ({args.pages} pagine), {args.docs} documenti")
+    print(f"per-lista (precedente): {t_old:8.2f} ms/CV")
+    print(f"passata singola:        {t_new:8.2f} ms/CV  (backend: {SIGNAL_MATCHER.backend})")
+    print(f"speedup:                {t_old / t_new:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+# Benchmark end-to-end della pipeline (lettura -> extract -> enrich -> score) su un corpus
+# sintetico, con un server locale che imita l'API chat completions di Groq.
+#
+#   python benchmarks/bench_pipeline.py [--n 60] [--latency-ms 400] [--error-rate 0.02]
+#                                       [--concurrency 4] [--fused] [--no-stream] [--json report.json]
+#
+# Corpus: PDF testuali, PDF solo immagine (percorso OCR), DOCX e TXT in IT/EN/ES/DE, con
+# numeri di telefono e densità variabile di keyword telefoniche. Nessuna chiamata a Groq:
+# lo stub risponde con JSON validi, latenza ed errori (429/503) configurabili.
+#
+# Report: throughput (CV/min), p50/p95 per fase, chiamate e token (stimati dallo stub come
+# caratteri/4), picco RSS del processo e dei worker di lettura.
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    from docx import Document
+except ImportError:
+    Document = None
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Lo stub non controlla la chiave; GROQ_API_KEY viene letta all'import di aptitude.llm
+os.environ["GROQ_API_KEY"] = "bench-stub"
+
+from aptitude.cache import ResultCache  # noqa: E402
+from aptitude.pipeline import ScreenSettings, analyze_batch_async  # noqa: E402
+from aptitude.reading import ReadingPool  # noqa: E402
+
+
+# ===================== CORPUS SINTETICO =====================
+FIRST_NAMES = ["Giulia", "Marco", "Sara", "Luca", "Elena", "Javier", "Lucía", "Anna", "Jonas", "Emma", "Oliver", "Chloe"]
+LAST_NAMES = ["Rossi", "Bianchi", "Esposito", "Romano", "García", "López", "Müller", "Schmidt", "Smith", "Brown", "Ricci", "Moretti"]
+COMPANIES = ["Teleconnect", "Abaco Servizi", "Nordcall", "Iberia Contact", "Stadtwerke", "Brightline", "Comdata", "Vodanet", "Kundenwerk", "Salesfox"]
+
+LANGS: Dict[str, Dict[str, Any]] = {
+    "it": {
+        "headings": ("PROFILO", "ESPERIENZE LAVORATIVE", "ISTRUZIONE", "COMPETENZE", "LINGUE", "INTERESSI"),
+        "phone": lambda r: f"+39 3{r.randint(20, 49)} {r.randint(100, 999)} {r.randint(1000, 9999)}",
+        "phone_kw": [
+            "Operatore call center inbound, gestione chiamate in entrata e customer care",
+            "Telemarketing outbound con dialer, obiettivi giornalieri e KPI di conversione",
+            "Presa appuntamenti per consulenti, circa 120 chiamate al giorno",
+            "Uso quotidiano di CRM Salesforce e ticketing Zendesk",
+        ],
+        "generic": [
+            "Gestione magazzino e inventario", "Addetta alla cassa e rapporti con i clienti",
+            "Organizzazione eventi aziendali", "Archiviazione documenti e data entry",
+        ],
+        "profile": "Persona solare, precisa e orientata al cliente.",
+        "privacy": "Autorizzo il trattamento dei miei dati personali ai sensi del D.Lgs 196/2003 e del GDPR 2016/679.",
+    },
+    "en": {
+        "headings": ("PROFILE", "WORK EXPERIENCE", "EDUCATION", "SKILLS", "LANGUAGES", "INTERESTS"),
+        "phone": lambda r: f"+44 7{r.randint(100, 999)} {r.randint(100000, 999999)}",
+        "phone_kw": [
+            "Inbound customer care agent in a busy contact center, incoming calls and help desk",
+            "Outbound telesales and cold calling with daily targets and conversion KPIs",
+            "Lead qualification and appointments setting for the sales team",
+            "Daily use of HubSpot CRM, Genesys and Five9 dialer",
+        ],
+        "generic": ["Warehouse operations and stock control", "Barista and front of house", "Office administration and filing"],
+        "profile": "Reliable, friendly and customer-focused professional.",
+        "privacy": "I consent to the processing of my personal data.",
+    },
+    "es": {
+        "headings": ("PERFIL", "EXPERIENCIA", "FORMACIÓN", "HABILIDADES", "IDIOMAS", "AFICIONES"),
+        "phone": lambda r: f"+34 6{r.randint(10, 99)} {r.randint(100, 999)} {r.randint(100, 999)}",
+        "phone_kw": [
+            "Agente de call center inbound y customer care",
+            "Telemarketing outbound con dialer y objetivos de venta (KPI)",
+            "Gestión de CRM Salesforce y tickets en Zendesk",
+        ],
+        "generic": ["Dependiente en tienda de ropa", "Camarero en restaurante", "Auxiliar administrativo"],
+        "profile": "Persona responsable y con experiencia de atención al cliente.",
+        "privacy": "Autorizo el tratamiento de mis datos personales.",
+    },
+    "de": {
+        "headings": ("PROFIL", "BERUFSERFAHRUNG", "AUSBILDUNG", "KENNTNISSE", "SPRACHEN", "INTERESSEN"),
+        "phone": lambda r: f"+49 15{r.randint(10, 99)} {r.randint(1000000, 9999999)}",
+        "phone_kw": [
+            "Mitarbeiter im Contact Center, inbound Kundenservice und Help Desk",
+            "Outbound Telesales mit Dialer, Target und KPI",
+            "CRM Pflege in Salesforce, Ticket Bearbeitung in OTRS",
+        ],
+        "generic": ["Lagerlogistik und Kommissionierung", "Verkauf im Einzelhandel", "Büroorganisation"],
+        "profile": "Zuverlässig, kommunikativ und kundenorientiert.",
+        "privacy": "Datenschutz: Ich willige in die Verarbeitung meiner Daten ein.",
+    },
+}
+
+
+def cv_lines(rng: random.Random, lang: str, density: float) -> Tuple[str, List[str]]:
+    """(nome, righe) di un CV sintetico; density = quota di righe esperienza con keyword telefoniche."""
+    L = LANGS[lang]
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    h_profile, h_exp, h_edu, h_skills, h_lang, h_hobby = L["headings"]
+    lines = [
+        f"{first} {last}".upper(),
+        f"{first.lower()}.{last.lower()}{rng.randint(1, 99)}@example.com".replace("ü", "u").replace("í", "i"),
+        L["phone"](rng),
+        "",
+        h_profile,
+        L["profile"],
+        "",
+        h_exp,
+    ]
+    year = 2024
+    for _ in range(rng.randint(3, 7)):
+        start = year - rng.randint(1, 3)
+        lines.append(f"{start} - {year}  {rng.choice(COMPANIES)}")
+        for _ in range(rng.randint(2, 4)):
+            lines.append("- " + (rng.choice(L["phone_kw"]) if rng.random() < density else rng.choice(L["generic"])))
+        year = start
+    lines += ["", h_edu, f"Diploma {year - 5}", "", h_skills, "Excel, Word, Outlook, Teams", "", h_lang, "Italiano, English, Español", ""]
+    lines += [h_hobby, "Sport, viaggi, lettura", "", L["privacy"]]
+    return f"{first} {last}", lines
+
+
+def _pdf_escape(s: str) -> bytes:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+
+def text_pdf(lines: List[str], lines_per_page: int = 45) -> bytes:
+    """PDF testuale minimale (Helvetica, WinAnsi), leggibile da PyPDF2."""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for page in pages:
+        stream = b"BT /F1 10 Tf 50 800 Td 14 TL " + b" ".join(b"(" + _pdf_escape(l) + b") Tj T*" for l in page) + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % len(kids)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + obj + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for off in offsets:
+        out.write(b"%010d 00000 n \n" % off)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def image_pdf(lines: List[str], lines_per_page: int = 45) -> bytes:
+    """PDF solo immagine (scansione simulata): nessun testo estraibile, serve l'OCR."""
+    font = ImageFont.load_default()
+    images = []
+    for i in range(0, len(lines), lines_per_page):
+        img = Image.new("L", (1240, 1754), 255)
+        draw = ImageDraw.Draw(img)
+        for j, line in enumerate(lines[i:i + lines_per_page]):
+            draw.text((80, 80 + j * 34), line, fill=0, font=font)
+        images.append(img)
+    buf = io.BytesIO()
+    images[0].save(buf, "PDF", resolution=150, save_all=True, append_images=images[1:])
+    return buf.getvalue()
+
+def docx_bytes(lines: List[str]) -> bytes:
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def build_corpus(n: int, seed: int = 7) -> List[Tuple[str, bytes]]:
+    """n documenti a rotazione tra formati e lingue disponibili."""
+    rng = random.Random(seed)
+    kinds = ["pdf_text", "txt"]
+    if Document is not None:
+        kinds.append("docx")
+    if Image is not None:
+        kinds.append("pdf_image")
+    langs = list(LANGS)
+    items = []
+    for i in range(n):
+        kind = kinds[i % len(kinds)]
+        lang = langs[(i // len(kinds)) % len(langs)]
+        density = rng.choice([0.0, 0.15, 0.4, 0.8])
+        _, lines = cv_lines(rng, lang, density)
+        if kind == "pdf_text":
+            items.append((f"cv{i:04d}_{lang}.pdf", text_pdf(lines)))
+        elif kind == "pdf_image":
+            items.append((f"cv{i:04d}_{lang}_scan.pdf", image_pdf(lines)))
+        elif kind == "docx":
+            items.append((f"cv{i:04d}_{lang}.docx", docx_bytes(lines)))
+        else:
+            items.append((f"cv{i:04d}_{lang}.txt", "\n".join(lines).encode("utf-8")))
+    return items
+
+
+# ===================== STUB GROQ =====================
+STUB_EXTRACT = {
+    "schema_version": "2.0",
+    "candidate": {"name": "", "surname": "", "email": "", "phones": []},
+    "extraction": {"language_hint": "auto", "confidence": 0.85, "notes": ""},
+    "experience": [{
+        "role": "Operatore", "company": "", "start": "", "end": "", "description": "call center outbound",
+        "is_phone_structured": True, "phone_type": "outbound", "channels": ["phone"], "tools": [],
+        "kpi_signals": [], "evidence": ["telemarketing outbound con dialer"],
+    }],
+    "skills": {"office_tools": [], "crm_tools": [], "ticketing_tools": [], "contact_center_tools": [], "languages": [], "other": []},
+    "constraints": [],
+}
+
+def stub_scores(seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    def role() -> Dict[str, Any]:
+        dims = {f"d{i}": rng.randint(0, 5) for i in range(5)}
+        score = sum(dims.values()) * 4
+        return {"score": score, "label": "Alta" if score >= 75 else "Media" if score >= 45 else "Bassa",
+                "dimensions": dims, "reasons": ["stub"], "evidence": []}
+    return {"schema_version": "2.0", "scores": {k: role() for k in ("inbound_call_center", "outbound_telemarketing", "appointment_setting")}}
+
+
+class StubGroq:
+    """Server chat completions locale: latenza gaussiana, errori 429/503 con probabilità error_rate."""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, seed: int = 11):
+        self.latency, self.jitter, self.error_rate = latency, jitter, error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                stub.handle(self, body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, req: BaseHTTPRequestHandler, body: Dict[str, Any]) -> None:
+        with self.lock:
+            self.stats["calls"] += 1
+            fail = self.rng.random() < self.error_rate
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter))
+        time.sleep(delay)
+        if fail:
+            with self.lock:
+                self.stats["errors"] += 1
+            code = 429 if self.rng.random() < 0.5 else 503
+            self._send(req, code, {"error": {"message": "stub error", "type": "stub"}}, {"retry-after": "0.2"})
+            return
+
+        messages = body.get("messages", [])
+        system = messages[0]["content"] if messages else ""
+        prompt = sum(len(str(m.get("content", ""))) for m in messages)
+        seed = hash(str(messages[-1].get("content", ""))[:2000]) if messages else 0
+        if "SCORING" in system and "ESTRAZIONE" in system:
+            payload = dict(STUB_EXTRACT, **stub_scores(seed))
+        elif "SCORING" in system:
+            payload = stub_scores(seed)
+        else:
+            payload = STUB_EXTRACT
+        content = json.dumps(payload, ensure_ascii=False)
+        usage = {"prompt_tokens": prompt // 4, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        with self.lock:
+            self.stats["prompt_tokens"] += usage["prompt_tokens"]
+            self.stats["completion_tokens"] += usage["completion_tokens"]
+        if body.get("stream"):
+            self._send_stream(req, body.get("model", ""), content)
+            return
+        self._send(req, 200, {
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": body.get("model", ""),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    @staticmethod
+    def _send(req: BaseHTTPRequestHandler, code: int, payload: Dict[str, Any], headers: Dict[str, str] = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        req.send_response(code)
+        req.send_header("content-type", "application/json")
+        req.send_header("content-length", str(len(data)))
+        for k, v in (headers or {}).items():
+            req.send_header(k, v)
+        req.end_headers()
+        req.wfile.write(data)
+
+    @staticmethod
+    def _send_stream(req: BaseHTTPRequestHandler, model: str, content: str, piece: int = 24) -> None:
+        """Risposta SSE come quella di Groq con stream=True (il client può chiudere prima della fine)."""
+        req.send_response(200)
+        req.send_header("content-type", "text/event-stream")
+        req.end_headers()
+        try:
+            for i in range(0, len(content), piece):
+                chunk = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                         "choices": [{"index": 0, "delta": {"content": content[i:i + piece]}, "finish_reason": None}]}
+                req.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            req.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+# ===================== REPORT =====================
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))]
+
+def peak_rss_mb() -> Optional[float]:
+    """Picco RSS (MB) del processo principale. Non disponibile su Windows."""
+    if resource is None:
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss: byte su macOS, KB su Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def worker_peak_rss_mb(reading_pool: ReadingPool) -> Optional[float]:
+    """
+    Picco RSS (MB) del worker di lettura più pesante, da /proc (solo Linux, pool ancora vivo).
+    RUSAGE_CHILDREN non serve: dopo fork+exec riporta anche il picco del padre.
+    """
+    executor = reading_pool._executor
+    peaks = []
+    for proc in list((getattr(executor, "_processes", None) or {}).values()):
+        try:
+            with open(f"/proc/{proc.pid}/status") as f:
+                peaks += [int(line.split()[1]) / 1024 for line in f if line.startswith("VmHWM:")]
+        except OSError:
+            pass
+    return max(peaks) if peaks else None
+
+def outcome(res: Dict[str, Any]) -> str:
+    if not res["raw_text"] or not res["raw_text"].strip():
+        return "unreadable"
+    if res.get("llm_error"):
+        return "groq_error"
+    if res.get("duplicate_of"):
+        return "duplicate"
+    if res.get("prescreened"):
+        return "prescreened"
+    return "scored"
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    items = build_corpus(args.n, args.seed)
+    stub = StubGroq(args.latency_ms / 1000.0, args.jitter_ms / 1000.0, args.error_rate)
+    os.environ["GROQ_BASE_URL"] = stub.url  # letta da AsyncGroq a ogni batch
+
+    settings = ScreenSettings(concurrency=args.concurrency, fused=args.fused, prescreen=not args.no_prescreen, stream=not args.no_stream)
+    reading_pool = ReadingPool(max_workers=args.read_workers) if args.read_workers else ReadingPool()
+    with tempfile.TemporaryDirectory() as tmp:
+        result_cache = ResultCache(path=os.path.join(tmp, "results.sqlite"))
+        reading_pool.read_many([("warmup.txt", b"warmup")])  # avvio dei worker fuori dalla misura
+
+        t0 = time.perf_counter()
+        results = asyncio.run(analyze_batch_async(items, settings, reading_pool, result_cache))
+        wall = time.perf_counter() - t0
+        rss = {"main": peak_rss_mb(), "read_worker": worker_peak_rss_mb(reading_pool)}
+        reading_pool.shutdown()
+    stub.close()
+
+    stages: Dict[str, List[float]] = {}
+    for res in results:
+        for stage, secs in res.get("timings", {}).items():
+            stages.setdefault(stage, []).append(secs)
+    outcomes: Dict[str, int] = {}
+    for res in results:
+        outcomes[outcome(res)] = outcomes.get(outcome(res), 0) + 1
+    kinds: Dict[str, int] = {}
+    for name, _ in items:
+        kind = "pdf_image" if name.endswith("_scan.pdf") else name.rsplit(".", 1)[-1]
+        kinds[kind] = kinds.get(kind, 0) + 1
+
+    return {
+        "cv": len(items),
+        "corpus": kinds,
+        "settings": {"concurrency": args.concurrency, "fused": args.fused, "prescreen": not args.no_prescreen, "stream": not args.no_stream,
+                     "read_workers": reading_pool.max_workers, "latency_ms": args.latency_ms, "error_rate": args.error_rate},
+        "wall_s": round(wall, 3),
+        "cv_per_min": round(len(items) / wall * 60, 1) if wall else 0.0,
+        "stages_ms": {
+            stage: {"n": len(v), "p50": round(percentile(v, 0.5) * 1000, 2), "p95": round(percentile(v, 0.95) * 1000, 2)}
+            for stage, v in sorted(stages.items())
+        },
+        "outcomes": outcomes,
+        "groq": dict(stub.stats),
+        "tokens_per_scored_cv": round((stub.stats["prompt_tokens"] + stub.stats["completion_tokens"]) / max(1, outcomes.get("scored", 0)), 1),
+        "peak_rss_mb": {k: round(v, 1) for k, v in rss.items() if v is not None},
+    }
+
+def print_report(r: Dict[str, Any]) -> None:
+    print(f"CV: {r['cv']}  corpus: {r['corpus']}")
+    print(f"impostazioni: {r['settings']}")
+    print(f"tempo totale: {r['wall_s']:.2f}s  throughput: {r['cv_per_min']:.1f} CV/min")
+    print(f"esiti: {r['outcomes']}")
+    print(f"{'fase':<16}{'n':>6}{'p50 ms':>12}{'p95 ms':>12}")
+    for stage, s in r["stages_ms"].items():
+        print(f"{stage:<16}{s['n']:>6}{s['p50']:>12.2f}{s['p95']:>12.2f}")
+    g = r["groq"]
+    print(f"chiamate Groq: {g['calls']} (errori stub {g['errors']})  token prompt/completion: {g['prompt_tokens']}/{g['completion_tokens']}"
+          f"  token per CV valutato: {r['tokens_per_scored_cv']}")
+    if r["peak_rss_mb"]:
+        print("picco RSS: " + ", ".join(f"{k} {v:.1f} MB" for k, v in r["peak_rss_mb"].items()))
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--n", type=int, default=60, help="Numero di CV sintetici")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--latency-ms", type=float, default=400.0, help="Latenza media dello stub Groq")
+    ap.add_argument("--jitter-ms", type=float, default=120.0, help="Deviazione standard della latenza")
+    ap.add_argument("--error-rate", type=float, default=0.02, help="Quota di risposte 429/503 dallo stub")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--read-workers", type=int, default=None)
+    ap.add_argument("--fused", action="store_true")
+    ap.add_argument("--no-prescreen", action="store_true")
+    ap.add_argument("--no-stream", action="store_true", help="Risposte Groq complete invece che in streaming")
+    ap.add_argument("--json", default=None, help="Salva il report in JSON (confronto tra versioni)")
+    args = ap.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()